@@ -0,0 +1,100 @@
+"""Streamlit front end for :mod:`job_runner`: progress, cancel and per-session results.
+
+:func:`background_result` runs a computation as a background job and shows its
+progress bar and a Cancel button while it runs. Jobs are keyed process-wide,
+so sessions asking for the same work share one job. Each session watches the
+job it is waiting for, and a job is only cancelled once no session watches it:
+moving a slider, or pressing Cancel, in one session never stops a job another
+session is still polling.
+
+A session lets go of its job when it asks for different inputs, when the
+page stops showing the section (:func:`release_background`) and when the
+session ends and its state is dropped.
+"""
+import weakref
+
+import streamlit as st
+
+from job_runner import DONE, FAILED, get_runner
+from scenario_cache import freeze
+
+# Finished job results kept per session, most recent last
+MAX_SESSION_JOB_RESULTS = 16
+
+
+def _job_progress(job, key, name):
+    # Polled by a fragment until the job finishes, then the whole page reruns to show the result
+    if job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"{name}: {job.progress:.0%}")
+    if st.button(f"Cancel {name.lower()}"):
+        _stop_watching(name)
+        st.session_state[f"cancelled:{name}"] = key
+        st.rerun()
+
+
+class _Watch:
+    # One session's hold on a job. Released once, explicitly or when the session state
+    # holding it is garbage collected at the end of the session
+    def __init__(self, job):
+        self.job = job
+        job.watch()
+        self.release = weakref.finalize(self, job.release)
+
+
+def _stop_watching(name):
+    # Release this session's job for ``name``; it stops if no other session is waiting for it
+    watch = st.session_state.pop(f"job:{name}", None)
+    if watch is not None:
+        watch.release()
+
+
+def release_background(name):
+    """Let go of this session's job for ``name`` while its section isn't shown.
+
+    Call it where the page skips a :func:`background_result`, e.g. when its
+    checkbox is unticked, so a job nobody is looking at stops.
+    """
+    _stop_watching(name)
+
+
+def background_result(key, name, func, *args, **kwargs):
+    """Result of ``func(*args, **kwargs)`` run as a background job, or None while it runs.
+
+    While the job runs its progress and a Cancel button are shown instead.
+    ``func`` must accept a ``progress`` callback (see :mod:`job_runner`).
+    Finished results are kept in session state, so reruns with the same
+    ``key`` don't go back to the runner.
+    """
+    session_results = st.session_state.setdefault("job_results", {})
+    if key in session_results:
+        return session_results[key]
+
+    # Let go of this session's job for earlier inputs so abandoned work can free its worker
+    watched = st.session_state.get(f"job:{name}")
+    if watched is not None and watched.job.key != freeze(key):
+        _stop_watching(name)
+        watched = None
+
+    if st.session_state.get(f"cancelled:{name}") == key:
+        st.info(f"{name} cancelled.")
+        if not st.button(f"Restart {name.lower()}"):
+            return None
+        del st.session_state[f"cancelled:{name}"]
+
+    job = get_runner().submit(key, name, func, *args, **kwargs)
+    if watched is None or job is not watched.job:
+        if watched is not None:
+            # A new job in place of a failed or cancelled one for the same key
+            _stop_watching(name)
+        st.session_state[f"job:{name}"] = _Watch(job)
+    if job.status == DONE:
+        session_results[key] = job.result
+        while len(session_results) > MAX_SESSION_JOB_RESULTS:
+            session_results.pop(next(iter(session_results)))
+        return job.result
+    if job.status == FAILED:
+        st.warning(f"{name} failed: {job.error}")
+        return None
+    st.fragment(_job_progress, run_every=0.5)(job, key, name)
+    return None
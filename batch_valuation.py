@@ -0,0 +1,255 @@
+"""Value every holder in a cap-table CSV with the working sheet's model.
+
+Usage::
+
+    python batch_valuation.py cap_table.csv -o results.parquet --workers 8
+
+The input needs ``holder_id``, ``strike_price``, ``grant_shares``,
+``common_shares`` and ``purchase_price`` columns plus one cumulative
+``vest_<year>`` column per year (``vest_2025`` ... ``vest_2035``). Rows are read
+and valued in chunks across a process pool and the per-holder yearly results
+are streamed to CSV, Parquet or an Arrow IPC file, so memory stays bounded
+however large the cap table is. Parquet and Arrow output need ``pyarrow``.
+With ``--net-of-tax`` the net-of-tax values (``tax.py``) are added as columns.
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from csv_rows import data_rows, read_header
+from option_pricing import OPTION_PRICING_MODES
+from tax import TAX_METRICS, add_tax_arguments, net_of_tax, tax_settings
+from valuation_engine import RESULT_METRICS, project_arrays, sanitize_vesting
+
+REQUIRED_COLUMNS = ["holder_id", "strike_price", "grant_shares", "common_shares", "purchase_price"]
+# Required columns that must hold a number on every row; empty vest_<year> cells fall back instead
+NUMERIC_COLUMNS = REQUIRED_COLUMNS[1:]
+VEST_COLUMN = re.compile(r"^vest_(\d{4})$")
+
+
+def vesting_columns(header):
+    """Return the ``vest_<year>`` columns of ``header`` as (years, column indexes)."""
+    found = sorted((int(match.group(1)), index) for index, name in enumerate(header) if (match := VEST_COLUMN.match(name)))
+    years = [year for year, _ in found]
+    if not years:
+        raise ValueError("no vest_<year> columns found")
+    if years != list(range(years[0], years[0] + len(years))):
+        raise ValueError(f"vest_<year> columns must cover consecutive years, got {years}")
+    return years, [index for _, index in found]
+
+
+def _to_floats(rows, index):
+    # Empty cells become NaN so the vesting fallbacks can treat them as missing
+    return np.array([float(row[index]) if row[index].strip() else np.nan for row in rows], dtype=np.float64)
+
+
+def value_chunk(task):
+    """Value one chunk of cap-table rows; runs in a worker process."""
+    rows, layout, settings = task
+    holder_ids = [row[layout["holder_id"]] for row in rows]
+    grant_shares = _to_floats(rows, layout["grant_shares"])
+    vesting = np.stack([_to_floats(rows, index) for index in layout["vest"]], axis=-1)
+
+    results = project_arrays(
+        growth_rate=settings["growth_rate"],
+        option_redemption=settings["option_redemption"],
+        common_redemption=settings["common_redemption"],
+        vesting=sanitize_vesting(vesting, grant_shares),
+        strike_price=_to_floats(rows, layout["strike_price"]),
+        grant_shares=grant_shares,
+        common_shares=_to_floats(rows, layout["common_shares"]),
+        common_price=_to_floats(rows, layout["purchase_price"]),
+        base_price=settings["base_price"],
+        unsold_option_basis=settings["unsold_option_basis"],
+        start_year=settings["start_year"],
+        option_pricing=settings["option_pricing"],
+        volatility=settings["volatility"],
+        risk_free_rate=settings["risk_free_rate"],
+    )
+
+    # Long format: one row per holder and year, skipping the base year
+    years = results.years[1:]
+    columns = {
+        "holder_id": np.repeat(np.array(holder_ids, dtype=object), len(years)),
+        "year": np.tile(years, len(rows)),
+    }
+    for metric in settings["metrics"]:
+        columns[metric] = results[metric][:, 1:].ravel()
+    if settings.get("tax") is not None:
+        net = net_of_tax(results, settings.get("tax"))
+        for metric in TAX_METRICS:
+            columns[metric] = net[metric][:, 1:].ravel()
+
+    if settings["format"] == "csv":
+        # Render CSV in the worker so the parent process only writes bytes
+        return render_csv(columns)
+    return columns
+
+
+def render_csv(columns):
+    """Render columns as header-less CSV bytes, using pyarrow's writer when installed."""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerows(zip(*(column.tolist() for column in columns.values())))
+        return buffer.getvalue().encode("utf-8")
+
+    buffer = io.BytesIO()
+    table = pa.table({name: pa.array(column) for name, column in columns.items()})
+    pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=False))
+    return buffer.getvalue()
+
+
+def read_chunks(reader, chunk_size):
+    while True:
+        rows = list(islice(reader, chunk_size))
+        if not rows:
+            return
+        yield rows
+
+
+class CsvOutput:
+    def __init__(self, path, columns):
+        self._file = open(path, "wb")
+        header = io.StringIO()
+        csv.writer(header, lineterminator="\n").writerow(columns)
+        self._file.write(header.getvalue().encode("utf-8"))
+
+    def write(self, chunk):
+        self._file.write(chunk)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    def __init__(self, path, columns):
+        import pyarrow as pa
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [("holder_id", pa.string()), ("year", pa.int64())] + [(metric, pa.float64()) for metric in columns[2:]]
+        )
+        self._writer = self._open(path)
+
+    def _open(self, path):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(path, self._schema)
+
+    def write(self, chunk):
+        # Each chunk becomes its own row group, built straight from the NumPy columns
+        arrays = [self._pa.array(chunk[name], type=field.type) for name, field in zip(self._schema.names, self._schema)]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class ArrowOutput(ParquetOutput):
+    """Arrow IPC file output; each chunk becomes its own record batch."""
+
+    def _open(self, path):
+        return self._pa.ipc.new_file(path, self._schema)
+
+
+OUTPUTS = {"csv": CsvOutput, "parquet": ParquetOutput, "arrow": ArrowOutput}
+# Output format implied by each file extension
+EXTENSIONS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+
+def run(input_path, output_path, output_format, settings, chunk_size, workers):
+    """Stream ``input_path`` through the engine into ``output_path``. Returns the row count."""
+    with open(input_path, newline="", encoding="utf-8") as source:
+        reader = csv.reader(source)
+        header = read_header(reader, input_path)
+        missing = [name for name in REQUIRED_COLUMNS if name not in header]
+        if missing:
+            raise ValueError(f"cap table is missing columns: {', '.join(missing)}")
+        years, vest_indexes = vesting_columns(header)
+
+        layout = {name: header.index(name) for name in REQUIRED_COLUMNS}
+        numeric = {name: layout[name] for name in NUMERIC_COLUMNS}
+        layout["vest"] = vest_indexes
+        settings = dict(settings, start_year=years[0] - 1, format=output_format)
+
+        columns = ["holder_id", "year"] + settings["metrics"] + (TAX_METRICS if settings.get("tax") is not None else [])
+        output = OUTPUTS[output_format](output_path, columns)
+        holders = 0
+        max_in_flight = 2 * (workers or os.cpu_count() or 1)
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Executor.map would read the whole file up front; keep only a few chunks in flight
+                pending = []
+                for rows in read_chunks(data_rows(reader, len(header), numeric), chunk_size):
+                    pending.append(pool.submit(value_chunk, (rows, layout, settings)))
+                    holders += len(rows)
+                    if len(pending) >= max_in_flight:
+                        output.write(pending.pop(0).result())
+                for future in pending:
+                    output.write(future.result())
+        finally:
+            output.close()
+    return holders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Value every holder in a cap-table CSV.")
+    parser.add_argument("input", help="cap-table CSV")
+    parser.add_argument("-o", "--output", required=True, help="output file (.csv, .parquet or .arrow)")
+    parser.add_argument("--format", choices=list(OUTPUTS), help="output format (default: from the output extension)")
+    parser.add_argument("--growth-rate", type=float, default=0.20, help="PBT growth rate (default: 0.20)")
+    parser.add_argument("--option-redemption", type=float, default=0.05, help="A-Share/Options redemption rate (default: 0.05)")
+    parser.add_argument("--common-redemption", type=float, default=0.05, help="common share redemption rate (default: 0.05)")
+    parser.add_argument("--base-price", type=float, default=6.00, help="base-year share price (default: 6.00)")
+    parser.add_argument("--unsold-option-basis", choices=["vested", "granted"], default="vested",
+                        help="value unsold options on vested unsold or all unredeemed granted shares (default: vested)")
+    parser.add_argument("--option-pricing", choices=OPTION_PRICING_MODES, default="intrinsic",
+                        help="value unsold options at intrinsic value or at fair value (default: intrinsic)")
+    parser.add_argument("--volatility", type=float, default=0.30, help="share price volatility for fair-value pricing (default: 0.30)")
+    parser.add_argument("--risk-free-rate", type=float, default=0.04, help="risk-free rate for fair-value pricing (default: 0.04)")
+    parser.add_argument("--metrics", nargs="+", choices=RESULT_METRICS, metavar="METRIC", default=RESULT_METRICS,
+                        help="metrics to write (default: all)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="holders per chunk (default: 10000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    add_tax_arguments(parser)
+    args = parser.parse_args(argv)
+
+    output_format = args.format or EXTENSIONS.get(os.path.splitext(args.output)[1].lower(), "csv")
+    if output_format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error(f"{output_format.title()} output needs pyarrow installed")
+
+    settings = {
+        "growth_rate": args.growth_rate,
+        "option_redemption": args.option_redemption,
+        "common_redemption": args.common_redemption,
+        "base_price": args.base_price,
+        "unsold_option_basis": args.unsold_option_basis,
+        "option_pricing": args.option_pricing,
+        "volatility": args.volatility,
+        "risk_free_rate": args.risk_free_rate,
+        "metrics": list(args.metrics),
+        "tax": tax_settings(args),
+    }
+    try:
+        holders = run(args.input, args.output, output_format, settings, args.chunk_size, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Valued {holders:,} holders -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Reproducible benchmarks for the valuation engine and the app render paths.
+
+Usage::
+
+    python benchmarks.py -o bench.json
+    python benchmarks.py -o new.json --compare bench.json --threshold 0.25
+
+Each benchmark reports the median and minimum time per call over several
+repeats. With ``--compare``, any benchmark whose median is more than
+``threshold`` slower than the baseline is flagged and the exit status is 1.
+The Streamlit rerun benchmarks need ``streamlit`` installed and are skipped
+otherwise.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from discounting import present_values
+from monte_carlo import simulate
+from portfolio import CapTable, aggregate
+from scenario_cache import clear_caches
+from table_format import table_csv
+from valuation_engine import ValuationParams, project, project_arrays, project_grid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APPS = ["updated-equity-option.py", "updated-oaknorth-grants.py"]
+
+# The working sheet's default holder
+DEFAULT_VESTING = (60000, 70000, 80000, 90000, 100000, 100000, 100000, 100000, 100000, 100000, 100000)
+DEFAULT_PARAMS = ValuationParams(
+    strike_price=6.00, grant_shares=100000, common_shares=10000, common_price=2.00, vesting=DEFAULT_VESTING,
+    growth_rate=0.20, option_redemption=0.05, common_redemption=0.05, base_price=6.00,
+)
+
+
+def measure(func, repeats=7, min_time=0.05):
+    """Time ``func`` and return per-call seconds for each repeat.
+
+    The number of calls per repeat is calibrated so that each repeat runs for
+    at least ``min_time`` seconds.
+    """
+    func()  # warm up caches and lazy imports
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    timings = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+
+def long_horizon_params(n_years):
+    vesting = np.minimum(np.arange(1, n_years + 1) * 20000.0, 100000.0)
+    return replace(DEFAULT_PARAMS, vesting=vesting)
+
+
+def format_tab_table(results):
+    # Mirrors the working sheet's tab tables: numeric columns that Streamlit formats
+    return pd.DataFrame({
+        "Year": np.arange(2025, 2036),
+        "Share Price (£)": results.column('Share Price', 2025, 2035),
+        "Proceeds from Redemption (£)": results.column('Cumulative Redemption Value', 2025, 2035),
+        "Value of Unsold Shares (£)": results.column('Value of Unsold Shares', 2025, 2035),
+        "Total Grant Value (£)": results.column('Total Grant Value', 2025, 2035),
+    })
+
+
+def engine_benchmarks():
+    """Yield ``(name, func, items per call)`` for the engine benchmarks."""
+    yield "single/oaknorth", lambda: project(DEFAULT_PARAMS), 1
+    equity_params = replace(DEFAULT_PARAMS, base_price=None, unsold_option_basis="granted")
+    yield "single/equity", lambda: project(equity_params), 1
+
+    for growth, option, common in [(4, 4, 4), (16, 11, 11), (64, 32, 32)]:
+        grid = (np.linspace(0.10, 0.25, growth), np.linspace(0, 0.10, option), np.linspace(0, 0.10, common))
+        yield f"grid/{growth}x{option}x{common}", lambda grid=grid: project_grid(DEFAULT_PARAMS, *grid), growth * option * common
+
+    for n_years in [11, 30, 50, 100]:
+        params = long_horizon_params(n_years)
+        yield f"horizon/{n_years}y", lambda params=params: project(params), 1
+
+    holders = 100000
+    rng = np.random.default_rng(0)
+    holder_vesting = np.sort(rng.uniform(0, 100000, (holders, len(DEFAULT_VESTING))), axis=-1)
+    holder_strikes = rng.uniform(1, 10, holders)
+    yield f"holders/{holders}", lambda: project_arrays(
+        0.20, 0.05, 0.05, holder_vesting, holder_strikes, 100000, 10000, 2.00, base_price=6.00
+    ), holders
+    for pricing in ["black_scholes", "binomial"]:
+        yield f"holders/{holders}/{pricing}", lambda pricing=pricing: project_arrays(
+            0.20, 0.05, 0.05, holder_vesting, holder_strikes, 100000, 10000, 2.00, base_price=6.00,
+            option_pricing=pricing, volatility=0.30, risk_free_rate=0.04
+        ), holders
+
+    cap_table = CapTable(
+        holder_ids=np.array([f"H{holder}" for holder in range(holders)], dtype=object),
+        strike_price=holder_strikes,
+        grant_shares=np.full(holders, 100000.0),
+        common_shares=np.full(holders, 10000.0),
+        purchase_price=np.full(holders, 2.00),
+        vesting=holder_vesting,
+        years=list(range(2025, 2025 + len(DEFAULT_VESTING))),
+        labels={"cohort": np.array([f"C{2018 + holder % 6}" for holder in range(holders)], dtype=object)},
+    )
+    yield f"portfolio/{holders}", lambda: aggregate(cap_table, {}, group_by="cohort", top=20), holders
+
+    grid = project_grid(DEFAULT_PARAMS, np.linspace(0.10, 0.25, 64), np.linspace(0, 0.10, 32), np.linspace(0, 0.10, 32))
+    yield "npv_irr/64x32x32", lambda: present_values(grid, DEFAULT_PARAMS.common_price, 0.08), grid.data[0, ..., 0].size
+
+    yield "monte_carlo/100k", lambda: simulate(DEFAULT_PARAMS, n_paths=100000, seed=1), 100000
+
+    results = project(DEFAULT_PARAMS)
+    yield "format/tab_table", lambda: format_tab_table(results), 1
+    table = format_tab_table(results)
+    kinds = dict.fromkeys(list(table)[1:], 'currency')
+    yield "format/tab_table_csv", lambda: table_csv(table, kinds, index=False), 1
+
+
+def app_benchmarks():
+    """Yield full-script rerun benchmarks using Streamlit's headless AppTest."""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("streamlit not installed; skipping app rerun benchmarks", file=sys.stderr)
+        return
+
+    for app in APPS:
+        app_test = AppTest.from_file(os.path.join(HERE, app), default_timeout=60)
+        app_test.run()
+
+        def rerun(app_test=app_test, cold=False):
+            if cold:
+                clear_caches()
+            app_test.run()
+            if app_test.exception:
+                raise RuntimeError(app_test.exception[0].value)
+
+        name = os.path.splitext(app)[0]
+        # Warm reruns are answered from the scenario cache; cold ones recompute everything
+        yield f"app_rerun/{name}", rerun, 1
+        yield f"app_rerun_cold/{name}", lambda rerun=rerun: rerun(cold=True), 1
+
+
+def run_benchmarks(include_apps=True, repeats=7, selected=None):
+    suites = [engine_benchmarks()] + ([app_benchmarks()] if include_apps else [])
+    results = {}
+    for suite in suites:
+        for name, func, items in suite:
+            if selected and not any(name.startswith(prefix) for prefix in selected):
+                continue
+            timings = measure(func, repeats=repeats)
+            median = statistics.median(timings)
+            results[name] = {
+                "median_s": median,
+                "min_s": min(timings),
+                "repeats": repeats,
+                "items": items,
+                "items_per_s": items / median,
+            }
+            print(f"{name:40s} {median * 1e3:10.3f} ms  ({items / median:,.0f} items/s)", file=sys.stderr)
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Return ``(name, baseline median, current median)`` for every regression."""
+    regressions = []
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if previous and result["median_s"] > previous["median_s"] * (1 + threshold):
+            regressions.append((name, previous["median_s"], result["median_s"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the valuation engine and app reruns.")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging (default: 0.25 = 25%%)")
+    parser.add_argument("--repeats", type=int, default=7, help="timed repeats per benchmark (default: 7)")
+    parser.add_argument("--no-apps", action="store_true", help="skip the Streamlit rerun benchmarks")
+    parser.add_argument("--only", nargs="+", metavar="PREFIX", help="only run benchmarks whose name starts with PREFIX")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "benchmarks": run_benchmarks(include_apps=not args.no_apps, repeats=args.repeats, selected=args.only),
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["benchmarks"]
+        regressions = compare(report["benchmarks"], baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms ({after / before - 1:+.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""CSV row reading shared by the cap-table and vesting-rule readers.
+
+Kept apart from the CLIs that use it, so the apps can read a vesting-rule
+CSV without importing the batch valuation's process pool and tax stage.
+"""
+
+
+def read_header(reader, name):
+    """Header row of a ``csv.reader`` with names stripped; ValueError naming ``name`` if there is none."""
+    header = next(reader, None)
+    if header is None:
+        raise ValueError(f"{name} is empty")
+    return [column.strip() for column in header]
+
+
+def data_rows(reader, n_columns, required=None):
+    """Rows of a ``csv.reader`` after the header, skipping blank lines.
+
+    Raises ValueError naming the line of any row whose cell count differs
+    from the header's, or with an empty cell in one of the ``required``
+    columns (``{name: index}``).
+    """
+    required = required or {}
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) != n_columns:
+            raise ValueError(f"line {reader.line_num}: expected {n_columns} cells, got {len(row)}")
+        for name, index in required.items():
+            if not row[index].strip():
+                raise ValueError(f"line {reader.line_num}: {name} is empty")
+        yield row
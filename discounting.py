@@ -0,0 +1,122 @@
+"""Present values of projected cash flows: discounting, NPV and IRR.
+
+The engine's values are nominal: Combined Total Value adds a redemption in
+the first year to unsold shares valued ten years later as if both were worth
+the same. This module turns annual results into the holder's cash flows and
+discounts them:
+
+- the common shares are bought at ``common_price`` at the end of the base
+  year (an outflow; the A-Share/Options cost nothing up front)
+- each year's A-Share/Options gains (``Redemption Value``) and common share
+  sale proceeds (share price times ``Common Shares Redeemed``) are inflows
+- the unsold shares are sold at the horizon year's end, at
+  ``Value of Unsold Shares`` and the common shares' market value
+
+Common shares are counted at market price, so a fall below the purchase
+price is a loss rather than floored at zero. Otherwise the undiscounted flows
+add up to the horizon year's Combined Total Value.
+
+Every function works on the whole batch at once. :func:`irr` brackets and
+bisects every scenario's rate together, like :mod:`goal_seek`, so thousands
+of scenarios cost a few dozen array passes.
+"""
+import numpy as np
+
+DEFAULT_DISCOUNT_RATE = 0.08
+
+# IRRs are searched for between these rates
+IRR_BOUNDS = (-0.99, 10.0)
+
+
+def cash_flows(results, common_price, year=None):
+    """Holder cash flows for annual :class:`ProjectionResults`, base year first.
+
+    ``common_price`` broadcasts against the results' batch shape. ``year``
+    is the horizon at which the unsold shares are valued (default: the last
+    projected year); later years are left out. Returns an array shaped
+    ``batch_shape + (years,)`` with one flow per year from the base year.
+    """
+    stop = len(results.years) if year is None else year - results.first_year + 1
+    if not 1 <= stop <= len(results.years):
+        raise ValueError(f"year must be between {results.first_year} and {int(results.years[-1])}, got {year}")
+    share_price = results['Share Price'][..., :stop]
+    common_price = np.asarray(common_price, dtype=np.float64)
+
+    flows = results['Redemption Value'][..., :stop] + share_price * results['Common Shares Redeemed'][..., :stop]
+    flows = np.broadcast_to(flows, np.broadcast_shapes(flows.shape, common_price.shape + (1,))).copy()
+    flows[..., 0] -= common_price * results['Unsold Common Shares'][..., 0]
+    flows[..., -1] += results['Value of Unsold Shares'][..., stop-1] + share_price[..., -1] * results['Unsold Common Shares'][..., stop-1]
+    return flows
+
+
+def npv(flows, rate):
+    """Net present value at the base year of :func:`cash_flows` discounted at ``rate`` a year.
+
+    ``rate`` broadcasts against the flows' batch shape, so one call can value
+    many rates or scenarios.
+    """
+    rate = np.asarray(rate, dtype=np.float64)[..., None]
+    discount = (1 + rate) ** -np.arange(np.shape(flows)[-1])
+    return (flows * discount).sum(axis=-1)
+
+
+def _npv_horner(flows_by_year, rate):
+    # npv() by Horner's rule in 1 / (1 + rate): a multiply-add per year instead of a power.
+    # Years come first here, so each year's flows are one contiguous block
+    factor = 1 / (1 + rate)
+    value = flows_by_year[-1]
+    for year_flows in flows_by_year[-2::-1]:
+        value = value * factor + year_flows
+    return value
+
+
+def irr(flows, bounds=IRR_BOUNDS, n_scan=45, xtol=1e-10, max_iter=100):
+    """Internal rate of return of every scenario's :func:`cash_flows`.
+
+    The first rate within ``bounds`` where the NPV changes sign is found on
+    an ``n_scan`` point grid and narrowed by bisection to within ``xtol``, for
+    all scenarios at once. NaN where there is none, e.g. for holders with no
+    outlay (A-Share/Options only) or who never get their money back.
+    """
+    flows = np.asarray(flows, dtype=np.float64)
+    low, high = bounds
+    # Evenly spaced in log(1 + rate), so finer for low and negative rates
+    grid = np.expm1(np.linspace(np.log1p(low), np.log1p(high), n_scan))
+    # One matrix product values every scenario at every grid rate
+    values = flows @ ((1 + grid[:, None]) ** -np.arange(flows.shape[-1])).T
+
+    crossing = (np.sign(values[..., :-1]) * np.sign(values[..., 1:])) <= 0
+    # Flows that are all zero have an NPV of zero at every rate, but no IRR
+    solved = crossing.any(axis=-1) & np.any(flows != 0, axis=-1)
+    first = np.argmax(crossing, axis=-1)
+    lower, upper = grid[first], grid[first + 1]
+    lower_value = np.take_along_axis(values, first[..., None], axis=-1)[..., 0]
+
+    flows_by_year = np.ascontiguousarray(np.moveaxis(flows, -1, 0))
+    for _ in range(max_iter):
+        if np.all(upper - lower <= xtol):
+            break
+        middle = 0.5 * (lower + upper)
+        middle_value = _npv_horner(flows_by_year, middle)
+        same_side = np.sign(middle_value) == np.sign(lower_value)
+        lower = np.where(same_side, middle, lower)
+        lower_value = np.where(same_side, middle_value, lower_value)
+        upper = np.where(same_side, upper, middle)
+
+    return np.where(solved, 0.5 * (lower + upper), np.nan)
+
+
+def present_values(results, common_price, rate, year=None):
+    """NPV at ``rate`` and IRR of every scenario in ``results``, as a dict with the ``cash_flows``."""
+    flows = cash_flows(results, common_price, year)
+    return {'cash_flows': flows, 'npv': npv(flows, rate), 'irr': irr(flows)}
+
+
+def discount_inputs(container):
+    """Discount rate widget in ``container``; returns the rate, or None while discounting is off."""
+    if not container.checkbox("Show Present Values (NPV / IRR)",
+                              help="Discount yearly cash flows and the final unsold value back to the base year"):
+        return None
+    rate = container.number_input("Discount Rate (%)", min_value=0.0, max_value=50.0,
+                                  value=DEFAULT_DISCOUNT_RATE * 100, step=0.5)
+    return rate / 100
@@ -0,0 +1,106 @@
+"""Columnar exports of engine results: Parquet, Arrow IPC and Excel.
+
+Results are exported in long format, one row per scenario and year, with a
+column per metric. Each metric column wraps the engine's float64 block
+directly (a contiguous ``batch_shape + (years,)`` slice flattens to a view),
+so only the small year and scenario label columns are built. Parquet and
+Arrow IPC need ``pyarrow``; Excel needs ``openpyxl`` or ``xlsxwriter``.
+"""
+import io
+
+import numpy as np
+
+from valuation_engine import RESULT_METRICS
+
+PARQUET_MIME = "application/vnd.apache.parquet"
+ARROW_MIME = "application/vnd.apache.arrow.file"
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Excel limits sheet names to 31 characters, without any of []:*?/\
+MAX_SHEET_NAME = 31
+INVALID_SHEET_CHARACTERS = str.maketrans({character: "-" for character in "[]:*?/\\"})
+
+
+def results_table(results, axes=(), metrics=None, first_year=None):
+    """Arrow table of a :class:`ProjectionResults` in long format.
+
+    ``axes`` labels the batch axes in order as ``(name, values)`` pairs, e.g.
+    ``[('growth_rate', growth_rates), ('option_redemption', rates)]`` for a
+    grid; each becomes a column alongside ``year`` and the ``metrics``
+    (default: all). Years before ``first_year`` (e.g. the base year) are left
+    out.
+    """
+    import pyarrow as pa
+
+    metrics = RESULT_METRICS if metrics is None else metrics
+    if len(axes) != len(results.batch_shape):
+        raise ValueError(f"expected {len(results.batch_shape)} batch axes, got {len(axes)}")
+    start = 0 if first_year is None else int(np.searchsorted(results.years, first_year))
+    years = results.years[start:]
+    n_scenarios = int(np.prod(results.batch_shape, dtype=np.int64))
+
+    columns = {}
+    for axis, (name, values) in enumerate(axes):
+        # Label of this axis for every scenario, repeated over the years
+        shape = [1] * len(results.batch_shape)
+        shape[axis] = -1
+        labels = np.broadcast_to(np.asarray(values).reshape(shape), results.batch_shape).ravel()
+        columns[name] = pa.array(np.repeat(labels, len(years)))
+    columns["year"] = pa.array(np.tile(years, n_scenarios))
+    for metric in metrics:
+        values = results[metric]
+        if start:
+            values = values[..., start:]
+        # A view of the engine block whenever the slice is contiguous
+        columns[metric] = pa.array(values.reshape(-1))
+    return pa.table(columns)
+
+
+def parquet_bytes(table):
+    """Parquet file contents of an Arrow table."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_bytes(table):
+    """Arrow IPC file (Feather v2) contents of an Arrow table."""
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def excel_bytes(sheets):
+    """Excel workbook with one sheet per ``{sheet name: DataFrame}`` entry."""
+    import pandas as pd
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name.translate(INVALID_SHEET_CHARACTERS)[:MAX_SHEET_NAME], index=False)
+    return buffer.getvalue()
+
+
+def available_formats():
+    """Export formats whose optional dependencies are installed."""
+    formats = []
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        formats += ["parquet", "arrow"]
+    for engine in ("openpyxl", "xlsxwriter"):
+        try:
+            __import__(engine)
+        except ImportError:
+            continue
+        formats.append("excel")
+        break
+    return formats
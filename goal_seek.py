@@ -0,0 +1,96 @@
+"""Batched goal seek: solve for the input that hits a target value.
+
+Answers questions like "what PBT growth gives £1m Combined Total Value by
+2030?" for many holders or targets at once. Every problem is bracketed by
+scanning a coarse grid of candidate values in one batched engine call, then
+all the brackets are narrowed together by vectorized bisection, so each step
+costs one engine call whatever the number of problems.
+"""
+import numpy as np
+
+from valuation_engine import BATCH_SETTINGS, param_arrays, project_arrays, rollup_annual
+
+# Inputs that can be solved for, with the default range searched for a solution
+DEFAULT_BOUNDS = {
+    'growth_rate': (-0.5, 1.0),
+    'option_redemption': (0.0, 1.0),
+    'common_redemption': (0.0, 1.0),
+    'strike_price': (0.0, 100.0),
+    'common_price': (0.0, 100.0),
+}
+
+# Inputs that carry years on their last axis rather than being one value per scenario
+_PERIOD_INPUTS = ('vesting', 'growth_path')
+
+
+def _with_candidates(arrays, solve_for, candidates):
+    # Add a trailing candidate axis to every batched input and put the candidates on it
+    expanded = {}
+    for key, value in arrays.items():
+        if key in BATCH_SETTINGS or value is None:
+            expanded[key] = value
+        elif key in _PERIOD_INPUTS:
+            expanded[key] = np.asarray(value, dtype=np.float64)[..., None, :]
+        else:
+            expanded[key] = np.asarray(value, dtype=np.float64)[..., None]
+    expanded[solve_for] = candidates
+    return expanded
+
+
+def _evaluate(arrays, solve_for, candidates, year, metric):
+    results = project_arrays(**_with_candidates(arrays, solve_for, candidates))
+    return rollup_annual(results, arrays.get('periods_per_year', 1)).value(year, metric)
+
+
+def goal_seek_arrays(arrays, solve_for, target, year, metric='Combined Total Value', bounds=None,
+                     n_scan=33, xtol=1e-10, max_iter=100):
+    """Solve ``metric`` at ``year`` == ``target`` for ``solve_for``, for a batch of problems.
+
+    ``arrays`` are :func:`valuation_engine.project_arrays` keyword arguments
+    (e.g. from :func:`valuation_engine.param_arrays`) and may describe many
+    holders; ``target`` broadcasts against their batch shape. The first
+    crossing found on an ``n_scan`` point grid over ``bounds`` is narrowed by
+    bisection to within ``xtol``.
+
+    Returns a dict with the solved ``value`` (NaN where the target can't be
+    reached within the bounds), a ``solved`` mask and the ``achieved`` metric
+    value at the solution.
+    """
+    if solve_for not in DEFAULT_BOUNDS:
+        raise ValueError(f"solve_for must be one of {list(DEFAULT_BOUNDS)}, got {solve_for!r}")
+    low, high = DEFAULT_BOUNDS[solve_for] if bounds is None else bounds
+
+    # Bracket: scan every problem over the same grid in one batched call
+    grid = np.linspace(low, high, n_scan)
+    batch_shape = _evaluate(arrays, solve_for, grid[:1], year, metric).shape[:-1]
+    batch_shape = np.broadcast_shapes(batch_shape, np.shape(target))
+    target = np.broadcast_to(np.asarray(target, dtype=np.float64), batch_shape)
+    gaps = np.broadcast_to(_evaluate(arrays, solve_for, grid, year, metric), batch_shape + (n_scan,)) - target[..., None]
+
+    # First grid cell whose ends straddle the target (or land on it)
+    crossing = (np.sign(gaps[..., :-1]) * np.sign(gaps[..., 1:])) <= 0
+    solved = crossing.any(axis=-1)
+    first = np.argmax(crossing, axis=-1)
+    lower = grid[first]
+    upper = grid[first + 1]
+    lower_gap = np.take_along_axis(gaps, first[..., None], axis=-1)[..., 0]
+
+    # Bisect every bracket at once; each step is one engine call over the whole batch
+    for _ in range(max_iter):
+        if np.all(upper - lower <= xtol):
+            break
+        middle = 0.5 * (lower + upper)
+        middle_gap = _evaluate(arrays, solve_for, middle[..., None], year, metric)[..., 0] - target
+        same_side = np.sign(middle_gap) == np.sign(lower_gap)
+        lower = np.where(same_side, middle, lower)
+        lower_gap = np.where(same_side, middle_gap, lower_gap)
+        upper = np.where(same_side, upper, middle)
+
+    value = np.where(solved, 0.5 * (lower + upper), np.nan)
+    achieved = _evaluate(arrays, solve_for, np.where(solved, value, low)[..., None], year, metric)[..., 0]
+    return {'value': value, 'solved': solved, 'achieved': np.where(solved, achieved, np.nan)}
+
+
+def goal_seek(params, solve_for, target, year, metric='Combined Total Value', bounds=None, **kwargs):
+    """:func:`goal_seek_arrays` for one :class:`ValuationParams`; ``target`` may be an array of targets."""
+    return goal_seek_arrays(param_arrays(params), solve_for, target, year, metric, bounds, **kwargs)
@@ -0,0 +1,163 @@
+"""Background jobs with progress reporting and cooperative cancellation.
+
+Heavy computations (large grids, simulations, cap-table runs) are started on
+a worker pool instead of the Streamlit script thread, so the page keeps
+responding while they run. Jobs report progress through a callback; the same
+callback raises :class:`JobCancelled` once the job has been cancelled, so a
+job stops at its next progress report and frees its worker.
+
+Workers are threads: NumPy releases the GIL inside its array kernels, and
+threads can share progress, cancellation flags and results without pickling.
+The runner is process-wide, like the scenario caches, and jobs are keyed so
+that identical requests from reruns or other sessions share one job.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from scenario_cache import freeze
+
+DEFAULT_WORKERS = int(os.environ.get("JOB_RUNNER_WORKERS", str(os.cpu_count() or 1)))
+# Finished jobs kept for later reruns to pick up; running jobs are never dropped
+DEFAULT_MAX_FINISHED = int(os.environ.get("JOB_RUNNER_MAX_FINISHED", "64"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once the job has been cancelled."""
+
+
+class Job:
+    """One submitted computation and its progress, status and result."""
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.finished_at = None
+        self._cancelled = threading.Event()
+        self._watchers = 0
+        self._watchers_lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Ask the job to stop; queued jobs never start, running ones stop at their next progress report."""
+        self._cancelled.set()
+
+    @property
+    def watchers(self):
+        return self._watchers
+
+    def watch(self):
+        """Register one more session waiting for this job."""
+        with self._watchers_lock:
+            self._watchers += 1
+
+    def release(self):
+        """Stop watching; the job is cancelled once no session is watching it any more.
+
+        Jobs are shared between sessions, so one session giving up on a job
+        mustn't stop it for another that is still polling it.
+        """
+        with self._watchers_lock:
+            self._watchers = max(0, self._watchers - 1)
+            if self._watchers == 0 and not self.finished:
+                self.cancel()
+
+    def report(self, done, total, message=""):
+        """Progress callback handed to the job function."""
+        if self._cancelled.is_set():
+            raise JobCancelled(self.name)
+        self.progress = min(1.0, done / total) if total else 0.0
+        self.message = message
+
+    def _run(self, func, args, kwargs):
+        if self._cancelled.is_set():
+            self._finish(CANCELLED)
+            return
+        self.status = RUNNING
+        try:
+            self.result = func(*args, progress=self.report, **kwargs)
+        except JobCancelled:
+            self._finish(CANCELLED)
+        except Exception as e:
+            self.error = e
+            self._finish(FAILED)
+        else:
+            self.progress = 1.0
+            self._finish(DONE)
+
+    def _finish(self, status):
+        self.finished_at = time.monotonic()
+        self.status = status
+
+
+class JobRunner:
+    """Thread pool that runs keyed :class:`Job` objects."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_finished=DEFAULT_MAX_FINISHED):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, name, func, *args, **kwargs):
+        """Start ``func(*args, progress=callback, **kwargs)`` unless a live job with ``key`` exists.
+
+        An existing job is reused unless it failed or was cancelled, so a
+        rerun asking for the same work gets the job already in flight or its
+        finished result.
+        """
+        key = freeze(key)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status not in (FAILED, CANCELLED) and not job.cancelled:
+                self._jobs.move_to_end(key)
+                return job
+            job = self._jobs[key] = Job(key, name)
+            self._prune()
+        self._pool.submit(job._run, func, args, kwargs)
+        return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(freeze(key))
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _prune(self):
+        finished = [key for key, job in self._jobs.items() if job.finished]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[key]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Return the process-wide job runner, creating it on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
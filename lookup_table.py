@@ -0,0 +1,149 @@
+"""Precomputed results for every slider position, memory-mapped from disk.
+
+The growth and redemption sliders move in whole percentage points, so for a
+given holder configuration (prices, shares, vesting, time step, option
+pricing) there are only a few thousand rate combinations. A lookup table holds
+the annual results of all of them, computed in one :func:`project_grid` call
+and saved as a ``.npy`` file in ``APP_LOOKUP_DIR`` (default: a
+``valuation-lookup`` folder in the system temp directory).
+
+Tables are opened with ``mmap_mode='r'``, so a slider move reads one
+contiguous block of the file, and every server process reading the same
+table shares the operating system's page cache instead of keeping its own
+copy. Files are named after a hash of their inputs, written atomically and
+never modified, so processes can build and open them concurrently. The
+directory can be cleared at any time; tables are rebuilt on demand.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+
+import numpy as np
+
+from valuation_engine import RESULT_METRICS, ProjectionResults, project_grid
+
+ENV_VAR = "APP_LOOKUP_TABLE"
+LOOKUP_DIR = os.environ.get("APP_LOOKUP_DIR", os.path.join(tempfile.gettempdir(), "valuation-lookup"))
+# Oldest tables beyond this many are deleted when a new one is built
+MAX_TABLES = int(os.environ.get("APP_LOOKUP_MAX_TABLES", "200"))
+# Tables kept open per process, least recently used closed first
+MAX_OPEN_TABLES = 32
+# Bump when the engine's results change, so stale tables are not reused
+TABLE_VERSION = 2
+
+_open_tables = OrderedDict()
+_lock = threading.Lock()
+# One lock per table being opened, so a slow build only holds up threads waiting for that table
+_path_locks = {}
+
+
+def lookup_enabled():
+    """True when lookup tables are switched on by the environment."""
+    return os.environ.get(ENV_VAR, "").lower() not in ("", "0", "false", "no")
+
+
+def slider_rates(low, high):
+    """Rates for every position of a whole-percent slider from ``low`` to ``high``."""
+    # Same arithmetic as the apps' ``slider value / 100``, so lookups match exactly
+    return np.arange(low, high + 1) / 100
+
+
+class LookupTable:
+    """Annual results for every (growth, option redemption, common redemption) rate.
+
+    ``data`` has shape ``(growth rates, option rates, common rates, metrics,
+    years)``, so each scenario's results are one contiguous block.
+    """
+
+    def __init__(self, data, years, growth_rates, option_redemption_rates, common_redemption_rates):
+        self.data = data
+        self.years = years
+        self.axes = (np.asarray(growth_rates), np.asarray(option_redemption_rates), np.asarray(common_redemption_rates))
+
+    def _index(self, axis, rate):
+        rates = self.axes[axis]
+        index = int(round((rate - rates[0]) * 100))
+        if 0 <= index < len(rates) and rates[index] == rate:
+            return index
+        return None
+
+    def results(self, growth_rate, option_redemption, common_redemption):
+        """:class:`ProjectionResults` for one slider position, or None if it is not in the table."""
+        indexes = [self._index(axis, rate) for axis, rate in enumerate((growth_rate, option_redemption, common_redemption))]
+        if None in indexes:
+            return None
+        results = ProjectionResults(self.years)
+        # Copied out of the mapping so callers get an ordinary writable array
+        results.data[...] = self.data[tuple(indexes)]
+        return results
+
+
+def table_path(params, growth_rates, option_redemption_rates, common_redemption_rates):
+    """File holding the table for ``params`` (rates ignored) over the given rate axes."""
+    base = replace(params, growth_rate=0.0, option_redemption=0.0, common_redemption=0.0)
+    key = repr((TABLE_VERSION, RESULT_METRICS, base, [np.asarray(rates).tolist() for rates in
+                (growth_rates, option_redemption_rates, common_redemption_rates)]))
+    return os.path.join(LOOKUP_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".npy")
+
+
+def build_table(path, params, growth_rates, option_redemption_rates, common_redemption_rates):
+    """Compute every rate combination and write the table to ``path`` atomically."""
+    grid = project_grid(params, growth_rates, option_redemption_rates, common_redemption_rates)
+    # Metrics x growth x option x common x years -> one contiguous block per scenario
+    data = np.ascontiguousarray(np.moveaxis(grid.data, 0, 3))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            np.save(file, data)
+        # mkstemp creates owner-only files; other server processes need to read them
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    _prune(os.path.dirname(path))
+
+
+def _prune(directory):
+    tables = [entry for entry in os.scandir(directory) if entry.name.endswith(".npy")]
+    if len(tables) <= MAX_TABLES:
+        return
+    tables.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in tables[:len(tables) - MAX_TABLES]:
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass  # Already removed by another process
+
+
+def open_table(params, growth_rates, option_redemption_rates, common_redemption_rates):
+    """:class:`LookupTable` for ``params``, built on first use and memory-mapped after that."""
+    path = table_path(params, growth_rates, option_redemption_rates, common_redemption_rates)
+    with _lock:
+        table = _open_tables.get(path)
+        if table is not None:
+            _open_tables.move_to_end(path)
+            return table
+        path_lock = _path_locks.setdefault(path, threading.Lock())
+
+    # Built and opened outside the module-wide lock; threads asking for other tables carry on
+    with path_lock:
+        with _lock:
+            table = _open_tables.get(path)
+        if table is None:
+            if not os.path.exists(path):
+                build_table(path, params, growth_rates, option_redemption_rates, common_redemption_rates)
+            years = params.start_year + np.arange(params.n_years + 1)
+            data = np.load(path, mmap_mode="r")
+            table = LookupTable(data, years, growth_rates, option_redemption_rates, common_redemption_rates)
+        with _lock:
+            _open_tables[path] = table
+            _open_tables.move_to_end(path)
+            while len(_open_tables) > MAX_OPEN_TABLES:
+                _open_tables.popitem(last=False)
+            _path_locks.pop(path, None)
+    return table
@@ -0,0 +1,121 @@
+"""Vectorized fair values for European call options.
+
+Used by the valuation engine's fair-value modes, which price the unsold
+A-Share/Options with time value instead of intrinsic value alone. Every
+function broadcasts over any mix of scenario, holder and year axes. Depends
+only on NumPy, like the engine: the normal CDF is a polynomial approximation,
+so fair values are the same on every installation.
+"""
+import numpy as np
+
+OPTION_PRICING_MODES = ("intrinsic", "black_scholes", "binomial")
+
+# Cox-Ross-Rubinstein lattice steps; the price error shrinks roughly as 1/steps
+BINOMIAL_STEPS = 100
+# Options valued together by the lattice; bounds its temporaries to a few megabytes
+BINOMIAL_CHUNK_SIZE = 4096
+
+
+def norm_cdf(x):
+    """Standard normal CDF."""
+    x = np.asarray(x, dtype=np.float64)
+    # Abramowitz & Stegun 26.2.17, absolute error below 7.5e-8
+    t = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper_tail = np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi) * poly
+    return np.where(x >= 0, 1.0 - upper_tail, upper_tail)
+
+
+def _degenerate(spot, strike, years, risk_free_rate):
+    # No volatility or no time left: the call is worth its discounted intrinsic value
+    return np.maximum(0.0, spot - strike * np.exp(-risk_free_rate * years))
+
+
+def black_scholes_call(spot, strike, years, volatility, risk_free_rate):
+    """Black-Scholes value of a European call expiring in ``years``."""
+    spot, strike, years, volatility, risk_free_rate = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (spot, strike, years, volatility, risk_free_rate))
+    )
+    live = (years > 0) & (volatility > 0) & (spot > 0) & (strike > 0)
+    # Dummy inputs where the formula doesn't apply keep the logs and divisions finite
+    safe_years = np.where(live, years, 1.0)
+    safe_vol = np.where(live, volatility, 1.0)
+    safe_spot = np.where(live, spot, 1.0)
+    safe_strike = np.where(live, strike, 1.0)
+    spread = safe_vol * np.sqrt(safe_years)
+    d1 = (np.log(safe_spot / safe_strike) + (risk_free_rate + 0.5 * safe_vol ** 2) * safe_years) / spread
+    d2 = d1 - spread
+    value = safe_spot * norm_cdf(d1) - safe_strike * np.exp(-risk_free_rate * safe_years) * norm_cdf(d2)
+    return np.where(live, value, _degenerate(spot, strike, years, risk_free_rate))
+
+
+def binomial_call(spot, strike, years, volatility, risk_free_rate, steps=BINOMIAL_STEPS):
+    """Cox-Ross-Rubinstein lattice value of a European call expiring in ``years``.
+
+    Without early exercise, rolling back through the lattice equals the
+    discounted binomial expectation of the terminal payoffs, so every option
+    is valued in one pass over the ``steps + 1`` terminal nodes with no
+    step-by-step Python loop. Options go through in chunks of
+    :data:`BINOMIAL_CHUNK_SIZE`, so the terminal nodes of a large batch never
+    need more than a few megabytes at once.
+
+    The lattice only has risk-neutral probabilities while the volatility
+    outruns the rate over a step (sigma * sqrt(dt) > |r| * dt). Options
+    outside that, with very low volatility for their rate and term, are
+    valued with :func:`black_scholes_call` instead, which the lattice
+    converges to anyway.
+    """
+    spot, strike, years, volatility, risk_free_rate = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (spot, strike, years, volatility, risk_free_rate))
+    )
+    live = (years > 0) & (volatility > 0)
+    value = np.array(_degenerate(spot, strike, years, risk_free_rate))
+    inputs = [array[live] for array in (spot, strike, years, volatility, risk_free_rate)]
+    live_values = np.empty(len(inputs[0]))
+    for start in range(0, len(live_values), BINOMIAL_CHUNK_SIZE):
+        chunk = slice(start, start + BINOMIAL_CHUNK_SIZE)
+        live_values[chunk] = _lattice_value(*(array[chunk] for array in inputs), steps)
+    value[live] = live_values
+    return value
+
+
+def _lattice_value(spot, strike, years, volatility, risk_free_rate, steps):
+    # Lattice value of a 1-D chunk of options with time and volatility left
+    dt = years / steps
+    log_up = volatility * np.sqrt(dt)
+    up, down = np.exp(log_up), np.exp(-log_up)
+    up_probability = (np.exp(risk_free_rate * dt) - down) / (up - down)
+    # Without a probability strictly between 0 and 1 the lattice has no risk-neutral measure
+    no_lattice = ~((up_probability > 0) & (up_probability < 1))
+    up_probability[no_lattice] = 0.5
+
+    # Terminal node j has j up moves out of steps; weights are binomial probabilities
+    ups = np.arange(steps + 1)
+    log_factorials = _log_factorials(steps)
+    log_choose = log_factorials[-1] - log_factorials[ups] - log_factorials[steps - ups]
+    log_weights = (
+        log_choose + ups * np.log(up_probability)[:, None] + (steps - ups) * np.log1p(-up_probability)[:, None]
+    )
+    payoffs = np.maximum(0.0, spot[:, None] * np.exp((2 * ups - steps) * log_up[:, None]) - strike[:, None])
+    value = np.exp(-risk_free_rate * years) * np.sum(np.exp(log_weights) * payoffs, axis=-1)
+    if no_lattice.any():
+        value[no_lattice] = black_scholes_call(
+            *(array[no_lattice] for array in (spot, strike, years, volatility, risk_free_rate))
+        )
+    return value
+
+
+def _log_factorials(n):
+    # log(k!) for k = 0..n
+    return np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, n + 1)))])
+
+
+def call_value(mode, spot, strike, years, volatility=0.0, risk_free_rate=0.0):
+    """Per-option value under ``mode``: one of :data:`OPTION_PRICING_MODES`."""
+    if mode == "intrinsic":
+        return np.maximum(0.0, np.asarray(spot, dtype=np.float64) - strike)
+    if mode == "black_scholes":
+        return black_scholes_call(spot, strike, years, volatility, risk_free_rate)
+    if mode == "binomial":
+        return binomial_call(spot, strike, years, volatility, risk_free_rate)
+    raise ValueError(f"option pricing must be one of {OPTION_PRICING_MODES}, got {mode!r}")
@@ -0,0 +1,300 @@
+"""Company-wide totals across every holder in a cap table.
+
+Usage::
+
+    python portfolio.py cap_table.csv --group-by cohort --top 20
+
+Reads the same cap-table CSV as ``batch_valuation.py`` and values every holder
+with the working sheet's redemption rules as one holders x years batch per
+chunk. Instead of per-holder rows it returns what treasury plans against:
+yearly totals of every metric that adds up across holders (redemption cash
+outflow, shares bought back, unsold value), the same totals grouped by any
+label column of the cap table (e.g. a grant ``cohort``), and the holders
+contributing most to a metric.
+"""
+import argparse
+import csv
+import io
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+from batch_valuation import NUMERIC_COLUMNS, REQUIRED_COLUMNS, vesting_columns
+from csv_rows import data_rows, read_header
+from option_pricing import OPTION_PRICING_MODES
+from tax import TAX_METRICS, add_tax_arguments, net_of_tax, tax_settings
+from valuation_engine import RESULT_METRICS, interpolate_vesting, project_arrays, rollup_annual, sanitize_vesting
+
+# Engine metrics that add up across holders; the share price is the same for everyone
+SUMMED_METRICS = [metric for metric in RESULT_METRICS if metric != 'Share Price']
+# What the company pays for the common shares it redeems: the share price, not just the
+# holder's gain over their purchase price
+COMMON_PROCEEDS = 'Common Redemption Proceeds'
+
+# Company-wide figures for treasury, each the sum of an options and a common share metric.
+# Redeemed A-Share/Options are settled in cash at their gain over the strike price
+TREASURY_METRICS = {
+    'Redemption Cash Outflow': ('Redemption Value', COMMON_PROCEEDS),
+    'Shares Bought Back': ('Redeemed Shares', 'Common Shares Redeemed'),
+    'Unsold Value': ('Value of Unsold Shares', 'Value of Unsold Common Shares'),
+}
+
+# Working sheet defaults for the scenario every holder is valued under
+DEFAULT_SETTINGS = {
+    'growth_rate': 0.20,
+    'option_redemption': 0.05,
+    'common_redemption': 0.05,
+    'base_price': 6.00,
+    'unsold_option_basis': "vested",
+    'periods_per_year': 1,
+    'redemption_windows_per_year': 1,
+    'option_pricing': "intrinsic",
+    'volatility': 0.0,
+    'risk_free_rate': 0.0,
+}
+
+
+@dataclass
+class CapTable:
+    """Cap-table columns as arrays, one entry per holder.
+
+    ``vesting`` is holders x years of cumulative vested A-Share/Options with
+    the working sheet's fallbacks already applied. ``labels`` holds every
+    other column of the CSV as strings, for grouping.
+    """
+
+    holder_ids: np.ndarray
+    strike_price: np.ndarray
+    grant_shares: np.ndarray
+    common_shares: np.ndarray
+    purchase_price: np.ndarray
+    vesting: np.ndarray
+    years: list
+    labels: dict
+
+    def __len__(self):
+        return len(self.holder_ids)
+
+
+def _floats(values):
+    # Empty cells become NaN so the vesting fallbacks can treat them as missing
+    return np.array([float(value) if value.strip() else np.nan for value in values], dtype=np.float64)
+
+
+def read_cap_table(source):
+    """Read a cap-table CSV from a path or a binary/text file object."""
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8") as file:
+            return read_cap_table(file)
+    if isinstance(source, (io.BufferedIOBase, io.RawIOBase)) or hasattr(source, "getbuffer"):
+        source = io.TextIOWrapper(source, encoding="utf-8", newline="")
+
+    reader = csv.reader(source)
+    header = read_header(reader, getattr(source, "name", "cap table"))
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"cap table is missing columns: {', '.join(missing)}")
+    years, vest_indexes = vesting_columns(header)
+    numeric = {name: header.index(name) for name in NUMERIC_COLUMNS}
+    # Transpose once so every column converts in a single pass
+    columns = list(zip(*data_rows(reader, len(header), numeric)))
+    if not columns:
+        raise ValueError("cap table has no holders")
+
+    grant_shares = _floats(columns[header.index('grant_shares')])
+    vesting = np.stack([_floats(columns[index]) for index in vest_indexes], axis=-1)
+    used = set(REQUIRED_COLUMNS) | {header[index] for index in vest_indexes}
+    return CapTable(
+        holder_ids=np.array(columns[header.index('holder_id')], dtype=object),
+        strike_price=_floats(columns[header.index('strike_price')]),
+        grant_shares=grant_shares,
+        common_shares=_floats(columns[header.index('common_shares')]),
+        purchase_price=_floats(columns[header.index('purchase_price')]),
+        vesting=sanitize_vesting(vesting, grant_shares),
+        years=years,
+        labels={name: np.array(columns[index], dtype=object) for index, name in enumerate(header) if name not in used},
+    )
+
+
+def value_holders(cap_table, settings, start=0, stop=None):
+    """Annual :class:`ProjectionResults` for holders ``start:stop``, batch shape ``(holders,)``."""
+    settings = dict(DEFAULT_SETTINGS, **settings)
+    rows = slice(start, stop)
+    results = project_arrays(
+        growth_rate=settings['growth_rate'],
+        option_redemption=settings['option_redemption'],
+        common_redemption=settings['common_redemption'],
+        vesting=interpolate_vesting(cap_table.vesting[rows], settings['periods_per_year']),
+        strike_price=cap_table.strike_price[rows],
+        grant_shares=cap_table.grant_shares[rows],
+        common_shares=cap_table.common_shares[rows],
+        common_price=cap_table.purchase_price[rows],
+        base_price=settings['base_price'],
+        unsold_option_basis=settings['unsold_option_basis'],
+        start_year=cap_table.years[0] - 1,
+        periods_per_year=settings['periods_per_year'],
+        redemption_windows_per_year=settings['redemption_windows_per_year'],
+        option_pricing=settings['option_pricing'],
+        volatility=settings['volatility'],
+        risk_free_rate=settings['risk_free_rate'],
+    )
+    return rollup_annual(results, settings['periods_per_year'])
+
+
+def aggregate(cap_table, settings, group_by=None, top=10, rank_metric='Combined Total Value', rank_year=None,
+              chunk_size=20000, tax=None, progress=None):
+    """Portfolio totals for every holder valued under ``settings``.
+
+    Returns a dict with:
+
+    - ``years``: the projection years, base year excluded
+    - ``totals``: ``{metric: (years,)}`` sums over all holders, for every
+      metric in :data:`SUMMED_METRICS`, the common shares' redemption
+      proceeds (:data:`COMMON_PROCEEDS`) and every :data:`TREASURY_METRICS`
+      figure
+    - ``groups`` and ``group_totals`` (when ``group_by`` names a label
+      column): the distinct labels and ``{metric: (groups, years)}`` sums
+    - ``top``: the ``top`` holders by ``rank_metric`` in ``rank_year``
+      (default: the last year), with their value and share of the total
+
+    With ``tax`` (:class:`TaxSettings`), the totals and group totals also
+    cover the net-of-tax :data:`TAX_METRICS`, which can then be ranked by too.
+
+    Holders are valued ``chunk_size`` at a time, so memory stays bounded
+    while every chunk is still a single broadcasted engine pass.
+    ``progress``, if given, is called as ``progress(holders done, holders)``
+    after each chunk (see :mod:`job_runner`).
+    """
+    if group_by is not None and group_by not in cap_table.labels:
+        raise ValueError(f"no {group_by!r} column in the cap table")
+    n_holders = len(cap_table)
+    years = np.arange(cap_table.years[0], cap_table.years[-1] + 1)
+    rank_column = len(years) - 1 if rank_year is None else int(rank_year - years[0])
+    if not 0 <= rank_column < len(years):
+        raise ValueError(f"rank_year must be between {years[0]} and {years[-1]}")
+
+    metrics = SUMMED_METRICS + [COMMON_PROCEEDS] + (TAX_METRICS if tax is not None else [])
+    if rank_metric not in metrics:
+        raise ValueError(f"can't rank by {rank_metric!r}")
+    totals = np.zeros((len(metrics), len(years)))
+    if group_by is not None:
+        groups, codes = np.unique(cap_table.labels[group_by].astype(str), return_inverse=True)
+        group_totals = np.zeros((len(metrics), len(groups) * len(years)))
+    ranking = np.empty(n_holders)
+
+    for start in range(0, n_holders, chunk_size):
+        stop = min(start + chunk_size, n_holders)
+        results = value_holders(cap_table, settings, start, stop)
+        columns = [results[metric][..., 1:] for metric in SUMMED_METRICS]
+        columns.append((results['Share Price'] * results['Common Shares Redeemed'])[..., 1:])
+        if tax is not None:
+            net = net_of_tax(results, tax)
+            columns += [net[metric][..., 1:] for metric in TAX_METRICS]
+        data = np.stack(columns)  # metrics x holders x years
+        totals += data.sum(axis=1)
+        if group_by is not None:
+            # One bincount per metric over combined (group, year) bins
+            bins = (codes[start:stop, None] * len(years) + np.arange(len(years))).ravel()
+            for row in range(len(metrics)):
+                group_totals[row] += np.bincount(bins, weights=data[row].ravel(), minlength=group_totals.shape[1])
+        ranking[start:stop] = data[metrics.index(rank_metric), :, rank_column]
+        if progress is not None:
+            progress(stop, n_holders)
+
+    summary = {'years': years, 'holders': n_holders}
+    summary['totals'] = _with_treasury_metrics({metric: totals[row] for row, metric in enumerate(metrics)})
+    if group_by is not None:
+        summary['groups'] = groups
+        summary['group_totals'] = _with_treasury_metrics(
+            {metric: group_totals[row].reshape(len(groups), len(years)) for row, metric in enumerate(metrics)}
+        )
+
+    # Partial sort: only the top holders are ordered
+    top = min(top, n_holders)
+    leaders = np.argpartition(-ranking, top - 1)[:top] if top else np.array([], dtype=np.intp)
+    leaders = leaders[np.argsort(-ranking[leaders], kind='stable')]
+    total = summary['totals'][rank_metric][rank_column]
+    summary['top'] = {
+        'holder_id': cap_table.holder_ids[leaders],
+        'value': ranking[leaders],
+        'share': ranking[leaders] / total if total else np.zeros(len(leaders)),
+        'year': int(years[rank_column]),
+        'metric': rank_metric,
+    }
+    if group_by is not None:
+        summary['top'][group_by] = cap_table.labels[group_by][leaders]
+    return summary
+
+
+def _with_treasury_metrics(columns):
+    for name, (option_metric, common_metric) in TREASURY_METRICS.items():
+        columns[name] = columns[option_metric] + columns[common_metric]
+    return columns
+
+
+def _heading(text):
+    # Headings go to stderr so stdout stays plain CSV; flush first to keep them in order
+    sys.stdout.flush()
+    print(text, file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Company-wide totals across every holder in a cap-table CSV.")
+    parser.add_argument("input", help="cap-table CSV")
+    parser.add_argument("--group-by", metavar="COLUMN", help="label column to total by, e.g. cohort")
+    parser.add_argument("--top", type=int, default=10, help="largest contributors to list (default: 10)")
+    parser.add_argument("--rank-metric", choices=SUMMED_METRICS + [COMMON_PROCEEDS] + TAX_METRICS, metavar="METRIC", default='Combined Total Value',
+                        help="metric to rank holders by (default: Combined Total Value)")
+    parser.add_argument("--rank-year", type=int, help="year to rank holders in (default: the last year)")
+    parser.add_argument("--growth-rate", type=float, default=0.20, help="PBT growth rate (default: 0.20)")
+    parser.add_argument("--option-redemption", type=float, default=0.05, help="A-Share/Options redemption rate (default: 0.05)")
+    parser.add_argument("--common-redemption", type=float, default=0.05, help="common share redemption rate (default: 0.05)")
+    parser.add_argument("--base-price", type=float, default=6.00, help="base-year share price (default: 6.00)")
+    parser.add_argument("--option-pricing", choices=OPTION_PRICING_MODES, default="intrinsic",
+                        help="value unsold options at intrinsic value or at fair value (default: intrinsic)")
+    parser.add_argument("--volatility", type=float, default=0.30, help="share price volatility for fair-value pricing (default: 0.30)")
+    parser.add_argument("--risk-free-rate", type=float, default=0.04, help="risk-free rate for fair-value pricing (default: 0.04)")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="holders per engine pass (default: 20000)")
+    add_tax_arguments(parser)
+    args = parser.parse_args(argv)
+
+    settings = dict(
+        growth_rate=args.growth_rate,
+        option_redemption=args.option_redemption,
+        common_redemption=args.common_redemption,
+        base_price=args.base_price,
+        option_pricing=args.option_pricing,
+        volatility=args.volatility,
+        risk_free_rate=args.risk_free_rate,
+    )
+    tax = tax_settings(args)
+    try:
+        cap_table = read_cap_table(args.input)
+        summary = aggregate(cap_table, settings, args.group_by, args.top, args.rank_metric, args.rank_year, args.chunk_size, tax)
+    except ValueError as e:
+        parser.error(str(e))
+    figures = list(TREASURY_METRICS) + (['Tax on Redemptions', 'Net Combined Total Value'] if tax is not None else [])
+
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    _heading(f"Totals across {summary['holders']:,} holders")
+    writer.writerow(["year"] + figures)
+    for column, year in enumerate(summary['years']):
+        writer.writerow([year] + [round(summary['totals'][name][column], 2) for name in figures])
+
+    if args.group_by:
+        _heading(f"\nTotals by {args.group_by}")
+        writer.writerow([args.group_by, "year"] + figures)
+        for index, group in enumerate(summary['groups']):
+            for column, year in enumerate(summary['years']):
+                writer.writerow([group, year] + [round(summary['group_totals'][name][index, column], 2) for name in figures])
+
+    top = summary['top']
+    _heading(f"\nTop {len(top['holder_id'])} holders by {top['metric']} in {top['year']}")
+    writer.writerow(["holder_id", top['metric'], "share"])
+    for holder_id, value, share in zip(top['holder_id'], top['value'], top['share']):
+        writer.writerow([holder_id, round(value, 2), round(share, 6)])
+
+
+if __name__ == "__main__":
+    main()
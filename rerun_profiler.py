@@ -0,0 +1,143 @@
+"""Optional per-stage timing of app reruns, with a cProfile dump on request.
+
+Off by default. Set ``APP_PROFILE=1`` in the environment, or open the app with
+``?profile=1``, to time each stage of every rerun and show the breakdown in a
+debug panel at the bottom of the page. The panel can also profile the next
+rerun with cProfile and save the stats to ``APP_PROFILE_DIR`` (default: the
+system temp directory) for ``snakeviz`` or ``python -m pstats``.
+
+Scripts call :meth:`RerunTimer.mark` at the end of each stage; each mark
+records the time since the previous one, so stages need no extra indentation
+and cost nothing when timing is off. A fragment's own reruns skip the rest of
+the script, so fragments mark a timer from :func:`fragment_timer` instead,
+which times those reruns on their own and shows them inside the fragment.
+"""
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import streamlit as st
+
+ENV_VAR = "APP_PROFILE"
+QUERY_PARAM = "profile"
+PROFILE_DIR = os.environ.get("APP_PROFILE_DIR", tempfile.gettempdir())
+
+# Functions listed in the panel's profile summary
+TOP_FUNCTIONS = 25
+
+
+def profiling_enabled():
+    """True when timing is switched on by the environment or the page URL."""
+    if os.environ.get(ENV_VAR, "").lower() not in ("", "0", "false", "no"):
+        return True
+    return st.query_params.get(QUERY_PARAM, "0").lower() not in ("", "0", "false", "no")
+
+
+class RerunTimer:
+    """Stage timings of one script or fragment run, plus its cProfile profiler if requested."""
+
+    def __init__(self, app_name, enabled, fragment=False):
+        self.app_name = app_name
+        self.enabled = enabled
+        # True for the timer of a fragment's own rerun (see fragment_timer)
+        self.fragment = fragment
+        self.stages = []
+        self.profiler = None
+        # Set once the script run's panel is shown; later marks come from fragment reruns
+        self.finished = False
+        self._started = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        """Record the time since the previous mark (or the start of the run) as ``stage``."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return time.perf_counter() - self._started
+
+
+def start_rerun(app_name):
+    """Call at the top of the script: starts timing and, if requested, the profiler."""
+    timer = RerunTimer(app_name, profiling_enabled())
+    if timer.enabled and st.session_state.pop("profile_next_rerun", False):
+        timer.profiler = cProfile.Profile()
+        timer.profiler.enable()
+    return timer
+
+
+def fragment_timer(timer, fragment_name):
+    """Timer for the marks inside a fragment; call at the top of the fragment.
+
+    During a full script run this is the script's own ``timer``. On the
+    fragment's own reruns the script timer has already been shown, so each
+    one gets a fresh timer, shown by :func:`finish_fragment`.
+    """
+    if not timer.finished:
+        return timer
+    return RerunTimer(f"{timer.app_name} {fragment_name}", timer.enabled, fragment=True)
+
+
+def finish_fragment(timer, stage):
+    """Call at the end of a fragment with the stage the script marks after it.
+
+    On the fragment's own reruns this marks ``stage`` and shows the fragment's
+    timings; during a full run the script's own mark records the stage.
+    """
+    if not (timer.fragment and timer.enabled):
+        return
+    timer.mark(stage)
+    with st.expander("Debug: Fragment Rerun Timing"):
+        _stage_table(timer, timer.total)
+
+
+def _stage_table(timer, total):
+    st.caption(f"Total {total * 1000:,.1f} ms; stages are timed from the previous mark")
+    st.dataframe(
+        {
+            "Stage": [stage for stage, _ in timer.stages],
+            "Time (ms)": [seconds * 1000 for _, seconds in timer.stages],
+            "Share of Rerun": [seconds / total for _, seconds in timer.stages],
+        },
+        hide_index=True,
+        column_config={
+            "Time (ms)": st.column_config.NumberColumn(format="%.1f"),
+            "Share of Rerun": st.column_config.ProgressColumn(format="percent", min_value=0.0, max_value=1.0),
+        },
+    )
+
+
+def finish_rerun(timer):
+    """Call at the end of the script: stops the profiler and shows the debug panel."""
+    timer.finished = True
+    if not timer.enabled:
+        return
+    profile_path = None
+    if timer.profiler is not None:
+        timer.profiler.disable()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        # Unique per run, so sessions profiling in the same second don't overwrite each other
+        profile_path = os.path.join(PROFILE_DIR, f"{timer.app_name}-{stamp}-{uuid.uuid4().hex[:8]}.prof")
+        timer.profiler.dump_stats(profile_path)
+    total = timer.total
+
+    with st.expander("Debug: Rerun Timing"):
+        _stage_table(timer, total)
+        if st.button("Profile next rerun", help="Run the page once more under cProfile and save the stats"):
+            st.session_state["profile_next_rerun"] = True
+            st.rerun()
+        if profile_path is not None:
+            st.write(f"cProfile stats for this rerun saved to `{profile_path}`")
+            with open(profile_path, "rb") as stats_file:
+                st.download_button("Download profile", stats_file.read(), file_name=os.path.basename(profile_path))
+            summary = io.StringIO()
+            pstats.Stats(profile_path, stream=summary).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            st.code(summary.getvalue(), language=None)
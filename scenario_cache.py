@@ -0,0 +1,124 @@
+"""Bounded LRU + TTL memoization for scenario calculations.
+
+Streamlit reruns the app scripts from the top on every widget change, so
+anything defined inside a script is rebuilt each time. Caches created here
+live in this imported module instead, which means they survive reruns and are
+shared by every session served by the same process.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Defaults can be tuned per deployment without code changes
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SCENARIO_CACHE_MAX_ENTRIES", "512"))
+DEFAULT_TTL_SECONDS = float(os.environ.get("SCENARIO_CACHE_TTL", "3600"))
+
+
+def freeze(value):
+    """Turn calculation inputs into a hashable cache key component."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return (value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ScenarioCache:
+    """Thread-safe LRU cache with a time-to-live and hit/miss counters."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key``, calling ``compute()`` on a miss."""
+        key = freeze(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or now - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                # Stale entry: drop it and recompute below
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # Compute outside the lock so slow scenarios don't block other sessions
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def peek(self, key, default=None):
+        """Return the cached value for ``key`` without computing or counting a lookup."""
+        key = freeze(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[0] >= self.ttl):
+                return default
+            return entry[1]
+
+    def put(self, key, value):
+        """Store ``value`` under ``key``, evicting the least recently used entries if full."""
+        key = freeze(key)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+    """Return the process-wide cache called ``name``, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = ScenarioCache(max_entries=max_entries, ttl=ttl)
+        return cache
+
+
+def clear_caches():
+    """Empty every cache created through :func:`get_cache`."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,145 @@
+"""Batched one-at-a-time (tornado) sensitivity analysis.
+
+Each input is bumped down and up while every other input stays at its base
+value. The base case and all the bumps go through the valuation engine as one
+batch, so a whole tornado costs a single projection call however many inputs
+are included.
+"""
+import numpy as np
+
+from discounting import cash_flows, npv
+from valuation_engine import interpolate_vesting, param_arrays, project_arrays, rollup_annual
+
+# Rates are bumped by an absolute amount, prices and vesting by a relative one
+RATE_INPUTS = {
+    'growth_rate': 'PBT Growth Rate',
+    'option_redemption': 'A-Share/Options Redemption Rate',
+    'common_redemption': 'Common Share Redemption Rate',
+}
+PRICE_INPUTS = {
+    'strike_price': 'Strike Price',
+    'common_price': 'Common Share Purchase Price',
+}
+
+# Unit each per-unit sensitivity is quoted in: per percentage point of a rate,
+# per £1 of a price and per 1,000 vested shares
+UNITS = {'rate': (0.01, '1% point'), 'price': (1.0, '£1'), 'vesting': (1000.0, '1,000 shares')}
+
+
+def _bumps(params, rate_bump, relative_bump):
+    # (input key, label, kind, low, high) for every input; redemption rates stay within 0-100%
+    bumps = []
+    for key, label in RATE_INPUTS.items():
+        base = getattr(params, key)
+        low, high = base - rate_bump, base + rate_bump
+        if key != 'growth_rate':
+            low, high = max(0.0, low), min(1.0, high)
+        bumps.append((key, label, 'rate', low, high))
+    for key, label in PRICE_INPUTS.items():
+        base = getattr(params, key)
+        bumps.append((key, label, 'price', base * (1 - relative_bump), base * (1 + relative_bump)))
+    annual_vesting = _annual_vesting(params)
+    for offset, vested in enumerate(annual_vesting):
+        year = params.start_year + 1 + offset
+        low = max(0.0, vested * (1 - relative_bump))
+        high = min(float(params.grant_shares), vested * (1 + relative_bump))
+        bumps.append((('vesting', offset), f'Vesting {year}', 'vesting', low, high))
+    return bumps
+
+
+def _annual_vesting(params):
+    vesting = np.asarray(params.vesting, dtype=np.float64)
+    if params.vesting_per_period:
+        return vesting[params.periods_per_year - 1::params.periods_per_year]
+    return vesting
+
+
+def sensitivity_batch(params, rate_bump=0.01, relative_bump=0.10):
+    """Project the base case and every down/up bump of ``params`` in one batch.
+
+    Returns a dict with the bumped ``inputs`` (labels), their ``kinds``,
+    ``base``/``low``/``high`` input values and the annual ``results``, whose
+    batch axis holds the base case at 0 followed by each input's low and high
+    bump (``1 + 2 * i`` and ``2 + 2 * i``). ``common_price`` holds each
+    scenario's common share purchase price, for discounting.
+    """
+    bumps = _bumps(params, rate_bump, relative_bump)
+    n_scenarios = 1 + 2 * len(bumps)
+    arrays = param_arrays(params)
+
+    # One value per scenario for every bumped scalar input
+    for key in list(RATE_INPUTS) + list(PRICE_INPUTS):
+        arrays[key] = np.full(n_scenarios, getattr(params, key), dtype=np.float64)
+
+    # Vesting is bumped one year at a time; per-period schedules bump the whole year
+    p = params.periods_per_year
+    if params.vesting_per_period:
+        vesting = np.tile(np.asarray(params.vesting, dtype=np.float64), (n_scenarios, 1))
+    else:
+        vesting = np.tile(_annual_vesting(params), (n_scenarios, 1))
+
+    base_values = []
+    for i, (key, _, kind, low, high) in enumerate(bumps):
+        for scenario, value in [(1 + 2 * i, low), (2 + 2 * i, high)]:
+            if kind != 'vesting':
+                arrays[key][scenario] = value
+            elif params.vesting_per_period:
+                # Scale the year's periods so that the year ends on the bumped value
+                block = np.s_[scenario, key[1] * p:(key[1] + 1) * p]
+                year_end = vesting[scenario, (key[1] + 1) * p - 1]
+                vesting[block] = vesting[block] * (value / year_end) if year_end else 0.0
+            else:
+                vesting[scenario, key[1]] = value
+        base_values.append(arrays[key][0] if kind != 'vesting' else _annual_vesting(params)[key[1]])
+
+    arrays['vesting'] = vesting if params.vesting_per_period else interpolate_vesting(vesting, p)
+    results = rollup_annual(project_arrays(**arrays), p)
+    return {
+        'inputs': [label for _, label, _, _, _ in bumps],
+        'kinds': [kind for _, _, kind, _, _ in bumps],
+        'base': np.array(base_values, dtype=np.float64),
+        'low': np.array([low for _, _, _, low, _ in bumps], dtype=np.float64),
+        'high': np.array([high for _, _, _, _, high in bumps], dtype=np.float64),
+        'results': results,
+        'common_price': arrays['common_price'],
+    }
+
+
+def tornado(batch, year, metric='Combined Total Value', discount_rate=None):
+    """Summarise a :func:`sensitivity_batch` at ``year``, largest swing first.
+
+    Returns a dict with the ``year``, ``metric`` and ``base_value``, plus one
+    entry per input in ``inputs``, ``low``, ``high``, ``value_low``,
+    ``value_high``, ``swing`` (value_high - value_low), ``sensitivity`` (change
+    in the metric per unit of the input) and ``unit``. With a
+    ``discount_rate`` it also has the NPV of the cash flows up to ``year``
+    (see :mod:`discounting`) in ``npv_base``, ``npv_low`` and ``npv_high``.
+    """
+    values = batch['results'].value(year, metric)
+    value_low, value_high = values[1::2], values[2::2]
+    swing = value_high - value_low
+    unit_sizes = np.array([UNITS[kind][0] for kind in batch['kinds']])
+    moved = batch['high'] - batch['low']
+    sensitivity = np.divide(swing, moved, out=np.zeros_like(swing), where=moved != 0) * unit_sizes
+
+    order = np.argsort(-np.abs(swing), kind='stable')
+    summary = {
+        'year': year,
+        'metric': metric,
+        'base_value': values[0],
+        'inputs': [batch['inputs'][i] for i in order],
+        'base': batch['base'][order],
+        'low': batch['low'][order],
+        'high': batch['high'][order],
+        'value_low': value_low[order],
+        'value_high': value_high[order],
+        'swing': swing[order],
+        'sensitivity': sensitivity[order],
+        'unit': [UNITS[batch['kinds'][i]][1] for i in order],
+    }
+    if discount_rate is not None:
+        npvs = npv(cash_flows(batch['results'], batch['common_price'], year), discount_rate)
+        summary['npv_base'] = npvs[0]
+        summary['npv_low'] = npvs[1::2][order]
+        summary['npv_high'] = npvs[2::2][order]
+    return summary
@@ -0,0 +1,50 @@
+"""Numeric table formatting shared by the apps and their downloads.
+
+Tables keep their values as numeric columns. Currency and thousands
+formatting is applied by Streamlit's column configuration in the browser, so
+columns still sort as numbers and no string is built per cell. Downloads
+round the same columns to the same number of decimals, one vectorized call per
+column, and leave the numbers unformatted for spreadsheets.
+"""
+from valuation_engine import RESULT_METRICS
+
+# Kind of column -> (Streamlit printf-style format, decimals kept in downloads)
+FORMATS = {
+    'currency': ("£%,.0f", 0),  # whole pounds with thousands separators
+    'price': ("£%.2f", 2),  # pounds and pence
+    'shares': ("%,.0f", 0),
+}
+
+# Kind of every engine metric, for tables and downloads of raw results
+METRIC_KINDS = {
+    metric: 'price' if 'Price' in metric else 'currency' if 'Value' in metric else 'shares'
+    for metric in RESULT_METRICS
+}
+
+
+def column_config(kinds, **columns):
+    """``st.dataframe`` column configuration for a ``{column: kind}`` mapping.
+
+    Extra keyword arguments are added as they are, for columns that need a
+    different configuration.
+    """
+    # Imported here so that downloads and batch jobs don't need Streamlit
+    import streamlit as st
+
+    config = {column: st.column_config.NumberColumn(format=FORMATS[kind][0]) for column, kind in kinds.items()}
+    config.update(columns)
+    return config
+
+
+def round_for_download(df, kinds):
+    """Copy of ``df`` with every column in ``kinds`` rounded as it is displayed."""
+    rounded = df.copy()
+    for column, kind in kinds.items():
+        if column in rounded:
+            rounded[column] = rounded[column].round(FORMATS[kind][1])
+    return rounded
+
+
+def table_csv(df, kinds, **kwargs):
+    """CSV text of ``df`` rounded with :func:`round_for_download`."""
+    return round_for_download(df, kinds).to_csv(**kwargs)
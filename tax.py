@@ -0,0 +1,163 @@
+"""Optional net-of-tax stage applied to engine results.
+
+The engine's values are gross. This stage taxes each tax year's proceeds
+after the projection, as array operations over every scenario, holder and
+year at once:
+
+- A-Share/Options gains (``Redemption Value``) are taxed either as income or
+  as capital gains, per ``option_treatment``. Income is taxed above an annual
+  ``income_allowance`` at ``income_tax_rate``.
+- Common share gains (``Common Redemption Value``) are capital gains.
+- Capital gains are taxed at ``capital_gains_rate`` above the
+  ``annual_exemption``. Each tax year's exemption is used against that year's
+  gains in order: option gains (when they are capital gains), then common
+  share gains, then the unsold shares. Unused exemption doesn't carry over.
+- Unsold shares are valued net of the tax a sale at the year end would incur,
+  using whatever allowance and exemption that year's redemptions left.
+
+Tax years are the projection years, so sub-annual results must be rolled up
+with :func:`rollup_annual` first.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+OPTION_TREATMENTS = ("income", "capital_gains")
+OPTION_TREATMENT_LABELS = {"Income Tax": "income", "Capital Gains Tax": "capital_gains"}
+
+# Metrics added by :func:`net_of_tax`, net counterparts of the engine's gross values
+TAX_METRICS = [
+    'Tax on Redemptions',
+    'Net Redemption Value', 'Cumulative Net Redemption Value', 'Net Value of Unsold Shares', 'Net Total Grant Value',
+    'Net Common Redemption Value', 'Cumulative Net Common Redemption Value', 'Net Value of Unsold Common Shares',
+    'Net Total Common Share Value',
+    'Net Combined Total Value',
+]
+
+
+@dataclass(frozen=True)
+class TaxSettings:
+    """Tax rates and annual allowances; frozen so they can be part of cache keys.
+
+    Defaults are UK rates for a higher-rate taxpayer (2024/25). Any field may
+    be an array that broadcasts against the results' batch shape, e.g. one
+    marginal rate per holder, but then the settings are no longer hashable.
+    """
+
+    option_treatment: str = "income"
+    income_tax_rate: float = 0.40
+    capital_gains_rate: float = 0.24
+    annual_exemption: float = 3000.0
+    income_allowance: float = 0.0
+
+    def __post_init__(self):
+        if self.option_treatment not in OPTION_TREATMENTS:
+            raise ValueError(f"option_treatment must be one of {OPTION_TREATMENTS}, got {self.option_treatment!r}")
+
+
+def _use(allowance, gains):
+    # Part of gains covered by the allowance, and the allowance left afterwards
+    used = np.minimum(allowance, np.maximum(gains, 0.0))
+    return used, allowance - used
+
+
+def net_of_tax(results, settings):
+    """Net-of-tax values for annual :class:`ProjectionResults`, as ``{metric: array}``.
+
+    Every array has the results' ``batch_shape + (years,)`` shape; the
+    metrics are listed in :data:`TAX_METRICS`.
+    """
+    def batch(value):
+        return np.asarray(value, dtype=np.float64)[..., None]
+
+    income_rate, gains_rate = batch(settings.income_tax_rate), batch(settings.capital_gains_rate)
+    option_gains = results['Redemption Value']
+    common_gains = results['Common Redemption Value']
+    unsold_options = results['Value of Unsold Shares']
+    unsold_common = results['Value of Unsold Common Shares']
+    shape = np.broadcast_shapes(option_gains.shape, income_rate.shape, gains_rate.shape,
+                                batch(settings.annual_exemption).shape, batch(settings.income_allowance).shape)
+    exemption = np.broadcast_to(batch(settings.annual_exemption), shape)
+    allowance = np.broadcast_to(batch(settings.income_allowance), shape)
+
+    # Redemptions first, options before common shares, then the unsold shares
+    if settings.option_treatment == "income":
+        option_free, allowance = _use(allowance, option_gains)
+        option_tax = income_rate * (option_gains - option_free)
+    else:
+        option_free, exemption = _use(exemption, option_gains)
+        option_tax = gains_rate * (option_gains - option_free)
+    common_free, exemption = _use(exemption, common_gains)
+    common_tax = gains_rate * (common_gains - common_free)
+
+    if settings.option_treatment == "income":
+        unsold_options_free, _ = _use(allowance, unsold_options)
+        unsold_options_tax = income_rate * (unsold_options - unsold_options_free)
+    else:
+        unsold_options_free, exemption = _use(exemption, unsold_options)
+        unsold_options_tax = gains_rate * (unsold_options - unsold_options_free)
+    unsold_common_free, _ = _use(exemption, unsold_common)
+    unsold_common_tax = gains_rate * (unsold_common - unsold_common_free)
+
+    net = {'Tax on Redemptions': option_tax + common_tax}
+    net['Net Redemption Value'] = option_gains - option_tax
+    net['Cumulative Net Redemption Value'] = np.cumsum(net['Net Redemption Value'], axis=-1)
+    net['Net Value of Unsold Shares'] = unsold_options - unsold_options_tax
+    net['Net Total Grant Value'] = net['Cumulative Net Redemption Value'] + net['Net Value of Unsold Shares']
+    net['Net Common Redemption Value'] = common_gains - common_tax
+    net['Cumulative Net Common Redemption Value'] = np.cumsum(net['Net Common Redemption Value'], axis=-1)
+    net['Net Value of Unsold Common Shares'] = unsold_common - unsold_common_tax
+    net['Net Total Common Share Value'] = net['Cumulative Net Common Redemption Value'] + net['Net Value of Unsold Common Shares']
+    net['Net Combined Total Value'] = net['Net Total Grant Value'] + net['Net Total Common Share Value']
+    return net
+
+
+def tax_inputs(container):
+    """Widgets for the tax stage in ``container``; returns :class:`TaxSettings`, or None while it is off."""
+    if not container.checkbox("Show Net of Tax Values", help="Apply income tax and capital gains tax to the proceeds"):
+        return None
+    treatment = container.selectbox(
+        "A-Share/Options Gains Taxed As", list(OPTION_TREATMENT_LABELS),
+        help="Unapproved options are usually taxed as income; approved schemes such as EMI as capital gains"
+    )
+    col1, col2 = container.columns(2)
+    income_tax_rate = col1.number_input("Income Tax (%)", min_value=0.0, max_value=100.0, value=40.0, step=1.0)
+    capital_gains_rate = col2.number_input("Capital Gains Tax (%)", min_value=0.0, max_value=100.0, value=24.0, step=1.0)
+    annual_exemption = col1.number_input("CGT Exemption (£)", min_value=0.0, value=3000.0, step=500.0, format="%.0f",
+                                         help="Capital gains tax-free each year")
+    income_allowance = col2.number_input("Income Allowance (£)", min_value=0.0, value=0.0, step=500.0, format="%.0f",
+                                         help="Option income tax-free each year, e.g. unused personal allowance")
+    return TaxSettings(
+        option_treatment=OPTION_TREATMENT_LABELS[treatment],
+        income_tax_rate=income_tax_rate / 100,
+        capital_gains_rate=capital_gains_rate / 100,
+        annual_exemption=annual_exemption,
+        income_allowance=income_allowance,
+    )
+
+
+def add_tax_arguments(parser):
+    """Command-line options for the tax stage, shared by the batch tools."""
+    group = parser.add_argument_group("tax", "net-of-tax values (off unless --net-of-tax is given)")
+    group.add_argument("--net-of-tax", action="store_true", help="add net-of-tax values to the output")
+    group.add_argument("--option-treatment", choices=OPTION_TREATMENTS, default="income",
+                       help="tax A-Share/Options gains as income or capital gains (default: income)")
+    group.add_argument("--income-tax-rate", type=float, default=0.40, help="income tax rate (default: 0.40)")
+    group.add_argument("--capital-gains-rate", type=float, default=0.24, help="capital gains tax rate (default: 0.24)")
+    group.add_argument("--annual-exemption", type=float, default=3000.0,
+                       help="capital gains tax-free amount per year (default: 3000)")
+    group.add_argument("--income-allowance", type=float, default=0.0,
+                       help="option income tax-free per year, e.g. unused personal allowance (default: 0)")
+
+
+def tax_settings(args):
+    """:class:`TaxSettings` from :func:`add_tax_arguments` options, or None when tax is off."""
+    if not args.net_of_tax:
+        return None
+    return TaxSettings(
+        option_treatment=args.option_treatment,
+        income_tax_rate=args.income_tax_rate,
+        capital_gains_rate=args.capital_gains_rate,
+        annual_exemption=args.annual_exemption,
+        income_allowance=args.income_allowance,
+    )
@@ -0,0 +1,24 @@
+import numpy as np
+
+from option_pricing import binomial_call, black_scholes_call
+
+
+def test_binomial_call_stays_above_lower_bound_at_low_volatility():
+    # sigma * sqrt(dt) <= r * dt: the lattice has no risk-neutral probabilities here
+    spot, strike, years, volatility, rate = 10.0, 6.0, 10.0, 0.02, 0.10
+
+    value = binomial_call(spot, strike, years, volatility, rate)
+
+    assert value >= spot - strike * np.exp(-rate * years)
+    np.testing.assert_allclose(value, black_scholes_call(spot, strike, years, volatility, rate))
+
+
+def test_binomial_call_converges_to_black_scholes():
+    spot = np.array([10.0, 10.0, 6.0])
+    volatility = np.array([0.01, 0.30, 0.50])
+    rate = np.array([0.04, 0.04, 0.0])
+
+    np.testing.assert_allclose(
+        binomial_call(spot, 6.0, 10.0, volatility, rate), black_scholes_call(spot, 6.0, 10.0, volatility, rate),
+        rtol=1e-2,
+    )
@@ -0,0 +1,33 @@
+import io
+
+import numpy as np
+import pytest
+
+from portfolio import aggregate, read_cap_table
+
+# One holder, fully vested from the first year, valued under the working sheet defaults:
+# base price 6.00 growing 20% a year, 5% of options and common shares redeemed a year
+# from the second projected year
+ONE_HOLDER = """holder_id,strike_price,grant_shares,common_shares,purchase_price,cohort,vest_2025,vest_2026,vest_2027
+H1,5.0,1000,1000,2.0,A,1000,1000,1000
+"""
+
+
+def test_redemption_cash_outflow_pays_share_price_for_common_shares():
+    summary = aggregate(read_cap_table(io.StringIO(ONE_HOLDER)), {})
+
+    # 2026: price 8.64; 50 options settled at 8.64 - 5.00, 50 common shares bought at 8.64
+    # 2027: price 10.368; 47.5 of each of the remaining shares
+    outflow_2026 = 50 * (8.64 - 5.0) + 50 * 8.64
+    outflow_2027 = 47.5 * (10.368 - 5.0) + 47.5 * 10.368
+    np.testing.assert_allclose(summary['totals']['Redemption Cash Outflow'], [0.0, outflow_2026, outflow_2027])
+    np.testing.assert_allclose(summary['totals']['Shares Bought Back'], [0.0, 100.0, 95.0])
+
+
+def test_share_price_is_not_summed():
+    summary = aggregate(read_cap_table(io.StringIO(ONE_HOLDER)), {}, group_by='cohort')
+
+    assert 'Share Price' not in summary['totals']
+    assert 'Share Price' not in summary['group_totals']
+    with pytest.raises(ValueError):
+        aggregate(read_cap_table(io.StringIO(ONE_HOLDER)), {}, rank_metric='Share Price')
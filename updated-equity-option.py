@@ -1,14 +1,78 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import altair as alt
+
+from background_jobs import background_result, release_background
+from discounting import discount_inputs, present_values
+from exports import (
+    ARROW_MIME, EXCEL_MIME, PARQUET_MIME, arrow_bytes, available_formats, excel_bytes, parquet_bytes, results_table,
+)
+from lookup_table import lookup_enabled, open_table, slider_rates
+from scenario_cache import get_cache
+from goal_seek import DEFAULT_BOUNDS, goal_seek
+from monte_carlo import simulate
+from rerun_profiler import finish_rerun, start_rerun
+from sensitivity import PRICE_INPUTS, RATE_INPUTS, sensitivity_batch, tornado
+from table_format import METRIC_KINDS, column_config, table_csv
+from tax import net_of_tax, tax_inputs
+from valuation_engine import ValuationParams, project, project_grid, project_periods
+from vesting_rules import compile_vesting, rule_inputs
 
 # Set page title and configuration
 st.set_page_config(page_title="Equity Option Calculator", layout="wide")
 st.title("Equity Option Calculator")
 
+# Optional per-stage timing of this rerun (APP_PROFILE=1 or ?profile=1)
+rerun_timer = start_rerun("equity-option")
+
 # Sidebar for inputs
 st.sidebar.header("Input Parameters")
 
+# Projection horizon: base year plus the number of projected years
+start_year = int(st.sidebar.number_input(
+    "Base Year",
+    min_value=2000,
+    max_value=2100,
+    value=2024,
+    step=1,
+    help="Share price starts at the strike price in this year; nothing is redeemed in the following year"
+))
+projection_years = st.sidebar.slider(
+    "Projection Years",
+    min_value=5,
+    max_value=50,
+    value=11,
+    step=1,
+    help="Number of years projected after the base year"
+)
+years_range = range(start_year + 1, start_year + projection_years + 1)
+first_year, final_year = years_range[0], years_range[-1]
+
+# Model time step: finer steps convert the annual rates to per-period rates and
+# roll the results back up to years for the tables and charts
+TIME_STEPS = {"Annual": 1, "Quarterly": 4, "Monthly": 12}
+time_step = st.sidebar.selectbox(
+    "Time Step",
+    list(TIME_STEPS),
+    help="Resolution of the projection; vesting is spread evenly over each year"
+)
+periods_per_year = TIME_STEPS[time_step]
+redemption_windows = st.sidebar.selectbox(
+    "Redemption Windows",
+    [name for name, periods in TIME_STEPS.items() if periods_per_year % periods == 0],
+    help="How often shares are redeemed; the annual redemption rate is split evenly across the windows"
+)
+redemption_windows_per_year = TIME_STEPS[redemption_windows]
+
+# Optionally precompute every growth and redemption slider position once per holder
+# configuration, so slider moves become lookups (APP_LOOKUP_TABLE=1 turns it on by default)
+use_lookup_table = st.sidebar.checkbox(
+    "Precompute All Slider Positions",
+    value=lookup_enabled(),
+    help="Values every growth and redemption rate combination at once and reads slider moves from a table on disk shared by all sessions"
+)
+
 # Get redemption percentage (0-10% in 1% increments)
 redemption_percentage = st.sidebar.slider(
     "A-Share/Options Redemption Percentage", 
@@ -48,6 +112,32 @@ total_grant_shares = st.sidebar.number_input(
     help="Total number of shares in the grant"
 )
 
+# Unsold A-Share/Options at intrinsic value, or at fair value including time value
+OPTION_PRICING = {"Intrinsic Value": "intrinsic", "Black-Scholes": "black_scholes", "Binomial Lattice": "binomial"}
+option_pricing = OPTION_PRICING[st.sidebar.selectbox(
+    "Unsold Option Valuation",
+    list(OPTION_PRICING),
+    help="Intrinsic value counts only the share price above the strike; fair value adds time value up to the end of the projection"
+)]
+option_volatility, risk_free_rate = 0.0, 0.0
+if option_pricing != "intrinsic":
+    option_volatility = st.sidebar.slider(
+        "Share Price Volatility",
+        min_value=0,
+        max_value=100,
+        value=30,
+        step=1,
+        help="Annual volatility of the share price, in %"
+    ) / 100
+    risk_free_rate = st.sidebar.slider(
+        "Risk-Free Rate",
+        min_value=0.0,
+        max_value=10.0,
+        value=4.0,
+        step=0.25,
+        help="Annual risk-free interest rate, in %"
+    ) / 100
+
 # NEW: Common Share Inputs
 st.sidebar.header("Common Share Parameters")
 
@@ -77,34 +167,25 @@ common_redemption_percentage = st.sidebar.slider(
     max_value=10,
     value=5,
     step=1,
-    help="Percentage of common shares to redeem each year starting from 2026"
+    help=f"Percentage of common shares to redeem each year starting from {first_year + 1}"
 ) / 100
 
 # Vesting schedule inputs
 st.sidebar.header("Vesting Schedule")
 vesting_method = st.sidebar.radio(
     "Vesting Method",
-    ["Default Schedule", "Custom Vesting"],
-    help="Choose default vesting schedule or set custom values"
+    ["Default Schedule", "Custom Vesting", "Vesting Rules"],
+    help="Choose default vesting schedule, set custom values or build the schedule from vesting rules"
 )
 
 # Initialize vested_shares_input dictionary
 vested_shares_input = {}
 
+# Default schedule: 6,000 shares vested in the first year, rising by 1,000 a year to 10,000
+default_vesting = {year: min(6000 + 1000 * (year - first_year), 10000) for year in years_range}
+
 if vesting_method == "Default Schedule":
-    vested_shares_input = {
-        2025: 6000,
-        2026: 7000,
-        2027: 8000,
-        2028: 9000,
-        2029: 10000,
-        2030: 10000,
-        2031: 10000,
-        2032: 10000,
-        2033: 10000,
-        2034: 10000,
-        2035: 10000
-    }
+    vested_shares_input = dict(default_vesting)
     
     # Display the default schedule
     st.sidebar.write("Default vesting schedule:")
@@ -112,6 +193,21 @@ if vesting_method == "Default Schedule":
                                     "Vested Shares": vested_shares_input.values()})
     st.sidebar.dataframe(default_schedule, hide_index=True)
     
+elif vesting_method == "Vesting Rules":
+    # Cliff, graded, performance and acceleration rules compiled to the yearly schedule
+    vesting_rules = rule_inputs(st.sidebar, years_range)
+    try:
+        compiled_vesting = compile_vesting(total_grant_shares, start_year, projection_years, **vesting_rules)
+        vested_shares_input = dict(zip(years_range, compiled_vesting.astype(np.int64).tolist()))
+    except ValueError as e:
+        st.sidebar.error(f"Invalid vesting rules: {str(e)}")
+        vested_shares_input = dict(default_vesting)
+
+    st.sidebar.write("Compiled vesting schedule:")
+    compiled_schedule = pd.DataFrame({"Year": vested_shares_input.keys(),
+                                      "Vested Shares": vested_shares_input.values()})
+    st.sidebar.dataframe(compiled_schedule, hide_index=True)
+
 else:
     # Custom vesting inputs
     st.sidebar.write("Enter vested shares for each year:")
@@ -119,20 +215,28 @@ else:
     # Use columns for more compact layout
     col1, col2 = st.sidebar.columns(2)
     
-    with col1:
-        vested_shares_input[2025] = st.number_input("2025", min_value=0, max_value=int(total_grant_shares), value=6000, step=100)
-        vested_shares_input[2026] = st.number_input("2026", min_value=0, max_value=int(total_grant_shares), value=7000, step=100)
-        vested_shares_input[2027] = st.number_input("2027", min_value=0, max_value=int(total_grant_shares), value=8000, step=100)
-        vested_shares_input[2028] = st.number_input("2028", min_value=0, max_value=int(total_grant_shares), value=9000, step=100)
-        vested_shares_input[2029] = st.number_input("2029", min_value=0, max_value=int(total_grant_shares), value=10000, step=100)
-        vested_shares_input[2030] = st.number_input("2030", min_value=0, max_value=int(total_grant_shares), value=10000, step=100)
-    
-    with col2:
-        vested_shares_input[2031] = st.number_input("2031", min_value=0, max_value=int(total_grant_shares), value=10000, step=100)
-        vested_shares_input[2032] = st.number_input("2032", min_value=0, max_value=int(total_grant_shares), value=10000, step=100)
-        vested_shares_input[2033] = st.number_input("2033", min_value=0, max_value=int(total_grant_shares), value=10000, step=100)
-        vested_shares_input[2034] = st.number_input("2034", min_value=0, max_value=int(total_grant_shares), value=10000, step=100)
-        vested_shares_input[2035] = st.number_input("2035", min_value=0, max_value=int(total_grant_shares), value=10000, step=100)
+    # First half of the years in the left column, the rest in the right
+    split = (len(years_range) + 1) // 2
+    for column, column_years in [(col1, years_range[:split]), (col2, years_range[split:])]:
+        with column:
+            for year in column_years:
+                vested_shares_input[year] = st.number_input(
+                    f"{year}",
+                    min_value=0,
+                    max_value=int(total_grant_shares),
+                    value=min(default_vesting[year], int(total_grant_shares)),
+                    step=100
+                )
+
+# Optional tax stage: net-of-tax values shown alongside the gross ones (tax.py)
+st.sidebar.header("Tax")
+tax_settings = tax_inputs(st.sidebar)
+
+# Optional discounting: NPV and IRR of the yearly cash flows (discounting.py)
+st.sidebar.header("Discounting")
+discount_rate = discount_inputs(st.sidebar)
+
+rerun_timer.mark("Sidebar inputs")
 
 # Display the main parameters
 st.write("### A-Share/Options Parameters")
@@ -148,152 +252,116 @@ st.write(f"- **Common Share Purchase Price**: £{common_purchase_price:.2f}")
 st.write(f"- **Total Common Shares**: {total_common_shares:,}")
 
 try:
-    # Calculate values with specific redemption and growth rates WITHOUT ANY ROUNDING
-    def calculate_values(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price):
-        # Initialize dataframe for years 2024-2035
-        years = list(range(2024, 2036))
-        df = pd.DataFrame(index=years)
-        
-        # Initialize all columns with zeros to ensure consistency
+    # Column order of the detailed results table
+    RESULT_COLUMNS = [
         # Option shares columns
-        df['Share Price'] = 0.0
-        df['Vested Shares'] = 0
-        df['Vested Unsold Shares'] = 0.0
-        df['Redeemed Shares'] = 0.0
-        df['Cumulative Redeemed'] = 0.0
-        df['Unsold Shares'] = 0.0
-        df['Redemption Value'] = 0.0
-        df['Cumulative Redemption Value'] = 0.0
-        df['Value of Unsold Shares'] = 0.0
-        df['Total Grant Value'] = 0.0
-        
+        'Share Price', 'Vested Shares', 'Vested Unsold Shares', 'Redeemed Shares',
+        'Cumulative Redeemed', 'Unsold Shares', 'Redemption Value',
+        'Cumulative Redemption Value', 'Value of Unsold Shares', 'Total Grant Value',
         # Common shares columns
-        df['Common Shares Redeemed'] = 0.0
-        df['Cumulative Common Redeemed'] = 0.0
-        df['Unsold Common Shares'] = 0.0
-        df['Common Redemption Value'] = 0.0
-        df['Cumulative Common Redemption Value'] = 0.0
-        df['Value of Unsold Common Shares'] = 0.0
-        df['Total Common Share Value'] = 0.0
-        
+        'Common Shares Redeemed', 'Cumulative Common Redeemed', 'Unsold Common Shares',
+        'Common Redemption Value', 'Cumulative Common Redemption Value',
+        'Value of Unsold Common Shares', 'Total Common Share Value',
         # Combined total value
-        df['Combined Total Value'] = 0.0
-        
-        # Initial values for 2024
-        df.loc[2024, 'Share Price'] = strike_price
-        df.loc[2024, 'Vested Shares'] = 0
-        df.loc[2024, 'Vested Unsold Shares'] = 0
-        df.loc[2024, 'Redeemed Shares'] = 0
-        df.loc[2024, 'Cumulative Redeemed'] = 0
-        df.loc[2024, 'Unsold Shares'] = total_grant_shares
-        df.loc[2024, 'Redemption Value'] = 0.0
-        df.loc[2024, 'Cumulative Redemption Value'] = 0.0
-        df.loc[2024, 'Value of Unsold Shares'] = 0.0
-        df.loc[2024, 'Total Grant Value'] = 0.0
-        
-        # Initial values for common shares in 2024
-        df.loc[2024, 'Common Shares Redeemed'] = 0
-        df.loc[2024, 'Cumulative Common Redeemed'] = 0
-        df.loc[2024, 'Unsold Common Shares'] = common_shares
-        df.loc[2024, 'Common Redemption Value'] = 0.0
-        df.loc[2024, 'Cumulative Common Redemption Value'] = 0.0
-        df.loc[2024, 'Value of Unsold Common Shares'] = 0.0
-        df.loc[2024, 'Total Common Share Value'] = 0.0
-        df.loc[2024, 'Combined Total Value'] = 0.0
-        
-        # Year 2025 calculations (no redemption in first year)
-        # Exact share price calculation: previous price * (1 + growth rate)
-        df.loc[2025, 'Share Price'] = df.loc[2024, 'Share Price'] * (1 + growth_pct)
-        df.loc[2025, 'Vested Shares'] = vesting_input[2025]
-        df.loc[2025, 'Redeemed Shares'] = 0
-        df.loc[2025, 'Cumulative Redeemed'] = 0
-        df.loc[2025, 'Vested Unsold Shares'] = df.loc[2025, 'Vested Shares'] - df.loc[2025, 'Cumulative Redeemed']
-        df.loc[2025, 'Unsold Shares'] = df.loc[2024, 'Unsold Shares']
-        share_price_diff = max(0, df.loc[2025, 'Share Price'] - strike_price)
-        df.loc[2025, 'Redemption Value'] = 0.0
-        df.loc[2025, 'Cumulative Redemption Value'] = 0.0
-        df.loc[2025, 'Value of Unsold Shares'] = share_price_diff * df.loc[2025, 'Unsold Shares']
-        df.loc[2025, 'Total Grant Value'] = df.loc[2025, 'Cumulative Redemption Value'] + df.loc[2025, 'Value of Unsold Shares']
-        
-        # Common shares calculation for 2025 (no redemption yet)
-        df.loc[2025, 'Common Shares Redeemed'] = 0
-        df.loc[2025, 'Cumulative Common Redeemed'] = 0
-        df.loc[2025, 'Unsold Common Shares'] = common_shares
-        common_price_diff = max(0, df.loc[2025, 'Share Price'] - common_price)
-        df.loc[2025, 'Common Redemption Value'] = 0.0
-        df.loc[2025, 'Cumulative Common Redemption Value'] = 0.0
-        df.loc[2025, 'Value of Unsold Common Shares'] = common_price_diff * df.loc[2025, 'Unsold Common Shares']
-        df.loc[2025, 'Total Common Share Value'] = df.loc[2025, 'Cumulative Common Redemption Value'] + df.loc[2025, 'Value of Unsold Common Shares']
-        
-        # Combined total for 2025
-        df.loc[2025, 'Combined Total Value'] = df.loc[2025, 'Total Grant Value'] + df.loc[2025, 'Total Common Share Value']
-        
-        # Calculate for years 2026-2035
-        for year in range(2026, 2036):
-            # Exact share price calculation: previous price * (1 + growth rate)
-            # No rounding at any stage to maintain full precision
-            df.loc[year, 'Share Price'] = df.loc[year-1, 'Share Price'] * (1 + growth_pct)
-            
-            # Option Shares Calculations - according to the clarified rule
-            # Vested shares from input
-            df.loc[year, 'Vested Shares'] = vesting_input[year]
-            
-            # Redeemed shares for this year - based on PREVIOUS year's VESTED UNSOLD SHARES
-            df.loc[year, 'Redeemed Shares'] = df.loc[year-1, 'Vested Unsold Shares'] * redemption_pct
-            
-            # Update cumulative redeemed
-            df.loc[year, 'Cumulative Redeemed'] = df.loc[year-1, 'Cumulative Redeemed'] + df.loc[year, 'Redeemed Shares']
-            
-            # Vested unsold shares = vested shares - cumulative redeemed
-            df.loc[year, 'Vested Unsold Shares'] = df.loc[year, 'Vested Shares'] - df.loc[year, 'Cumulative Redeemed']
-            df.loc[year, 'Vested Unsold Shares'] = max(0, df.loc[year, 'Vested Unsold Shares'])
-            
-            # Unsold shares = total shares minus cumulative redeemed
-            df.loc[year, 'Unsold Shares'] = total_grant_shares - df.loc[year, 'Cumulative Redeemed']
-            
-            # Redemption value = (share price - strike price) * redeemed shares
-            share_price_diff = max(0, df.loc[year, 'Share Price'] - strike_price)
-            df.loc[year, 'Redemption Value'] = share_price_diff * df.loc[year, 'Redeemed Shares']
-            
-            # Cumulative redemption value
-            df.loc[year, 'Cumulative Redemption Value'] = df.loc[year-1, 'Cumulative Redemption Value'] + df.loc[year, 'Redemption Value']
-            
-            # Value of unsold shares = (share price - strike price) * unsold shares
-            df.loc[year, 'Value of Unsold Shares'] = share_price_diff * df.loc[year, 'Unsold Shares']
-            
-            # Total grant value = cumulative redemption value + value of unsold shares
-            df.loc[year, 'Total Grant Value'] = df.loc[year, 'Cumulative Redemption Value'] + df.loc[year, 'Value of Unsold Shares']
-            
-            # Common Shares Calculations - redemption starts in 2026
-            # Common shares redeemed (% of previous year's unsold common shares) - exact calculation, no rounding
-            df.loc[year, 'Common Shares Redeemed'] = df.loc[year-1, 'Unsold Common Shares'] * common_redemption_pct
-            
-            # Cumulative common shares redeemed - exact calculation, no rounding
-            df.loc[year, 'Cumulative Common Redeemed'] = df.loc[year-1, 'Cumulative Common Redeemed'] + df.loc[year, 'Common Shares Redeemed']
-            
-            # Unsold common shares - exact calculation, no rounding
-            df.loc[year, 'Unsold Common Shares'] = common_shares - df.loc[year, 'Cumulative Common Redeemed']
-            
-            # Common redemption value = (share price - common purchase price) * common shares redeemed
-            common_price_diff = max(0, df.loc[year, 'Share Price'] - common_price)
-            df.loc[year, 'Common Redemption Value'] = common_price_diff * df.loc[year, 'Common Shares Redeemed']
-            
-            # Cumulative common redemption value
-            df.loc[year, 'Cumulative Common Redemption Value'] = df.loc[year-1, 'Cumulative Common Redemption Value'] + df.loc[year, 'Common Redemption Value']
-            
-            # Value of unsold common shares
-            df.loc[year, 'Value of Unsold Common Shares'] = common_price_diff * df.loc[year, 'Unsold Common Shares']
-            
-            # Total common share value
-            df.loc[year, 'Total Common Share Value'] = df.loc[year, 'Cumulative Common Redemption Value'] + df.loc[year, 'Value of Unsold Common Shares']
-            
-            # Combined total value
-            df.loc[year, 'Combined Total Value'] = df.loc[year, 'Total Grant Value'] + df.loc[year, 'Total Common Share Value']
-        
+        'Combined Total Value',
+    ]
+
+    # Engine parameters for this calculator: the share price starts at the strike price
+    # and unsold options are valued on every unredeemed granted share
+    def valuation_params(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price):
+        return ValuationParams(
+            strike_price=strike_price,
+            grant_shares=total_grant_shares,
+            common_shares=common_shares,
+            common_price=common_price,
+            vesting=[vesting_input[year] for year in years_range],
+            growth_rate=growth_pct,
+            option_redemption=redemption_pct,
+            common_redemption=common_redemption_pct,
+            unsold_option_basis="granted",
+            start_year=start_year,
+            periods_per_year=periods_per_year,
+            redemption_windows_per_year=redemption_windows_per_year,
+            option_pricing=option_pricing,
+            volatility=option_volatility,
+            risk_free_rate=risk_free_rate,
+        )
+
+    # Calculate values with specific redemption and growth rates WITHOUT ANY ROUNDING
+    def calculate_values(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price):
+        projection = cached_projection(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price)
+
+        # Build the dataframe once from the engine's columns
+        df = pd.DataFrame({column: projection[column] for column in RESULT_COLUMNS}, index=projection.years.tolist())
+        df['Vested Shares'] = df['Vested Shares'].astype(np.int64)
         return df
 
+    # Evaluate every growth x option redemption x common redemption combination in one
+    # broadcasted pass. Results have shape (growth rates, option rates, common rates, years)
+    def calculate_grid(growth_rates, redemption_rates, common_redemption_rates, vesting_input, common_shares, common_price):
+        params = valuation_params(0.0, 0.0, vesting_input, 0.0, common_shares, common_price)
+        return project_grid(params, growth_rates, redemption_rates, common_redemption_rates)
+
+    # Results are cached across reruns and sessions, keyed on every engine input
+    results_cache = get_cache("equity-option")
+
+    def cached_values(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price):
+        params = valuation_params(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price)
+        return results_cache.get_or_compute(
+            ('values', params),
+            lambda: calculate_values(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price)
+        )
+
+    # Every slider position, precomputed and memory-mapped from disk (lookup_table.py)
+    GROWTH_SLIDER_RATES = slider_rates(0, 20)
+    REDEMPTION_SLIDER_RATES = slider_rates(0, 10)
+
+    def slider_lookup(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price):
+        params = valuation_params(0.0, 0.0, vesting_input, 0.0, common_shares, common_price)
+        table = open_table(params, GROWTH_SLIDER_RATES, REDEMPTION_SLIDER_RATES, REDEMPTION_SLIDER_RATES)
+        return table.results(growth_pct, redemption_pct, common_redemption_pct)
+
+    # Engine results behind cached_values, also used for the columnar exports
+    def cached_projection(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price):
+        if use_lookup_table:
+            # Rates between slider positions fall through to the engine
+            looked_up = slider_lookup(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price)
+            if looked_up is not None:
+                return looked_up
+        params = valuation_params(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price)
+        return results_cache.get_or_compute(('projection', params), lambda: project(params))
+
+    def cached_grid(growth_rates, redemption_rates, common_redemption_rates, vesting_input, common_shares, common_price):
+        params = valuation_params(0.0, 0.0, vesting_input, 0.0, common_shares, common_price)
+        return results_cache.get_or_compute(
+            ('grid', params, growth_rates, redemption_rates, common_redemption_rates),
+            lambda: calculate_grid(growth_rates, redemption_rates, common_redemption_rates, vesting_input, common_shares, common_price)
+        )
+
+    def background_simulation(mean_growth, volatility, n_paths, seed):
+        params = valuation_params(redemption_percentage, pbt_growth_rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price)
+        return background_result(
+            ('monte_carlo', params, mean_growth, volatility, n_paths, seed), "Simulation",
+            simulate, params, n_paths=n_paths, mean_growth=mean_growth, volatility=volatility, seed=seed
+        )
+
+    def cached_sensitivity():
+        params = valuation_params(redemption_percentage, pbt_growth_rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price)
+        return results_cache.get_or_compute(('sensitivity', params), lambda: sensitivity_batch(params))
+
+    def cached_goal_seek(solve_for, target, year, metric):
+        params = valuation_params(redemption_percentage, pbt_growth_rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price)
+        return results_cache.get_or_compute(
+            ('goal_seek', params, solve_for, target, year, metric),
+            lambda: goal_seek(params, solve_for, target, year, metric)
+        )
+
+    def cached_periods(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price):
+        params = valuation_params(redemption_pct, growth_pct, vesting_input, common_redemption_pct, common_shares, common_price)
+        return results_cache.get_or_compute(('periods', params), lambda: project_periods(params))
+
     # Main results with user-selected parameters
-    results = calculate_values(
+    results = cached_values(
         redemption_percentage, 
         pbt_growth_rate, 
         vested_shares_input, 
@@ -302,9 +370,11 @@ try:
         common_purchase_price
     )
     
+    rerun_timer.mark("calculate_values")
+
     # Display A-Share/Options results table summary only
     st.write("### Summary of A-Share/Options Value")
-    filtered_option_results = results.loc[2025:, ['Share Price', 'Cumulative Redemption Value', 'Total Grant Value']]
+    filtered_option_results = results.loc[first_year:, ['Share Price', 'Cumulative Redemption Value', 'Total Grant Value']]
     filtered_option_results = filtered_option_results.rename(columns={
         'Share Price': 'Share Repurchase Price (£)',
         'Cumulative Redemption Value': 'Proceeds from A-Share/Options Redemption (£)',
@@ -317,19 +387,21 @@ try:
     # Format indices as strings ('2025', '2026', etc.)
     display_option_df.index = display_option_df.index.map(lambda x: f'{x}')
     
-    # Format share price with 2 decimal places
-    display_option_df['Share Repurchase Price (£)'] = display_option_df['Share Repurchase Price (£)'].apply(lambda x: f"£{x:.2f}")
-    
-    # Format other columns with NO decimal places, only thousands separator
-    for col in ['Proceeds from A-Share/Options Redemption (£)', 'Total A-Share/Options Value (£)']:
-        display_option_df[col] = display_option_df[col].apply(lambda x: f"£{int(x):,}")
+    # Share price with 2 decimal places, other columns in whole pounds (truncated)
+    # with a thousands separator; the columns stay numeric and Streamlit formats them
+    option_kinds = {
+        'Share Repurchase Price (£)': 'price',
+        'Proceeds from A-Share/Options Redemption (£)': 'currency',
+        'Total A-Share/Options Value (£)': 'currency',
+    }
+    display_option_df[list(option_kinds)[1:]] = np.trunc(display_option_df[list(option_kinds)[1:]])
     
     # Display the option summary table
-    st.dataframe(display_option_df, use_container_width=True)
+    st.dataframe(display_option_df, use_container_width=True, column_config=column_config(option_kinds))
     
     # Display Common Share results table summary only
     st.write("### Summary of Common Share Value")
-    filtered_common_results = results.loc[2025:, ['Share Price', 'Cumulative Common Redemption Value', 'Total Common Share Value']]
+    filtered_common_results = results.loc[first_year:, ['Share Price', 'Cumulative Common Redemption Value', 'Total Common Share Value']]
     filtered_common_results = filtered_common_results.rename(columns={
         'Share Price': 'Share Repurchase Price (£)',
         'Cumulative Common Redemption Value': 'Proceeds from Common Share Redemption (£)',
@@ -342,21 +414,22 @@ try:
     # Format indices as strings ('2025', '2026', etc.)
     display_common_df.index = display_common_df.index.map(lambda x: f'{x}')
     
-    # Format share price with 2 decimal places
-    display_common_df['Share Repurchase Price (£)'] = display_common_df['Share Repurchase Price (£)'].apply(lambda x: f"£{x:.2f}")
-    
-    # Format other columns with NO decimal places, only thousands separator
-    for col in ['Proceeds from Common Share Redemption (£)', 'Total Common Share Value (£)']:
-        display_common_df[col] = display_common_df[col].apply(lambda x: f"£{int(x):,}")
+    # Share price with 2 decimal places, other columns in whole pounds (truncated)
+    common_kinds = {
+        'Share Repurchase Price (£)': 'price',
+        'Proceeds from Common Share Redemption (£)': 'currency',
+        'Total Common Share Value (£)': 'currency',
+    }
+    display_common_df[list(common_kinds)[1:]] = np.trunc(display_common_df[list(common_kinds)[1:]])
     
     # Display the common share summary table
-    st.dataframe(display_common_df, use_container_width=True)
+    st.dataframe(display_common_df, use_container_width=True, column_config=column_config(common_kinds))
     
     # Display Combined Total Value table
     st.write("### Combined Total Value (Options + Common Shares)")
     
-    # Filter to only show 2025 onwards and the combined value
-    filtered_combined_results = results.loc[2025:, ['Combined Total Value']]
+    # Filter to only show the projected years and the combined value
+    filtered_combined_results = results.loc[first_year:, ['Combined Total Value']]
     filtered_combined_results = filtered_combined_results.rename(columns={
         'Combined Total Value': 'Combined Total Value (£)'
     })
@@ -367,14 +440,73 @@ try:
     # Format indices as strings ('2025', '2026', etc.)
     display_combined_df.index = display_combined_df.index.map(lambda x: f'{x}')
     
-    # Format combined value with NO decimal places, only thousands separator
-    display_combined_df['Combined Total Value (£)'] = display_combined_df['Combined Total Value (£)'].apply(lambda x: f"£{int(x):,}")
+    # Combined value in whole pounds (truncated) with a thousands separator
+    combined_kinds = {'Combined Total Value (£)': 'currency'}
+    display_combined_df = np.trunc(display_combined_df)
     
     # Display the combined results table
-    st.dataframe(display_combined_df, use_container_width=True)
-    
-    # Download button for detailed results
-    csv = results.to_csv(index=True)
+    st.dataframe(display_combined_df, use_container_width=True, column_config=column_config(combined_kinds))
+
+    # Net of tax, when the tax stage is switched on in the sidebar
+    if tax_settings is not None:
+        st.write("### Net of Tax")
+        projection = cached_projection(redemption_percentage, pbt_growth_rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price)
+        net = net_of_tax(projection, tax_settings)
+        net_df = pd.DataFrame({
+            'Tax on Redemptions (£)': net['Tax on Redemptions'][1:],
+            'Net A-Share/Options Value (£)': net['Net Total Grant Value'][1:],
+            'Net Common Share Value (£)': net['Net Total Common Share Value'][1:],
+            'Combined Total Value (£)': projection['Combined Total Value'][1:],
+            'Net Combined Total Value (£)': net['Net Combined Total Value'][1:],
+        }, index=[f'{year}' for year in years_range])
+        net_kinds = dict.fromkeys(net_df.columns, 'currency')
+        st.dataframe(np.trunc(net_df), use_container_width=True, column_config=column_config(net_kinds))
+        st.caption("Unsold shares are valued net of the tax a sale at the end of each year would incur")
+
+    # Present value of the holder's cash flows, when discounting is switched on in the sidebar
+    if discount_rate is not None:
+        st.write("### Present Value")
+        projection = cached_projection(redemption_percentage, pbt_growth_rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price)
+        present = present_values(projection, common_purchase_price, discount_rate)
+        discount_factors = (1 + discount_rate) ** -np.arange(len(projection.years))
+        pv_df = pd.DataFrame({
+            'Cash Flow (£)': present['cash_flows'],
+            'Discount Factor': discount_factors,
+            'Present Value (£)': present['cash_flows'] * discount_factors,
+        }, index=[f'{year}' for year in projection.years])
+        pv_col1, pv_col2 = st.columns(2)
+        pv_col1.metric(f"NPV at {discount_rate:.1%}", f"£{present['npv']:,.0f}")
+        pv_col2.metric("IRR", "n/a" if np.isnan(present['irr']) else f"{present['irr']:.1%}")
+        pv_kinds = {'Cash Flow (£)': 'currency', 'Present Value (£)': 'currency'}
+        st.dataframe(pv_df, use_container_width=True, column_config=column_config(
+            pv_kinds, **{'Discount Factor': st.column_config.NumberColumn(format="%.4f")}
+        ))
+        st.caption(f"Common shares bought in {projection.years[0]} and every unsold share sold at the end of {final_year}; "
+                   "IRR is n/a without an up-front purchase")
+    
+    rerun_timer.mark("Summary tables")
+
+    # Period-level values behind the annual tables for quarterly/monthly time steps
+    if periods_per_year > 1:
+        with st.expander(f"{time_step} Detail"):
+            periods = cached_periods(redemption_percentage, pbt_growth_rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price)
+            # Label each period with its year and position in the year, e.g. '2025 Q1'
+            period_labels = [f"{first_year + k // periods_per_year} {time_step[0]}{k % periods_per_year + 1}" for k in range(len(periods.years) - 1)]
+            period_df = pd.DataFrame({
+                'Share Price (£)': periods['Share Price'][1:],
+                'Total A-Share/Options Value (£)': periods['Total Grant Value'][1:],
+                'Total Common Share Value (£)': periods['Total Common Share Value'][1:],
+                'Combined Total Value (£)': periods['Combined Total Value'][1:],
+            }, index=period_labels)
+            st.line_chart(period_df.drop(columns='Share Price (£)'))
+            # Pounds and pence throughout
+            period_kinds = dict.fromkeys(period_df.columns, 'price')
+            st.dataframe(period_df, use_container_width=True, column_config=column_config(period_kinds))
+
+    rerun_timer.mark("Period detail")
+
+    # Download button for detailed results, rounded as the tables display them
+    csv = table_csv(results, METRIC_KINDS, index=True)
     st.download_button(
         label="Download detailed results as CSV",
         data=csv,
@@ -382,17 +514,19 @@ try:
         mime="text/csv",
     )
     
+    rerun_timer.mark("CSV download")
+
     # CHART 1: PBT Growth fixed at 20%, varying redemption rates for Options
     st.write("### Option Grant Value at Various Redemption Rates")
     st.write("*PBT Growth Rate fixed at 20%*")
     
     # Calculate data for different redemption rates using the user's vesting schedule
-    chart1_data = pd.DataFrame(index=range(2025, 2036))
+    chart1_data = pd.DataFrame(index=years_range)
     
     # Add lines for different redemption rates
     redemption_rates = [0.0, 0.05, 0.10]
     for rate in redemption_rates:
-        results_for_rate = calculate_values(
+        results_for_rate = cached_values(
             rate, 
             0.20, 
             vested_shares_input,
@@ -400,7 +534,7 @@ try:
             total_common_shares,
             common_purchase_price
         )
-        chart1_data[f"{int(rate*100)}% Option Redemption"] = results_for_rate.loc[2025:2035, 'Total Grant Value']
+        chart1_data[f"{int(rate*100)}% Option Redemption"] = results_for_rate.loc[first_year:final_year, 'Total Grant Value']
     
     # Convert index to strings for better display
     chart1_data.index = chart1_data.index.map(str)
@@ -408,28 +542,30 @@ try:
     # Display the chart
     st.line_chart(chart1_data)
     
-    # Display 2035 values in a table for Chart 1
-    st.write("**Final 2035 Values:**")
+    # Display final year values in a table for Chart 1
+    st.write(f"**Final {final_year} Values:**")
     final_values1 = pd.DataFrame({
         'Option Redemption Rate': [f"{int(rate*100)}%" for rate in redemption_rates],
         'Total Option Value (£)': [
-            f"£{int(calculate_values(rate, 0.20, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price).loc[2035, 'Total Grant Value']):,}" 
+            int(cached_values(rate, 0.20, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price).loc[final_year, 'Total Grant Value'])
             for rate in redemption_rates
         ]
     })
-    st.table(final_values1)
+    st.dataframe(final_values1, hide_index=True, column_config=column_config({'Total Option Value (£)': 'currency'}))
     
+    rerun_timer.mark("Chart 1: option redemption rates")
+
     # CHART 2: Common Share Redemption rates comparison
     st.write("### Common Share Value at Various Redemption Rates")
     st.write("*PBT Growth Rate fixed at 20%*")
     
     # Calculate data for different common share redemption rates
-    chart2_data = pd.DataFrame(index=range(2025, 2036))
+    chart2_data = pd.DataFrame(index=years_range)
     
     # Add lines for different common redemption rates
     common_redemption_rates = [0.0, 0.05, 0.10]
     for rate in common_redemption_rates:
-        results_for_rate = calculate_values(
+        results_for_rate = cached_values(
             redemption_percentage, 
             0.20, 
             vested_shares_input,
@@ -437,7 +573,7 @@ try:
             total_common_shares,
             common_purchase_price
         )
-        chart2_data[f"{int(rate*100)}% Common Redemption"] = results_for_rate.loc[2025:2035, 'Total Common Share Value']
+        chart2_data[f"{int(rate*100)}% Common Redemption"] = results_for_rate.loc[first_year:final_year, 'Total Common Share Value']
     
     # Convert index to strings for better display
     chart2_data.index = chart2_data.index.map(str)
@@ -445,28 +581,30 @@ try:
     # Display the chart
     st.line_chart(chart2_data)
     
-    # Display 2035 values in a table for Chart 2
-    st.write("**Final 2035 Values:**")
+    # Display final year values in a table for Chart 2
+    st.write(f"**Final {final_year} Values:**")
     final_values2 = pd.DataFrame({
         'Common Share Redemption Rate': [f"{int(rate*100)}%" for rate in common_redemption_rates],
         'Total Common Share Value (£)': [
-            f"£{int(calculate_values(redemption_percentage, 0.20, vested_shares_input, rate, total_common_shares, common_purchase_price).loc[2035, 'Total Common Share Value']):,}" 
+            int(cached_values(redemption_percentage, 0.20, vested_shares_input, rate, total_common_shares, common_purchase_price).loc[final_year, 'Total Common Share Value'])
             for rate in common_redemption_rates
         ]
     })
-    st.table(final_values2)
+    st.dataframe(final_values2, hide_index=True, column_config=column_config({'Total Common Share Value (£)': 'currency'}))
     
+    rerun_timer.mark("Chart 2: common redemption rates")
+
     # CHART 3: Combined Value with different growth rates
     st.write("### Combined Total Value at Various PBT Growth Rates")
     st.write(f"*Option Redemption: {redemption_percentage*100:.0f}%, Common Redemption: {common_redemption_percentage*100:.0f}%*")
     
     # Calculate data for different growth rates
-    chart3_data = pd.DataFrame(index=range(2025, 2036))
+    chart3_data = pd.DataFrame(index=years_range)
     
     # Add lines for different growth rates
     growth_rates = [0.15, 0.20]
     for rate in growth_rates:
-        results_for_growth = calculate_values(
+        results_for_growth = cached_values(
             redemption_percentage, 
             rate, 
             vested_shares_input,
@@ -474,7 +612,7 @@ try:
             total_common_shares,
             common_purchase_price
         )
-        chart3_data[f"{int(rate*100)}% Growth"] = results_for_growth.loc[2025:2035, 'Combined Total Value']
+        chart3_data[f"{int(rate*100)}% Growth"] = results_for_growth.loc[first_year:final_year, 'Combined Total Value']
     
     # Convert index to strings for better display
     chart3_data.index = chart3_data.index.map(str)
@@ -482,21 +620,248 @@ try:
     # Display the chart
     st.line_chart(chart3_data)
     
-    # Display 2035 values in a table for Chart 3
-    st.write("**Final 2035 Values:**")
+    # Display final year values in a table for Chart 3
+    st.write(f"**Final {final_year} Values:**")
     final_values3 = pd.DataFrame({
         'Growth Rate': [f"{int(rate*100)}%" for rate in growth_rates],
         'Combined Total Value (£)': [
-            f"£{int(calculate_values(redemption_percentage, rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price).loc[2035, 'Combined Total Value']):,}" 
+            int(cached_values(redemption_percentage, rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price).loc[final_year, 'Combined Total Value'])
             for rate in growth_rates
         ]
     })
-    st.table(final_values3)
+    st.dataframe(final_values3, hide_index=True, column_config=column_config({'Combined Total Value (£)': 'currency'}))
+
+    rerun_timer.mark("Chart 3: growth rates")
+
+    # HEATMAP: final year Combined Total Value across every slider combination
+    st.write(f"### {final_year} Combined Total Value Across All Scenarios")
+    heatmap_axis = st.radio(
+        "Redemption rate shown against PBT growth",
+        ["A-Share/Options Redemption", "Common Share Redemption"],
+        horizontal=True,
+        help="The other redemption rate is held at its sidebar value"
+    )
+
+    # Every slider position: growth 0-20%, both redemption rates 0-10%
+    grid_growth_rates = np.arange(0, 21) / 100
+    grid_redemption_rates = np.arange(0, 11) / 100
+    grid = cached_grid(
+        grid_growth_rates,
+        grid_redemption_rates,
+        grid_redemption_rates,
+        vested_shares_input,
+        total_common_shares,
+        common_purchase_price
+    )
+    final_combined = grid['Combined Total Value'][..., -1]
+
+    # Hold the other redemption rate at the user's sidebar value
+    if heatmap_axis == "A-Share/Options Redemption":
+        st.write(f"*Common Redemption fixed at {common_redemption_percentage*100:.0f}%*")
+        scenario_index = np.s_[:, :, int(round(common_redemption_percentage * 100))]
+    else:
+        st.write(f"*Option Redemption fixed at {redemption_percentage*100:.0f}%*")
+        scenario_index = np.s_[:, int(round(redemption_percentage * 100)), :]
+    heatmap_values = final_combined[scenario_index]
+
+    growth_labels, redemption_labels = np.meshgrid(
+        [f"{int(round(rate*100))}%" for rate in grid_growth_rates],
+        [f"{int(round(rate*100))}%" for rate in grid_redemption_rates],
+        indexing='ij'
+    )
+    heatmap_df = pd.DataFrame({
+        'PBT Growth Rate': growth_labels.ravel(),
+        'Redemption Rate': redemption_labels.ravel(),
+        'Combined Total Value (£)': heatmap_values.ravel(),
+    })
+    heatmap_tooltip = ['PBT Growth Rate', 'Redemption Rate', alt.Tooltip('Combined Total Value (£):Q', format=',.0f')]
+
+    # NPV and IRR of every scenario in the grid, in one batched pass
+    if discount_rate is not None:
+        grid_present = present_values(grid, common_purchase_price, discount_rate)
+        heatmap_df['NPV (£)'] = grid_present['npv'][scenario_index].ravel()
+        heatmap_df['IRR'] = grid_present['irr'][scenario_index].ravel()
+        heatmap_tooltip += [alt.Tooltip('NPV (£):Q', format=',.0f'), alt.Tooltip('IRR:Q', format='.1%')]
+
+    heatmap = alt.Chart(heatmap_df).mark_rect().encode(
+        x=alt.X('Redemption Rate:O', sort=None, title=heatmap_axis),
+        y=alt.Y('PBT Growth Rate:O', sort=None),
+        color=alt.Color('Combined Total Value (£):Q', scale=alt.Scale(scheme='viridis')),
+        tooltip=heatmap_tooltip
+    )
+    st.altair_chart(heatmap, use_container_width=True)
+
+    rerun_timer.mark("Scenario heatmap")
+
+    # TORNADO: which input moves Combined Total Value the most
+    st.write("### Sensitivity of Combined Total Value")
+    st.write("*Each input bumped down and up on its own: rates by 1% point, prices and vesting by 10%*")
+    tornado_year = st.select_slider("Target Year", options=list(years_range), value=final_year)
+    tornado_data = tornado(cached_sensitivity(), tornado_year, discount_rate=discount_rate)
+
+    # One bar per bump, measured from the base case, largest swing at the top
+    tornado_df = pd.DataFrame({
+        'Input': tornado_data['inputs'] * 2,
+        'Bump': ['Low'] * len(tornado_data['inputs']) + ['High'] * len(tornado_data['inputs']),
+        'Change (£)': np.concatenate([tornado_data['value_low'], tornado_data['value_high']]) - tornado_data['base_value'],
+    })
+    tornado_chart = alt.Chart(tornado_df).mark_bar().encode(
+        x=alt.X('Change (£):Q', title=f"Change in {tornado_year} Combined Total Value (£)"),
+        y=alt.Y('Input:N', sort=tornado_data['inputs'], title=None),
+        color=alt.Color('Bump:N', scale=alt.Scale(domain=['Low', 'High'])),
+        tooltip=['Input', 'Bump', alt.Tooltip('Change (£):Q', format=',.0f')]
+    )
+    st.altair_chart(tornado_chart, use_container_width=True)
+
+    tornado_table = pd.DataFrame({
+        'Input': tornado_data['inputs'],
+        'Low': tornado_data['low'],
+        'High': tornado_data['high'],
+        'Value at Low (£)': tornado_data['value_low'],
+        'Value at High (£)': tornado_data['value_high'],
+        'Swing (£)': tornado_data['swing'],
+        'Change per Unit (£)': tornado_data['sensitivity'],
+        'Unit': tornado_data['unit'],
+    })
+    tornado_kinds = dict.fromkeys(['Value at Low (£)', 'Value at High (£)', 'Swing (£)', 'Change per Unit (£)'], 'currency')
+    if discount_rate is not None:
+        tornado_table['NPV at Low (£)'] = tornado_data['npv_low']
+        tornado_table['NPV at High (£)'] = tornado_data['npv_high']
+        tornado_kinds.update(dict.fromkeys(['NPV at Low (£)', 'NPV at High (£)'], 'currency'))
+    st.dataframe(tornado_table, use_container_width=True, hide_index=True, column_config=column_config(tornado_kinds))
+
+    rerun_timer.mark("Sensitivity")
+
+    # GOAL SEEK: solve for the input that reaches a target value, other inputs as set in the sidebar
+    st.write("### Goal Seek")
+    GOAL_SEEK_INPUTS = {label: key for key, label in {**RATE_INPUTS, **PRICE_INPUTS}.items()}
+    GOAL_SEEK_METRICS = {
+        'Combined Total Value (£)': 'Combined Total Value',
+        'Total A-Share/Options Value (£)': 'Total Grant Value',
+        'Total Common Share Value (£)': 'Total Common Share Value',
+        'Proceeds from A-Share/Options Redemption (£)': 'Cumulative Redemption Value',
+        'Proceeds from Common Share Redemption (£)': 'Cumulative Common Redemption Value',
+    }
+    seek_col1, seek_col2, seek_col3, seek_col4 = st.columns(4)
+    seek_input = seek_col1.selectbox("Solve For", list(GOAL_SEEK_INPUTS))
+    seek_metric = seek_col2.selectbox("Target Value", list(GOAL_SEEK_METRICS))
+    seek_year = seek_col3.selectbox("By Year", list(years_range), index=min(5, len(years_range) - 1))
+    seek_target = seek_col4.number_input("Target (£)", min_value=0.0, value=1000000.0, step=50000.0, format="%.0f")
+
+    seek = cached_goal_seek(GOAL_SEEK_INPUTS[seek_input], seek_target, seek_year, GOAL_SEEK_METRICS[seek_metric])
+    if seek['solved']:
+        solution = float(seek['value'])
+        solution_text = f"{solution*100:.2f}%" if GOAL_SEEK_INPUTS[seek_input] in RATE_INPUTS else f"£{solution:,.2f}"
+        st.success(f"A {seek_input} of **{solution_text}** gives {seek_metric.replace(' (£)', '')} of £{float(seek['achieved']):,.0f} in {seek_year}")
+    else:
+        low, high = DEFAULT_BOUNDS[GOAL_SEEK_INPUTS[seek_input]]
+        st.warning(f"No {seek_input} between {low:g} and {high:g} reaches £{seek_target:,.0f} {seek_metric.replace(' (£)', '')} in {seek_year}")
+
+    rerun_timer.mark("Goal seek")
+
+    # EXPORT: yearly results and the scenario grid for downstream tools; files are only
+    # built when their download button is clicked
+    st.write("### Export")
+    def detail_table():
+        projection = cached_projection(redemption_percentage, pbt_growth_rate, vested_shares_input, common_redemption_percentage, total_common_shares, common_purchase_price)
+        return results_table(projection, metrics=RESULT_COLUMNS)
+
+    def scenario_grid_table():
+        axes = [
+            ('PBT Growth Rate', grid_growth_rates),
+            ('A-Share/Options Redemption Rate', grid_redemption_rates),
+            ('Common Share Redemption Rate', grid_redemption_rates),
+        ]
+        return results_table(grid, axes, metrics=RESULT_COLUMNS, first_year=first_year)
+
+    def export_workbook():
+        # One sheet per analysis on this page
+        sheets = {
+            'A-Share/Options Value': filtered_option_results.rename_axis('Year').reset_index(),
+            'Common Share Value': filtered_common_results.rename_axis('Year').reset_index(),
+            'Combined Total Value': filtered_combined_results.rename_axis('Year').reset_index(),
+            'Detailed Results': detail_table().to_pandas(),
+            'Option Redemption Rates': final_values1,
+            'Common Redemption Rates': final_values2,
+            'Growth Rates': final_values3,
+            'Scenario Grid': scenario_grid_table().to_pandas(),
+            'Sensitivity': tornado_table,
+        }
+        return excel_bytes(sheets)
+
+    export_formats = available_formats()
+    if "parquet" in export_formats:
+        export_col1, export_col2, export_col3 = st.columns(3)
+        export_col1.download_button("Yearly results (Parquet)", lambda: parquet_bytes(detail_table()), file_name="equity_redemption_results.parquet", mime=PARQUET_MIME)
+        export_col1.download_button("Yearly results (Arrow IPC)", lambda: arrow_bytes(detail_table()), file_name="equity_redemption_results.arrow", mime=ARROW_MIME)
+        export_col2.download_button("Scenario grid (Parquet)", lambda: parquet_bytes(scenario_grid_table()), file_name="equity_scenarios.parquet", mime=PARQUET_MIME)
+        export_col2.download_button("Scenario grid (Arrow IPC)", lambda: arrow_bytes(scenario_grid_table()), file_name="equity_scenarios.arrow", mime=ARROW_MIME)
+        if "excel" in export_formats:
+            export_col3.download_button("Excel workbook", export_workbook, file_name="equity_redemption.xlsx", mime=EXCEL_MIME)
+        else:
+            export_col3.caption("Install openpyxl for the Excel workbook.")
+    else:
+        st.caption("Install pyarrow for Parquet, Arrow IPC and Excel exports.")
+
+    rerun_timer.mark("Export")
+
+    # MONTE CARLO: stochastic PBT growth instead of a constant rate
+    st.write("### Monte Carlo Simulation of PBT Growth")
+    run_simulation = st.checkbox(
+        "Run simulation",
+        help="Draw random yearly growth rates and show the spread of outcomes"
+    )
+    if run_simulation:
+        sim_col1, sim_col2, sim_col3, sim_col4 = st.columns(4)
+        simulation_mean = sim_col1.slider("Mean PBT Growth", min_value=0, max_value=30, value=int(round(pbt_growth_rate * 100)), step=1) / 100
+        simulation_volatility = sim_col2.slider("Growth Volatility", min_value=0, max_value=50, value=15, step=1) / 100
+        simulation_paths = sim_col3.select_slider("Simulated Paths", options=[1000, 10000, 50000, 100000], value=10000)
+        simulation_seed = int(sim_col4.number_input("Random Seed", min_value=0, value=42, step=1))
+
+        # Runs in the background; results appear once the job finishes
+        simulation = background_simulation(simulation_mean, simulation_volatility, simulation_paths, simulation_seed)
+        if simulation is not None:
+            band_labels = [f"P{percentile}" for percentile in simulation['percentiles']]
+            st.write(f"*Option Redemption: {redemption_percentage*100:.0f}%, Common Redemption: {common_redemption_percentage*100:.0f}%, {simulation_paths:,} paths*")
+
+            # Percentile bands of Combined Total Value over time
+            simulation_chart = pd.DataFrame(
+                simulation['Combined Total Value'][:, 1:].T,
+                index=[str(year) for year in simulation['years'][1:]],
+                columns=band_labels
+            )
+            st.line_chart(simulation_chart)
+
+            # Final year bands for each value
+            st.write(f"**Final {simulation['years'][-1]} Values:**")
+            simulation_table = pd.DataFrame({
+                'Value': ['Total Option Value (£)', 'Total Common Share Value (£)', 'Combined Total Value (£)'],
+                **{
+                    label: [int(simulation[metric][band, -1]) for metric in ['Total Grant Value', 'Total Common Share Value', 'Combined Total Value']]
+                    for band, label in enumerate(band_labels)
+                }
+            })
+            st.dataframe(simulation_table, hide_index=True, column_config=column_config(dict.fromkeys(band_labels, 'currency')))
+    else:
+        release_background("Simulation")
 
 except Exception as e:
     st.error(f"An error occurred in the calculation: {str(e)}")
     st.write("Please check your inputs and try again.")
 
+rerun_timer.mark("Monte Carlo")
+
+# Cache statistics, to help size the cache for concurrent users
+with st.sidebar.expander("Cache Statistics"):
+    cache_stats = get_cache("equity-option").stats()
+    st.write(f"- **Hits**: {cache_stats['hits']:,}")
+    st.write(f"- **Misses**: {cache_stats['misses']:,}")
+    st.write(f"- **Hit Rate**: {cache_stats['hit_rate']*100:.1f}%")
+    st.write(f"- **Entries**: {cache_stats['entries']:,} of {cache_stats['max_entries']:,}")
+    st.write(f"- **Evictions**: {cache_stats['evictions']:,}, **Expired**: {cache_stats['expirations']:,}")
+
 # Add a footer
 st.markdown("---")
 st.caption("Equity Option Calculator © 2025")
+rerun_timer.mark("Cache statistics and footer")
+finish_rerun(rerun_timer)
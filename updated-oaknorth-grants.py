@@ -1,6 +1,31 @@
+import hashlib
+import io
+from dataclasses import replace
+
 import streamlit as st
 import pandas as pd
 import numpy as np
+import altair as alt
+
+from background_jobs import background_result, release_background
+from discounting import discount_inputs, present_values
+from exports import (
+    ARROW_MIME, EXCEL_MIME, PARQUET_MIME, arrow_bytes, available_formats, excel_bytes, parquet_bytes, results_table,
+)
+from lookup_table import lookup_enabled, open_table, slider_rates
+from scenario_cache import freeze, get_cache
+from goal_seek import DEFAULT_BOUNDS, goal_seek
+from monte_carlo import simulate
+from portfolio import aggregate, read_cap_table
+from rerun_profiler import finish_fragment, finish_rerun, fragment_timer, start_rerun
+from sensitivity import PRICE_INPUTS, RATE_INPUTS, sensitivity_batch, tornado
+from table_format import column_config
+from tax import net_of_tax, tax_inputs
+from valuation_engine import (
+    ValuationParams, project, project_grid, project_grid_periods, project_periods, reproject_grid_periods,
+    reproject_periods, rollup_annual,
+)
+from vesting_rules import compile_vesting, rule_inputs, validate_vesting
 
 # Set page config first before any other Streamlit commands
 st.set_page_config(
@@ -13,9 +38,56 @@ st.set_page_config(
 st.title("OakNorth Grants Working Sheet")
 st.markdown("This working sheet allows you to analyze the impact of different growth and share redemption rates on OakNorth grants value.")
 
+# Optional per-stage timing of this rerun (APP_PROFILE=1 or ?profile=1)
+rerun_timer = start_rerun("oaknorth-grants")
+
 # Sidebar for inputs
 st.sidebar.header("Input Parameters")
 
+# Projection horizon: base year plus the number of projected years
+start_year = int(st.sidebar.number_input(
+    "Base Year",
+    min_value=2000,
+    max_value=2100,
+    value=2024,
+    step=1,
+    help="Share price starts at £6.00 in this year; nothing is redeemed in the following year"
+))
+projection_years = st.sidebar.slider(
+    "Projection Years",
+    min_value=5,
+    max_value=50,
+    value=11,
+    step=1,
+    help="Number of years projected after the base year"
+)
+years_range = range(start_year + 1, start_year + projection_years + 1)
+first_year, final_year = years_range[0], years_range[-1]
+
+# Model time step: finer steps convert the annual rates to per-period rates and
+# roll the results back up to years for the tables and charts
+TIME_STEPS = {"Annual": 1, "Quarterly": 4, "Monthly": 12}
+time_step = st.sidebar.selectbox(
+    "Time Step",
+    list(TIME_STEPS),
+    help="Resolution of the projection; vesting is spread evenly over each year"
+)
+periods_per_year = TIME_STEPS[time_step]
+redemption_windows = st.sidebar.selectbox(
+    "Redemption Windows",
+    [name for name, periods in TIME_STEPS.items() if periods_per_year % periods == 0],
+    help="How often shares are redeemed; the annual redemption rate is split evenly across the windows"
+)
+redemption_windows_per_year = TIME_STEPS[redemption_windows]
+
+# Optionally precompute every growth and redemption slider position once per holder
+# configuration, so slider moves become lookups (APP_LOOKUP_TABLE=1 turns it on by default)
+use_lookup_table = st.sidebar.checkbox(
+    "Precompute All Slider Positions",
+    value=lookup_enabled(),
+    help="Values every growth and redemption rate combination at once and reads slider moves from a table on disk shared by all sessions"
+)
+
 # PBT Growth Rate
 pbt_growth_rate = st.sidebar.slider(
     "PBT Growth Rate", 
@@ -36,7 +108,7 @@ common_redemption_rate = st.sidebar.slider(
     max_value=10,
     value=5,
     step=1,
-    help="Percentage of common shares to redeem each year starting from 2026"
+    help=f"Percentage of common shares to redeem each year starting from {first_year + 1}"
 ) / 100
 
 # Get total common shares
@@ -91,23 +163,53 @@ total_grant_shares = st.sidebar.number_input(
     help="Total number of shares in the grant"
 )
 
+# Unsold A-Share/Options at intrinsic value, or at fair value including time value
+OPTION_PRICING = {"Intrinsic Value": "intrinsic", "Black-Scholes": "black_scholes", "Binomial Lattice": "binomial"}
+option_pricing = OPTION_PRICING[st.sidebar.selectbox(
+    "Unsold Option Valuation",
+    list(OPTION_PRICING),
+    help="Intrinsic value counts only the share price above the strike; fair value adds time value up to the end of the projection"
+)]
+option_volatility, risk_free_rate = 0.0, 0.0
+if option_pricing != "intrinsic":
+    option_volatility = st.sidebar.slider(
+        "Share Price Volatility",
+        min_value=0,
+        max_value=100,
+        value=30,
+        step=1,
+        help="Annual volatility of the share price, in %"
+    ) / 100
+    risk_free_rate = st.sidebar.slider(
+        "Risk-Free Rate",
+        min_value=0.0,
+        max_value=10.0,
+        value=4.0,
+        step=0.25,
+        help="Annual risk-free interest rate, in %"
+    ) / 100
+
 # Cumulative vesting schedule inputs
 st.sidebar.subheader("Cumulative Vesting Schedule")
 
-# Define vesting_method variable before it's used
-vesting_method = "Custom Vesting"  # Default value
+# Hand-entered cumulative figures, or a schedule compiled from vesting rules
+vesting_method = st.sidebar.radio(
+    "Vesting Method",
+    ["Custom Vesting", "Vesting Rules"],
+    horizontal=True,
+    help="Enter cumulative vested shares for each year or build the schedule from vesting rules"
+)
 
 # Set default values for all years
 default_values = {
-    2025: 60000,
-    2026: 70000,
-    2027: 80000,
-    2028: 90000,
-    2029: 100000
+    first_year: 60000,
+    first_year + 1: 70000,
+    first_year + 2: 80000,
+    first_year + 3: 90000,
+    first_year + 4: 100000
 }
 
 # Initialize vested_shares_input dictionary with all years
-years_range = range(2025, 2036)
 vested_shares_input = {}
 
 # Fill default values for all years with safety checks
@@ -120,19 +222,14 @@ for year in years_range:
         # Ensure we don't exceed the total grant shares
         vested_shares_input[year] = min(100000, total_grant_shares)
 
-# Create columns for input layout
-col1, col2 = st.sidebar.columns(2)
-
-# Year distribution between columns
-first_half = list(years_range)[:len(list(years_range))//2 + 1]
-second_half = list(years_range)[len(list(years_range))//2 + 1:]
-
 if vesting_method == "Custom Vesting":
-    # Custom vesting inputs
-    st.sidebar.write("Enter cumulative vested shares for each year:")
+    # Custom vesting inputs, grouped in a form so that edits only apply (and rerun
+    # the app) when submitted rather than on every keystroke
+    vesting_form = st.sidebar.form("vesting_form")
+    vesting_form.write("Enter cumulative vested shares for each year:")
     
     # Use columns for more compact layout
-    col1, col2 = st.sidebar.columns(2)
+    col1, col2 = vesting_form.columns(2)
     
     # Year distribution between columns
     first_half = list(years_range)[:len(list(years_range))//2 + 1]
@@ -174,6 +271,7 @@ if vesting_method == "Custom Vesting":
                     vested_shares_input[year] = min(max(0, vested_shares_input[year]), min(1000000, int(total_grant_shares)))
                 except:
                     vested_shares_input[year] = default_value
+        vesting_form.form_submit_button("Apply Vesting Schedule")
     except Exception as e:
         st.sidebar.error(f"Error with custom vesting inputs: {str(e)}")
         # Fall back to default vesting if custom fails
@@ -186,72 +284,77 @@ if vesting_method == "Custom Vesting":
                 # Ensure we don't exceed the total grant shares
                 vested_shares_input[year] = min(100000, total_grant_shares)
 
-    # Validation check to ensure vesting is non-decreasing or provide warning
-    sorted_years = sorted(vested_shares_input.keys())
-    for i in range(1, len(sorted_years)):
-        current_year = sorted_years[i]
-        prev_year = sorted_years[i-1]
-        if vested_shares_input[current_year] < vested_shares_input[prev_year]:
-            st.sidebar.warning(f"Note: Vested shares for {current_year} are less than {prev_year}. Typically vesting increases or stays the same each year.")
+    # Validation check to ensure vesting is non-decreasing or provide warning. The whole
+    # schedule is checked at once rather than year by year
+    vesting_checks = validate_vesting([vested_shares_input[year] for year in years_range], total_grant_shares)
+    for year in np.array(years_range)[vesting_checks['decreasing']]:
+        st.sidebar.warning(f"Note: Vested shares for {year} are less than {year - 1}. Typically vesting increases or stays the same each year.")
 else:
-    # Default schedule is used but not displayed
-    # Simply use the default values, but don't show the schedule in the sidebar
-    
+    # Cliff, graded, performance and acceleration rules compiled to the yearly schedule,
+    # applied when the form is submitted like the custom inputs
+    vesting_rules_form = st.sidebar.form("vesting_rules_form")
+    vesting_rules = rule_inputs(vesting_rules_form, years_range)
+    vesting_rules_form.form_submit_button("Apply Vesting Rules")
     try:
-        with col1:
-            for year in first_half:
-                default_value = default_values.get(year, 100000)  # Use the default values dictionary
-                # Ensure default value doesn't exceed total grant shares
-                default_value = min(default_value, int(total_grant_shares))
-                # Custom number input without +/- buttons
-                vested_shares_input[year] = st.sidebar.text_input(
-                    f"{year}",
-                    value=str(default_value),
-                    key=f"vest_{year}"
-                )
-                # Convert input to integer with validation
-                try:
-                    vested_shares_input[year] = int(vested_shares_input[year])
-                    # Apply constraints
-                    vested_shares_input[year] = min(max(0, vested_shares_input[year]), min(1000000, int(total_grant_shares)))
-                except:
-                    vested_shares_input[year] = default_value
-        
-        with col2:
-            for year in second_half:
-                default_value = min(100000, int(total_grant_shares))
-                # Custom number input without +/- buttons
-                vested_shares_input[year] = st.sidebar.text_input(
-                    f"{year}",
-                    value=str(default_value),
-                    key=f"vest_{year}"
-                )
-                # Convert input to integer with validation
-                try:
-                    vested_shares_input[year] = int(vested_shares_input[year])
-                    # Apply constraints
-                    vested_shares_input[year] = min(max(0, vested_shares_input[year]), min(1000000, int(total_grant_shares)))
-                except:
-                    vested_shares_input[year] = default_value
-    except Exception as e:
-        st.sidebar.error(f"Error with custom vesting inputs: {str(e)}")
-        # Fall back to default vesting if custom fails
-        for year in years_range:
-            if year in default_values:
-                # Ensure we don't exceed the total grant shares
-                default_value = min(default_values[year], total_grant_shares) 
-                vested_shares_input[year] = default_value
-            else:
-                # Ensure we don't exceed the total grant shares
-                vested_shares_input[year] = min(100000, total_grant_shares)
+        compiled_vesting = compile_vesting(total_grant_shares, start_year, projection_years, **vesting_rules)
+        vested_shares_input = dict(zip(years_range, compiled_vesting.astype(np.int64).tolist()))
+    except ValueError as e:
+        st.sidebar.error(f"Invalid vesting rules: {str(e)}")
+    st.sidebar.dataframe(
+        pd.DataFrame({"Year": list(years_range), "Vested Shares": [vested_shares_input[year] for year in years_range]}),
+        hide_index=True,
+    )
+
+# Optional tax stage: net-of-tax values shown alongside the gross ones (tax.py)
+st.sidebar.header("Tax")
+tax_settings = tax_inputs(st.sidebar)
+
+# Optional discounting: NPV and IRR of the yearly cash flows (discounting.py)
+st.sidebar.header("Discounting")
+discount_rate = discount_inputs(st.sidebar)
 
-    # Validation check to ensure vesting is non-decreasing or provide warning
-    sorted_years = sorted(vested_shares_input.keys())
-    for i in range(1, len(sorted_years)):
-        current_year = sorted_years[i]
-        prev_year = sorted_years[i-1]
-        if vested_shares_input[current_year] < vested_shares_input[prev_year]:
-            st.sidebar.warning(f"Note: Vested shares for {current_year} are less than {prev_year}. Typically vesting increases or stays the same each year.")
+rerun_timer.mark("Sidebar inputs")
+
+# Vested shares for every projection year from the sidebar input, with safety fallbacks
+def vested_schedule():
+    # Safely get vested shares for the first year with a fallback
+    vested_first = vested_shares_input.get(first_year, 0)
+    if vested_first is None or vested_first < 0 or vested_first > total_grant_shares:
+        vested_first = min(60000, total_grant_shares)  # Use default with constraint
+    vested = [0, vested_first]
+
+    # Vested shares for the remaining years from input (safely with a default)
+    for year in years_range[1:]:
+        vested_shares = vested_shares_input.get(year, vested_shares_input.get(year-1, 0))
+
+        # Safety check for valid vested shares
+        if vested_shares is None or vested_shares < 0 or vested_shares > total_grant_shares:
+            # Use previous year's value or default
+            vested_shares = min(vested[-1] + 5000, total_grant_shares)
+        vested.append(vested_shares)
+    return vested
+
+# Engine parameters for the working sheet: the share price starts from a £6.00 base
+# and only vested unsold options are valued
+def valuation_params(growth_rate, common_redemption, option_redemption):
+    return ValuationParams(
+        strike_price=strike_price,
+        grant_shares=total_grant_shares,
+        common_shares=total_common_shares,
+        common_price=common_purchase_price,
+        vesting=vested_schedule()[1:],
+        growth_rate=growth_rate,
+        option_redemption=option_redemption,
+        common_redemption=common_redemption,
+        base_price=6.00,  # Base price in the base year
+        unsold_option_basis="vested",
+        start_year=start_year,
+        periods_per_year=periods_per_year,
+        redemption_windows_per_year=redemption_windows_per_year,
+        option_pricing=option_pricing,
+        volatility=option_volatility,
+        risk_free_rate=risk_free_rate,
+    )
 
 # Function to calculate results for specific redemption rates
 def calculate_results(growth_rate=None, custom_common_redemption=None, custom_option_redemption=None):
@@ -260,159 +363,123 @@ def calculate_results(growth_rate=None, custom_common_redemption=None, custom_op
         current_growth_rate = pbt_growth_rate
     else:
         current_growth_rate = growth_rate
-    
+
     if custom_common_redemption is None:
         current_common_redemption = common_redemption_rate
     else:
         current_common_redemption = custom_common_redemption
-        
+
     if custom_option_redemption is None:
         current_option_redemption = option_redemption_rate
     else:
         current_option_redemption = custom_option_redemption
-        
-    years = list(range(2024, 2036))
-    results = {}
-    
-    # Initialize objects for all years
-    for year in years:
-        results[year] = {}
-    
-    # Calculate share price series
-    results[2024]['Share Price'] = 6.00  # Base price in 2024
-    for year in range(2025, 2036):
-        results[year]['Share Price'] = results[year-1]['Share Price'] * (1 + current_growth_rate)
-    
-    # Common Share calculations
-    for year in years:
-        results[year]['Common Shares Redeemed'] = 0.0
-        results[year]['Cumulative Common Redeemed'] = 0.0
-        results[year]['Unsold Common Shares'] = 0.0
-        results[year]['Common Redemption Value'] = 0.0
-        results[year]['Cumulative Common Redemption Value'] = 0.0
-        results[year]['Value of Unsold Common Shares'] = 0.0
-        results[year]['Total Common Share Value'] = 0.0
-    
-    # Initialize 2024 values
-    results[2024]['Unsold Common Shares'] = total_common_shares
-    
-    # 2025 calculations (no redemption in first year)
-    results[2025]['Common Shares Redeemed'] = 0
-    results[2025]['Cumulative Common Redeemed'] = 0
-    results[2025]['Unsold Common Shares'] = total_common_shares
-    results[2025]['Common Redemption Value'] = 0
-    results[2025]['Cumulative Common Redemption Value'] = 0
-    
-    # Calculate value of unsold common shares for 2025
-    common_price_diff_2025 = max(0, results[2025]['Share Price'] - common_purchase_price)
-    results[2025]['Value of Unsold Common Shares'] = common_price_diff_2025 * results[2025]['Unsold Common Shares']
-    results[2025]['Total Common Share Value'] = results[2025]['Value of Unsold Common Shares']
-    
-    # Calculate common share values for 2026-2035
-    for year in range(2026, 2036):
-        # Common shares redeemed this year (% of previous year's unsold shares)
-        results[year]['Common Shares Redeemed'] = results[year-1]['Unsold Common Shares'] * current_common_redemption
-        
-        # Cumulative common shares redeemed
-        results[year]['Cumulative Common Redeemed'] = results[year-1]['Cumulative Common Redeemed'] + results[year]['Common Shares Redeemed']
-        
-        # Unsold common shares
-        results[year]['Unsold Common Shares'] = total_common_shares - results[year]['Cumulative Common Redeemed']
-        
-        # Common redemption value = (share price - common purchase price) * common shares redeemed
-        common_price_diff = max(0, results[year]['Share Price'] - common_purchase_price)
-        results[year]['Common Redemption Value'] = common_price_diff * results[year]['Common Shares Redeemed']
-        
-        # Cumulative common redemption value
-        results[year]['Cumulative Common Redemption Value'] = results[year-1]['Cumulative Common Redemption Value'] + results[year]['Common Redemption Value']
-        
-        # Value of unsold common shares
-        results[year]['Value of Unsold Common Shares'] = common_price_diff * results[year]['Unsold Common Shares']
-        
-        # Total common share value
-        results[year]['Total Common Share Value'] = results[year]['Cumulative Common Redemption Value'] + results[year]['Value of Unsold Common Shares']
-    
-    # A-Share/Options calculations
-    for year in years:
-        results[year]['Vested Shares'] = 0
-        results[year]['Vested Unsold Shares'] = 0.0
-        results[year]['Redeemed Shares'] = 0.0
-        results[year]['Cumulative Redeemed'] = 0.0
-        results[year]['Unsold Shares'] = 0.0
-        results[year]['Redemption Value'] = 0.0
-        results[year]['Cumulative Redemption Value'] = 0.0
-        results[year]['Value of Unsold Shares'] = 0.0
-        results[year]['Total Grant Value'] = 0.0
-    
-    # Initialize 2024 values
-    results[2024]['Unsold Shares'] = total_grant_shares
-    
-    # 2025 calculations (no redemption in first year)
-    # Safely get vested shares for 2025 with a fallback
-    vested_2025 = vested_shares_input.get(2025, 0)
-    if vested_2025 is None or vested_2025 < 0 or vested_2025 > total_grant_shares:
-        vested_2025 = min(60000, total_grant_shares)  # Use default with constraint
-        
-    results[2025]['Vested Shares'] = vested_2025
-    results[2025]['Redeemed Shares'] = 0
-    results[2025]['Cumulative Redeemed'] = 0
-    results[2025]['Vested Unsold Shares'] = results[2025]['Vested Shares']
-    results[2025]['Unsold Shares'] = total_grant_shares
-    results[2025]['Redemption Value'] = 0
-    results[2025]['Cumulative Redemption Value'] = 0
-    
-    # Calculate value of unsold shares for 2025
-    share_price_diff_2025 = max(0, results[2025]['Share Price'] - strike_price)
-    results[2025]['Value of Unsold Shares'] = share_price_diff_2025 * results[2025]['Vested Shares']  # Only count vested shares
-    results[2025]['Total Grant Value'] = results[2025]['Value of Unsold Shares']
-    
-    # Calculate option values for 2026-2035
-    for year in range(2026, 2036):
-        # Vested shares for this year from input (safely with a default)
-        vested_shares = vested_shares_input.get(year, vested_shares_input.get(year-1, 0))
-        
-        # Safety check for valid vested shares
-        if vested_shares is None or vested_shares < 0 or vested_shares > total_grant_shares:
-            # Use previous year's value or default
-            vested_shares = min(results[year-1]['Vested Shares'] + 5000, total_grant_shares)
-            
-        results[year]['Vested Shares'] = vested_shares
-        
-        # Redeemed shares for this year (% of previous year's vested unsold shares)
-        results[year]['Redeemed Shares'] = results[year-1]['Vested Unsold Shares'] * current_option_redemption
-        
-        # Cumulative redeemed shares
-        results[year]['Cumulative Redeemed'] = results[year-1]['Cumulative Redeemed'] + results[year]['Redeemed Shares']
-        
-        # Vested unsold shares = vested shares - cumulative redeemed
-        results[year]['Vested Unsold Shares'] = max(0, results[year]['Vested Shares'] - results[year]['Cumulative Redeemed'])
-        
-        # Unsold shares = total - cumulative redeemed
-        results[year]['Unsold Shares'] = total_grant_shares - results[year]['Cumulative Redeemed']
-        
-        # Redemption value = (share price - strike price) * redeemed shares
-        share_price_diff = max(0, results[year]['Share Price'] - strike_price)
-        results[year]['Redemption Value'] = share_price_diff * results[year]['Redeemed Shares']
-        
-        # Cumulative redemption value
-        results[year]['Cumulative Redemption Value'] = results[year-1]['Cumulative Redemption Value'] + results[year]['Redemption Value']
-        
-        # Value of unsold shares (only count vested ones)
-        results[year]['Value of Unsold Shares'] = share_price_diff * results[year]['Vested Unsold Shares']
-        
-        # Total grant value = cumulative redemption value + value of unsold shares
-        results[year]['Total Grant Value'] = results[year]['Cumulative Redemption Value'] + results[year]['Value of Unsold Shares']
-    
-    # Calculate combined values
-    for year in range(2025, 2036):
-        results[year]['Combined Total Value'] = results[year]['Total Common Share Value'] + results[year]['Total Grant Value']
-    
-    return results
+
+    return project(valuation_params(current_growth_rate, current_common_redemption, current_option_redemption))
+
+# Evaluate every growth x option redemption x common redemption combination in one
+# broadcasted pass. Results have shape (growth rates, option rates, common rates, years)
+def calculate_grid(growth_rates, option_redemption_rates, common_redemption_rates):
+    return project_grid(valuation_params(0.0, 0.0, 0.0), growth_rates, option_redemption_rates, common_redemption_rates)
+
+# Results are cached across reruns and sessions, keyed on every engine input
+results_cache = get_cache("oaknorth-grants")
+
+# Every slider position, precomputed and memory-mapped from disk (lookup_table.py)
+GROWTH_SLIDER_RATES = slider_rates(10, 25)
+REDEMPTION_SLIDER_RATES = slider_rates(0, 10)
+
+def slider_lookup(growth_rate, common_redemption, option_redemption):
+    table = open_table(valuation_params(0.0, 0.0, 0.0), GROWTH_SLIDER_RATES, REDEMPTION_SLIDER_RATES, REDEMPTION_SLIDER_RATES)
+    return table.results(growth_rate, option_redemption, common_redemption)
+
+def cached_results(growth_rate=None, custom_common_redemption=None, custom_option_redemption=None):
+    # Resolve defaults first so explicit and implicit calls share cache entries
+    growth_rate = pbt_growth_rate if growth_rate is None else growth_rate
+    common_redemption = common_redemption_rate if custom_common_redemption is None else custom_common_redemption
+    option_redemption = option_redemption_rate if custom_option_redemption is None else custom_option_redemption
+    if use_lookup_table:
+        # Rates between slider positions fall through to the engine
+        looked_up = slider_lookup(growth_rate, common_redemption, option_redemption)
+        if looked_up is not None:
+            return looked_up
+    params = valuation_params(growth_rate, common_redemption, option_redemption)
+    return results_cache.get_or_compute(('results', params), lambda: rollup_annual(incremental_periods(params), params.periods_per_year))
+
+def incremental_periods(params):
+    # Resume from the last projection with the same rates: editing one year's vesting
+    # can't change earlier years, so only that year onward is recomputed
+    def compute():
+        anchor = ('latest', replace(params, vesting=()))
+        latest = results_cache.peek(anchor)
+        if latest is None:
+            periods = project_periods(params)
+        else:
+            periods = reproject_periods(latest[1], latest[0], params)
+        results_cache.put(anchor, (params, periods))
+        return periods
+    return results_cache.get_or_compute(('periods', params), compute)
+
+# Every slider position for the scenario heatmap and export: growth 10-25%, both
+# redemption rates 0-10%
+SCENARIO_GROWTH_RATES = np.arange(10, 26) / 100
+SCENARIO_REDEMPTION_RATES = np.arange(0, 11) / 100
+
+def cached_grid(growth_rates, option_redemption_rates, common_redemption_rates):
+    params = valuation_params(0.0, 0.0, 0.0)
+    rates = (growth_rates, option_redemption_rates, common_redemption_rates)
+
+    # Resumed from the last grid over the same rates, like incremental_periods
+    def compute():
+        anchor = ('latest grid', replace(params, vesting=()), rates)
+        latest = results_cache.peek(anchor)
+        if latest is None:
+            grid = project_grid_periods(params, *rates)
+        else:
+            grid = reproject_grid_periods(latest[1], latest[0], params, *rates)
+        results_cache.put(anchor, (params, grid))
+        return rollup_annual(grid, params.periods_per_year)
+    return results_cache.get_or_compute(('grid', params, rates), compute)
+
+def background_simulation(mean_growth, volatility, n_paths, seed):
+    params = valuation_params(pbt_growth_rate, common_redemption_rate, option_redemption_rate)
+    key = ('monte_carlo', params, mean_growth, volatility, n_paths, seed)
+    return background_result(
+        key, "Simulation", simulate, params, n_paths=n_paths, mean_growth=mean_growth, volatility=volatility, seed=seed
+    )
+
+def cached_sensitivity():
+    params = valuation_params(pbt_growth_rate, common_redemption_rate, option_redemption_rate)
+    return results_cache.get_or_compute(('sensitivity', params), lambda: sensitivity_batch(params))
+
+def cached_goal_seek(solve_for, target, year, metric):
+    params = valuation_params(pbt_growth_rate, common_redemption_rate, option_redemption_rate)
+    key = ('goal_seek', params, solve_for, target, year, metric)
+    return results_cache.get_or_compute(key, lambda: goal_seek(params, solve_for, target, year, metric))
+
+def cached_periods():
+    return incremental_periods(valuation_params(pbt_growth_rate, common_redemption_rate, option_redemption_rate))
+
+# Portfolio totals for an uploaded cap table, every holder valued under the sidebar scenario.
+# The parsed cap table and the totals are cached on the file contents
+def cached_cap_table(cap_table_bytes):
+    digest = hashlib.sha256(cap_table_bytes).hexdigest()
+    return digest, results_cache.get_or_compute(('cap_table', digest), lambda: read_cap_table(io.BytesIO(cap_table_bytes)))
+
+def background_portfolio(cap_table_bytes, group_by, top):
+    digest, cap_table = cached_cap_table(cap_table_bytes)
+    params = valuation_params(pbt_growth_rate, common_redemption_rate, option_redemption_rate)
+    settings = {
+        name: getattr(params, name)
+        for name in ('growth_rate', 'option_redemption', 'common_redemption', 'base_price', 'unsold_option_basis',
+                     'periods_per_year', 'redemption_windows_per_year', 'option_pricing', 'volatility', 'risk_free_rate')
+    }
+    key = ('portfolio', digest, freeze(settings), group_by, top, tax_settings)
+    return background_result(key, "Portfolio", aggregate, cap_table, settings, group_by, top, tax=tax_settings)
 
 # Try to calculate results and handle any errors
 try:
     # Calculate results 
-    results = calculate_results()
+    results = cached_results()
 except Exception as e:
     st.error(f"An error occurred during calculations: {str(e)}")
     # Provide more detailed error information
@@ -426,15 +493,22 @@ except Exception as e:
         fixed_pbt_growth_rate = 0.10
         fixed_common_redemption_rate = 0.05
         fixed_option_redemption_rate = 0.05
-        results = calculate_results(fixed_pbt_growth_rate, fixed_common_redemption_rate, fixed_option_redemption_rate)
+        results = cached_results(fixed_pbt_growth_rate, fixed_common_redemption_rate, fixed_option_redemption_rate)
     except Exception as e2:
         st.error(f"Fallback calculation also failed: {str(e2)}")
         st.stop()  # Stop execution if fallback also fails
 
+rerun_timer.mark("calculate_results")
+
 # Create tabs based on whether common shares exist
 try:
     if total_common_shares > 0:
-        tab1, tab2, tab3 = st.tabs(["Common Share Analysis", "A-Share/Options Analysis", "Combined Analysis"])
+        # Switching tabs reruns the app so that only the open tab's content is computed
+        tab1, tab2, tab3 = st.tabs(
+            ["Common Share Analysis", "A-Share/Options Analysis", "Combined Analysis"],
+            key="analysis_tab",
+            on_change="rerun"
+        )
     else:
         # Only show options tab if no common shares
         tab2 = st.container()  # Use a container instead of tabs
@@ -445,62 +519,78 @@ except Exception as e:
     st.warning("Using simplified layout due to tab creation error.")
     tab1, tab2, tab3 = st.container(), st.container(), st.container()
 
+# Each tab's content is a fragment rendered only while the tab is open, so a tab's own
+# controls rerun just that tab. Plain containers (no common shares, or the fallback
+# layout) are always shown
+def tab_open(tab):
+    return getattr(tab, "open", None) is not False
+
 # Tab 1: Common Shares Results and Sensitivity Chart
-if total_common_shares > 0:
-    with tab1:
-        st.header("Common Share Grant Value")
-        st.markdown(f"**Common Share Redemption Rate: {int(common_redemption_rate*100)}%, PBT Growth: {int(pbt_growth_rate*100)}%**")
+@st.fragment
+def common_share_tab(results):
+    timer = fragment_timer(rerun_timer, "Common Share tab")
+    st.header("Common Share Grant Value")
+    st.markdown(f"**Common Share Redemption Rate: {int(common_redemption_rate*100)}%, PBT Growth: {int(pbt_growth_rate*100)}%**")
+    
+    # Common Shares Summary Table
+    common_years = list(years_range)  # Start from the first projected year as requested
+    common_data = {
+        "Year": common_years,
+        "Share Price (£)": results.column('Share Price', first_year, final_year),
+        "Proceeds from Redemption (£)": results.column('Cumulative Common Redemption Value', first_year, final_year),
+        "Value of Unsold Shares (£)": results.column('Value of Unsold Common Shares', first_year, final_year),
+        "Total Common Share Value (£)": results.column('Total Common Share Value', first_year, final_year)
+    }
+    common_df = pd.DataFrame(common_data)
+    # Values stay numeric; Streamlit shows them in whole pounds
+    st.dataframe(common_df, use_container_width=True, hide_index=True, column_config=column_config(dict.fromkeys(list(common_data)[1:], 'currency')))
+    
+    timer.mark("Common Share table")
+
+    # Common Share Sensitivity Analysis (redemption rates with fixed 20% PBT growth)
+    try:
+        st.subheader("Common Share Value Sensitivity to Redemption Rate (£ thousands)")
+        st.caption("Fixed assumption: PBT Growth Rate = 20%")
         
-        # Common Shares Summary Table
-        common_years = list(range(2025, 2036))  # Start from 2025 as requested
-        common_data = {
-            "Year": common_years,
-            "Share Price (£)": [f"£{results[year]['Share Price']:.0f}" for year in common_years],
-            "Proceeds from Redemption (£)": [f"£{results[year]['Cumulative Common Redemption Value']:,.0f}" for year in common_years],
-            "Value of Unsold Shares (£)": [f"£{results[year]['Value of Unsold Common Shares']:,.0f}" for year in common_years],
-            "Total Common Share Value (£)": [f"£{results[year]['Total Common Share Value']:,.0f}" for year in common_years]
-        }
-        common_df = pd.DataFrame(common_data)
-        st.dataframe(common_df, use_container_width=True, hide_index=True)
+        # Fixed PBT growth of 20%
+        fixed_growth = 0.20
         
-        # Common Share Sensitivity Analysis (redemption rates with fixed 20% PBT growth)
-        try:
-            st.subheader("Common Share Value Sensitivity to Redemption Rate (£ thousands)")
-            st.caption("Fixed assumption: PBT Growth Rate = 20%")
-            
-            # Fixed PBT growth of 20%
-            fixed_growth = 0.20
-            
-            # Redemption rates to analyze
-            redemption_rates = [0.00, 0.05, 0.10]  # 0%, 5%, 10%
-            
-            # Generate data for each redemption rate
-            chart_data = {}
-            
-            # Calculate values for each redemption rate
-            for rate in redemption_rates:
-                rate_results = calculate_results(fixed_growth, rate, None)
-                chart_data[f"{int(rate*100)}% Redemption"] = [
-                    int(round(rate_results[year]['Total Common Share Value'] / 1000, 0))
-                    for year in common_years
-                ]
-            
-            # Create DataFrame with year labels as strings to maintain formatting
-            year_labels = [str(year) for year in common_years]
-            chart_df = pd.DataFrame(chart_data, index=year_labels)
-            
-            # Plot line chart
-            st.line_chart(chart_df)
-        except Exception as e:
-            st.warning(f"Could not display common share sensitivity chart: {str(e)}")
-            st.write("Please check your inputs for potential issues.")
+        # Redemption rates to analyze
+        redemption_rates = [0.00, 0.05, 0.10]  # 0%, 5%, 10%
+        
+        # Generate data for each redemption rate
+        chart_data = {}
+        
+        # Calculate values for each redemption rate
+        for rate in redemption_rates:
+            rate_results = cached_results(fixed_growth, rate, None)
+            chart_data[f"{int(rate*100)}% Redemption"] = np.round(rate_results.column('Total Common Share Value', first_year, final_year) / 1000).astype(int)
+        
+        # Create DataFrame with year labels as strings to maintain formatting
+        year_labels = [str(year) for year in common_years]
+        chart_df = pd.DataFrame(chart_data, index=year_labels)
         
-        # Add disclaimer at bottom of tab
-        st.markdown("---")
-        st.caption("**Disclaimer**: Illustrative Only, future valuation is not guaranteed and redemption plans subject to management decision.")
+        # Plot line chart
+        st.line_chart(chart_df)
+    except Exception as e:
+        st.warning(f"Could not display common share sensitivity chart: {str(e)}")
+        st.write("Please check your inputs for potential issues.")
+    
+    # Add disclaimer at bottom of tab
+    st.markdown("---")
+    st.caption("**Disclaimer**: Illustrative Only, future valuation is not guaranteed and redemption plans subject to management decision.")
+    finish_fragment(timer, "Common Share chart")
+
+if total_common_shares > 0 and tab_open(tab1):
+    with tab1:
+        common_share_tab(results)
+
+rerun_timer.mark("Common Share chart")
 
 # Tab 2: Options Results
-with tab2:
+@st.fragment
+def options_tab(results):
+    timer = fragment_timer(rerun_timer, "Options tab")
     st.header("A-Share/Options Grant Value")
     st.markdown(f"**A-Share/Options Redemption Rate: {int(option_redemption_rate*100)}%, PBT Growth: {int(pbt_growth_rate*100)}%**")
     
@@ -509,20 +599,22 @@ with tab2:
     
     # Options Summary Table - Simplified columns
     try:
-        option_years = list(range(2025, 2036))
+        option_years = list(years_range)
         option_data = {
             "Year": option_years,
-            "Share Price (£)": [f"£{results[year]['Share Price']:.0f}" for year in option_years],
-            "Proceeds from Redemption (£)": [f"£{results[year]['Cumulative Redemption Value']:,.0f}" for year in option_years],
-            "Value of Unsold Shares (£)": [f"£{results[year]['Value of Unsold Shares']:,.0f}" for year in option_years],
-            "Total Grant Value (£)": [f"£{results[year]['Total Grant Value']:,.0f}" for year in option_years]
+            "Share Price (£)": results.column('Share Price', first_year, final_year),
+            "Proceeds from Redemption (£)": results.column('Cumulative Redemption Value', first_year, final_year),
+            "Value of Unsold Shares (£)": results.column('Value of Unsold Shares', first_year, final_year),
+            "Total Grant Value (£)": results.column('Total Grant Value', first_year, final_year)
         }
         option_df = pd.DataFrame(option_data)
-        st.dataframe(option_df, use_container_width=True, hide_index=True)
+        st.dataframe(option_df, use_container_width=True, hide_index=True, column_config=column_config(dict.fromkeys(list(option_data)[1:], 'currency')))
     except Exception as e:
         st.error(f"Error displaying options summary table: {str(e)}")
         st.write("Please check your inputs for potential issues.")
     
+    timer.mark("Options table")
+
     # Options Sensitivity Analysis (redemption rates with fixed 20% PBT growth)
     try:
         st.subheader("Option Value Sensitivity to Redemption Rate (£ thousands)")
@@ -539,11 +631,8 @@ with tab2:
         
         # Calculate values for each redemption rate
         for rate in redemption_rates:
-            rate_results = calculate_results(fixed_growth, None, rate)
-            chart_data[f"{int(rate*100)}% Redemption"] = [
-                int(round(rate_results[year]['Total Grant Value'] / 1000, 0))
-                for year in option_years
-            ]
+            rate_results = cached_results(fixed_growth, None, rate)
+            chart_data[f"{int(rate*100)}% Redemption"] = np.round(rate_results.column('Total Grant Value', first_year, final_year) / 1000).astype(int)
         
         # Create DataFrame with year labels as strings to maintain formatting
         year_labels = [str(year) for year in option_years]
@@ -558,57 +647,491 @@ with tab2:
     # Add disclaimer at bottom of tab
     st.markdown("---")
     st.caption("**Disclaimer**: Illustrative Only, future valuation is not guaranteed and redemption plans subject to management decision.")
+    finish_fragment(timer, "Options chart")
+
+if tab_open(tab2):
+    with tab2:
+        options_tab(results)
+
+rerun_timer.mark("Options chart")
 
 # Tab 3: Combined Analysis
-if total_common_shares > 0:
-    with tab3:
-        st.header("Combined Analysis")
-        st.markdown(f"**Common Share Redemption Rate: {int(common_redemption_rate*100)}%, A-Share/Options Redemption Rate: {int(option_redemption_rate*100)}%, PBT Growth: {int(pbt_growth_rate*100)}%**")
+@st.fragment
+def combined_tab(results):
+    timer = fragment_timer(rerun_timer, "Combined tab")
+    st.header("Combined Analysis")
+    st.markdown(f"**Common Share Redemption Rate: {int(common_redemption_rate*100)}%, A-Share/Options Redemption Rate: {int(option_redemption_rate*100)}%, PBT Growth: {int(pbt_growth_rate*100)}%**")
+    
+    # Combined Summary Table
+    combined_years = list(years_range)
+    combined_data = {
+        "Year": combined_years,
+        "Share Price (£)": results.column('Share Price', first_year, final_year),
+        "Common Share Value (£)": results.column('Total Common Share Value', first_year, final_year),
+        "A-Share/Options Value (£)": results.column('Total Grant Value', first_year, final_year),
+        "Combined Total Value (£)": results.column('Combined Total Value', first_year, final_year)
+    }
+    combined_df = pd.DataFrame(combined_data)
+    st.dataframe(combined_df, use_container_width=True, hide_index=True, column_config=column_config(dict.fromkeys(list(combined_data)[1:], 'currency')))
+    
+    timer.mark("Combined table")
+
+    # Combined Sensitivity Analysis (PBT growth rates with fixed 0% redemption)
+    try:
+        st.subheader("Combined Value Sensitivity to PBT Growth Rate (£ thousands)")
+        st.caption("Fixed assumption: Redemption Rate = 0%")
         
-        # Combined Summary Table
-        combined_years = list(range(2025, 2036))
-        combined_data = {
-            "Year": combined_years,
-            "Share Price (£)": [f"£{results[year]['Share Price']:.0f}" for year in combined_years],
-            "Common Share Value (£)": [f"£{results[year]['Total Common Share Value']:,.0f}" for year in combined_years],
-            "A-Share/Options Value (£)": [f"£{results[year]['Total Grant Value']:,.0f}" for year in combined_years],
-            "Combined Total Value (£)": [f"£{results[year]['Combined Total Value']:,.0f}" for year in combined_years]
-        }
-        combined_df = pd.DataFrame(combined_data)
-        st.dataframe(combined_df, use_container_width=True, hide_index=True)
+        # Fixed redemption rate of 0%
+        fixed_redemption = 0.00
+        
+        # Growth rates to analyze
+        growth_rates = [0.15, 0.20]  # 15%, 20%
+        
+        # Generate data for each growth rate
+        chart_data = {}
+        
+        # Calculate values for each growth rate
+        for rate in growth_rates:
+            rate_results = cached_results(rate, fixed_redemption, fixed_redemption)
+            chart_data[f"{int(rate*100)}% Growth"] = np.round(rate_results.column('Combined Total Value', first_year, final_year) / 1000).astype(int)
+        
+        # Create DataFrame with year labels as strings to maintain formatting
+        year_labels = [str(year) for year in combined_years]
+        chart_df = pd.DataFrame(chart_data, index=year_labels)
+        
+        # Plot line chart
+        st.line_chart(chart_df)
+    except Exception as e:
+        st.warning(f"Could not display combined sensitivity chart: {str(e)}")
+        st.write("Please check your inputs for potential issues.")
+    
+    timer.mark("Combined chart")
+
+    # Heatmap of final year Combined Total Value across every slider combination
+    try:
+        st.subheader(f"{final_year} Combined Value Across All Scenarios (£ thousands)")
+        heatmap_axis = st.radio(
+            "Redemption rate shown against PBT growth",
+            ["A-Share/Options Redemption", "Common Share Redemption"],
+            horizontal=True,
+            help="The other redemption rate is held at its sidebar value"
+        )
         
-        # Combined Sensitivity Analysis (PBT growth rates with fixed 0% redemption)
+        grid_growth_rates, grid_redemption_rates = SCENARIO_GROWTH_RATES, SCENARIO_REDEMPTION_RATES
+        grid = cached_grid(grid_growth_rates, grid_redemption_rates, grid_redemption_rates)
+        final_combined = grid['Combined Total Value'][..., -1]
+        
+        # Hold the other redemption rate at the user's sidebar value
+        if heatmap_axis == "A-Share/Options Redemption":
+            st.caption(f"Fixed assumption: Common Share Redemption Rate = {int(common_redemption_rate*100)}%")
+            scenario_index = np.s_[:, :, int(round(common_redemption_rate * 100))]
+        else:
+            st.caption(f"Fixed assumption: A-Share/Options Redemption Rate = {int(option_redemption_rate*100)}%")
+            scenario_index = np.s_[:, int(round(option_redemption_rate * 100)), :]
+        heatmap_values = final_combined[scenario_index]
+        
+        growth_labels, redemption_labels = np.meshgrid(
+            [f"{int(round(rate*100))}%" for rate in grid_growth_rates],
+            [f"{int(round(rate*100))}%" for rate in grid_redemption_rates],
+            indexing='ij'
+        )
+        heatmap_df = pd.DataFrame({
+            "PBT Growth Rate": growth_labels.ravel(),
+            "Redemption Rate": redemption_labels.ravel(),
+            "Combined Total Value (£k)": np.round(heatmap_values.ravel() / 1000).astype(int),
+        })
+        heatmap_tooltip = ["PBT Growth Rate", "Redemption Rate", alt.Tooltip("Combined Total Value (£k):Q", format=",")]
+
+        # NPV and IRR of every scenario in the grid, in one batched pass
+        if discount_rate is not None:
+            grid_present = present_values(grid, common_purchase_price, discount_rate)
+            heatmap_df["NPV (£k)"] = np.round(grid_present['npv'][scenario_index].ravel() / 1000).astype(int)
+            heatmap_df["IRR"] = grid_present['irr'][scenario_index].ravel()
+            heatmap_tooltip += [alt.Tooltip("NPV (£k):Q", format=","), alt.Tooltip("IRR:Q", format=".1%")]
+
+        heatmap = alt.Chart(heatmap_df).mark_rect().encode(
+            x=alt.X("Redemption Rate:O", sort=None, title=heatmap_axis),
+            y=alt.Y("PBT Growth Rate:O", sort=None),
+            color=alt.Color("Combined Total Value (£k):Q", scale=alt.Scale(scheme="viridis")),
+            tooltip=heatmap_tooltip
+        )
+        st.altair_chart(heatmap, use_container_width=True)
+    except Exception as e:
+        st.warning(f"Could not display scenario heatmap: {str(e)}")
+        st.write("Please check your inputs for potential issues.")
+    
+    # Add disclaimer at bottom of tab
+    st.markdown("---")
+    st.caption("**Disclaimer**: Illustrative Only, future valuation is not guaranteed and redemption plans subject to management decision.")
+    finish_fragment(timer, "Scenario heatmap")
+
+if total_common_shares > 0 and tab_open(tab3):
+    with tab3:
+        combined_tab(results)
+
+rerun_timer.mark("Scenario heatmap")
+
+# Tornado sensitivity: which input moves Combined Total Value the most. Like the tabs,
+# this and the goal seek are fragments that only run while their expander is open
+@st.fragment
+def sensitivity_section():
+    try:
+        st.caption("Each input bumped down and up on its own: rates by 1% point, prices and vesting by 10%")
+        tornado_year = st.select_slider("Target Year", options=list(years_range), value=final_year)
+        tornado_data = tornado(cached_sensitivity(), tornado_year, discount_rate=discount_rate)
+
+        # One bar per bump, measured from the base case, largest swing at the top
+        tornado_df = pd.DataFrame({
+            'Input': tornado_data['inputs'] * 2,
+            'Bump': ['Low'] * len(tornado_data['inputs']) + ['High'] * len(tornado_data['inputs']),
+            'Change (£)': np.concatenate([tornado_data['value_low'], tornado_data['value_high']]) - tornado_data['base_value'],
+        })
+        tornado_chart = alt.Chart(tornado_df).mark_bar().encode(
+            x=alt.X('Change (£):Q', title=f"Change in {tornado_year} Combined Total Value (£)"),
+            y=alt.Y('Input:N', sort=tornado_data['inputs'], title=None),
+            color=alt.Color('Bump:N', scale=alt.Scale(domain=['Low', 'High'])),
+            tooltip=['Input', 'Bump', alt.Tooltip('Change (£):Q', format=',.0f')]
+        )
+        st.altair_chart(tornado_chart, use_container_width=True)
+
+        tornado_table = pd.DataFrame({
+            'Input': tornado_data['inputs'],
+            'Low': tornado_data['low'],
+            'High': tornado_data['high'],
+            'Value at Low (£)': tornado_data['value_low'],
+            'Value at High (£)': tornado_data['value_high'],
+            'Swing (£)': tornado_data['swing'],
+            'Change per Unit (£)': tornado_data['sensitivity'],
+            'Unit': tornado_data['unit'],
+        })
+        tornado_kinds = dict.fromkeys(['Value at Low (£)', 'Value at High (£)', 'Swing (£)', 'Change per Unit (£)'], 'currency')
+        if discount_rate is not None:
+            tornado_table['NPV at Low (£)'] = tornado_data['npv_low']
+            tornado_table['NPV at High (£)'] = tornado_data['npv_high']
+            tornado_kinds.update(dict.fromkeys(['NPV at Low (£)', 'NPV at High (£)'], 'currency'))
+        st.dataframe(tornado_table, use_container_width=True, hide_index=True, column_config=column_config(tornado_kinds))
+    except Exception as e:
+        st.warning(f"Could not run the sensitivity analysis: {str(e)}")
+
+sensitivity_expander = st.expander("Sensitivity of Combined Total Value", key="sensitivity_expander", on_change="rerun")
+if sensitivity_expander.open:
+    with sensitivity_expander:
+        sensitivity_section()
+
+rerun_timer.mark("Sensitivity")
+
+# Goal seek: solve for the input that reaches a target value, other inputs as set in the sidebar
+@st.fragment
+def goal_seek_section():
+    try:
+        GOAL_SEEK_INPUTS = {label: key for key, label in {**RATE_INPUTS, **PRICE_INPUTS}.items()}
+        GOAL_SEEK_METRICS = {
+            'Combined Total Value (£)': 'Combined Total Value',
+            'Total A-Share/Options Value (£)': 'Total Grant Value',
+            'Total Common Share Value (£)': 'Total Common Share Value',
+            'Proceeds from A-Share/Options Redemption (£)': 'Cumulative Redemption Value',
+            'Proceeds from Common Share Redemption (£)': 'Cumulative Common Redemption Value',
+        }
+        seek_col1, seek_col2, seek_col3, seek_col4 = st.columns(4)
+        seek_input = seek_col1.selectbox("Solve For", list(GOAL_SEEK_INPUTS))
+        seek_metric = seek_col2.selectbox("Target Value", list(GOAL_SEEK_METRICS))
+        seek_year = seek_col3.selectbox("By Year", list(years_range), index=min(5, len(years_range) - 1))
+        seek_target = seek_col4.number_input("Target (£)", min_value=0.0, value=1000000.0, step=50000.0, format="%.0f")
+
+        seek = cached_goal_seek(GOAL_SEEK_INPUTS[seek_input], seek_target, seek_year, GOAL_SEEK_METRICS[seek_metric])
+        if seek['solved']:
+            solution = float(seek['value'])
+            solution_text = f"{solution*100:.2f}%" if GOAL_SEEK_INPUTS[seek_input] in RATE_INPUTS else f"£{solution:,.2f}"
+            st.success(f"A {seek_input} of **{solution_text}** gives {seek_metric.replace(' (£)', '')} of £{float(seek['achieved']):,.0f} in {seek_year}")
+        else:
+            low, high = DEFAULT_BOUNDS[GOAL_SEEK_INPUTS[seek_input]]
+            st.warning(f"No {seek_input} between {low:g} and {high:g} reaches £{seek_target:,.0f} {seek_metric.replace(' (£)', '')} in {seek_year}")
+    except Exception as e:
+        st.warning(f"Could not run the goal seek: {str(e)}")
+
+goal_seek_expander = st.expander("Goal Seek", key="goal_seek_expander", on_change="rerun")
+if goal_seek_expander.open:
+    with goal_seek_expander:
+        goal_seek_section()
+
+rerun_timer.mark("Goal seek")
+
+# Net of tax, when the tax stage is switched on in the sidebar
+if tax_settings is not None:
+    with st.expander("Net of Tax", expanded=True):
         try:
-            st.subheader("Combined Value Sensitivity to PBT Growth Rate (£ thousands)")
-            st.caption("Fixed assumption: Redemption Rate = 0%")
-            
-            # Fixed redemption rate of 0%
-            fixed_redemption = 0.00
-            
-            # Growth rates to analyze
-            growth_rates = [0.15, 0.20]  # 15%, 20%
-            
-            # Generate data for each growth rate
-            chart_data = {}
+            net = net_of_tax(results, tax_settings)
+            net_table = pd.DataFrame({
+                "Year": list(years_range),
+                "Tax on Redemptions (£)": net['Tax on Redemptions'][1:],
+                "Net A-Share/Options Value (£)": net['Net Total Grant Value'][1:],
+                "Net Common Share Value (£)": net['Net Total Common Share Value'][1:],
+                "Combined Total Value (£)": results.column('Combined Total Value', first_year, final_year),
+                "Net Combined Total Value (£)": net['Net Combined Total Value'][1:],
+            })
+            net_kinds = dict.fromkeys(list(net_table)[1:], 'currency')
+            st.dataframe(net_table, use_container_width=True, hide_index=True, column_config=column_config(net_kinds))
+            st.caption("Unsold shares are valued net of the tax a sale at the end of each year would incur")
+        except Exception as e:
+            st.warning(f"Could not calculate the net-of-tax values: {str(e)}")
+
+rerun_timer.mark("Net of tax")
+
+# Present value of the holder's cash flows, when discounting is switched on in the sidebar
+if discount_rate is not None:
+    with st.expander("Present Value", expanded=True):
+        try:
+            present = present_values(results, common_purchase_price, discount_rate)
+            discount_factors = (1 + discount_rate) ** -np.arange(len(results.years))
+            pv_col1, pv_col2 = st.columns(2)
+            pv_col1.metric(f"NPV at {discount_rate:.1%}", f"£{present['npv']:,.0f}")
+            pv_col2.metric("IRR", "n/a" if np.isnan(present['irr']) else f"{present['irr']:.1%}")
+            pv_table = pd.DataFrame({
+                "Year": results.years,
+                "Cash Flow (£)": present['cash_flows'],
+                "Discount Factor": discount_factors,
+                "Present Value (£)": present['cash_flows'] * discount_factors,
+            })
+            pv_kinds = {"Cash Flow (£)": 'currency', "Present Value (£)": 'currency'}
+            st.dataframe(pv_table, use_container_width=True, hide_index=True, column_config=column_config(
+                pv_kinds, **{"Discount Factor": st.column_config.NumberColumn(format="%.4f")}
+            ))
+            st.caption(f"Common shares bought in {start_year} and every unsold share sold at the end of {final_year}; "
+                       "IRR is n/a without an up-front purchase")
+        except Exception as e:
+            st.warning(f"Could not calculate the present values: {str(e)}")
+
+rerun_timer.mark("Present value")
+
+# Period-level values behind the yearly tabs for quarterly/monthly time steps
+if periods_per_year > 1:
+    with st.expander(f"{time_step} Detail"):
+        try:
+            periods = cached_periods()
+            # Label each period with its year and position in the year, e.g. '2025 Q1'
+            period_labels = [f"{first_year + k // periods_per_year} {time_step[0]}{k % periods_per_year + 1}" for k in range(len(periods.years) - 1)]
+            st.subheader("Value by Period (£ thousands)")
+            period_chart = pd.DataFrame({
+                "A-Share/Options Value": np.round(periods['Total Grant Value'][1:] / 1000).astype(int),
+                "Common Share Value": np.round(periods['Total Common Share Value'][1:] / 1000).astype(int),
+                "Combined Total Value": np.round(periods['Combined Total Value'][1:] / 1000).astype(int),
+            }, index=period_labels)
+            st.line_chart(period_chart)
+            period_table = pd.DataFrame({
+                "Share Price (£)": periods['Share Price'][1:],
+                "Vested Shares": periods['Vested Shares'][1:],
+                "Redeemed Shares": periods['Redeemed Shares'][1:],
+                "Combined Total Value (£)": periods['Combined Total Value'][1:],
+            }, index=period_labels)
+            period_kinds = {"Share Price (£)": 'price', "Vested Shares": 'shares', "Redeemed Shares": 'shares', "Combined Total Value (£)": 'currency'}
+            st.dataframe(period_table, use_container_width=True, column_config=column_config(period_kinds))
+        except Exception as e:
+            st.warning(f"Could not display the period detail: {str(e)}")
+
+rerun_timer.mark("Period detail")
+
+# Monte Carlo simulation of stochastic PBT growth
+with st.expander("Monte Carlo Simulation of PBT Growth"):
+    run_simulation = st.checkbox(
+        "Run simulation",
+        help="Draw random yearly growth rates and show the spread of outcomes"
+    )
+    if run_simulation:
+        try:
+            sim_col1, sim_col2, sim_col3, sim_col4 = st.columns(4)
+            simulation_mean = sim_col1.slider("Mean PBT Growth", min_value=0, max_value=30, value=int(round(pbt_growth_rate * 100)), step=1) / 100
+            simulation_volatility = sim_col2.slider("Growth Volatility", min_value=0, max_value=50, value=15, step=1) / 100
+            simulation_paths = sim_col3.select_slider("Simulated Paths", options=[1000, 10000, 50000, 100000], value=10000)
+            simulation_seed = int(sim_col4.number_input("Random Seed", min_value=0, value=42, step=1))
             
-            # Calculate values for each growth rate
-            for rate in growth_rates:
-                rate_results = calculate_results(rate, fixed_redemption, fixed_redemption)
-                chart_data[f"{int(rate*100)}% Growth"] = [
-                    int(round(rate_results[year]['Combined Total Value'] / 1000, 0))
-                    for year in combined_years
-                ]
+            # Runs in the background; results appear once the job finishes
+            simulation = background_simulation(simulation_mean, simulation_volatility, simulation_paths, simulation_seed)
+            if simulation is not None:
+                band_labels = [f"P{percentile}" for percentile in simulation['percentiles']]
+                simulation_years = simulation['years'][1:]
             
-            # Create DataFrame with year labels as strings to maintain formatting
-            year_labels = [str(year) for year in combined_years]
-            chart_df = pd.DataFrame(chart_data, index=year_labels)
+                st.subheader("Combined Value Percentile Bands (£ thousands)")
+                st.caption(f"Common Share Redemption Rate = {int(common_redemption_rate*100)}%, A-Share/Options Redemption Rate = {int(option_redemption_rate*100)}%, {simulation_paths:,} paths")
+                simulation_chart = pd.DataFrame(
+                    np.round(simulation['Combined Total Value'][:, 1:].T / 1000).astype(int),
+                    index=[str(year) for year in simulation_years],
+                    columns=band_labels
+                )
+                st.line_chart(simulation_chart)
             
-            # Plot line chart
-            st.line_chart(chart_df)
+                # Final year bands for each value
+                simulation_data = {"Value": ["A-Share/Options Value (£)", "Common Share Value (£)", "Combined Total Value (£)"]}
+                for band, label in enumerate(band_labels):
+                    simulation_data[f"{label} {simulation_years[-1]} (£)"] = [
+                        simulation[metric][band, -1]
+                        for metric in ['Total Grant Value', 'Total Common Share Value', 'Combined Total Value']
+                    ]
+                simulation_kinds = dict.fromkeys(list(simulation_data)[1:], 'currency')
+                st.dataframe(pd.DataFrame(simulation_data), use_container_width=True, hide_index=True, column_config=column_config(simulation_kinds))
         except Exception as e:
-            st.warning(f"Could not display combined sensitivity chart: {str(e)}")
-            st.write("Please check your inputs for potential issues.")
-        
-        # Add disclaimer at bottom of tab
-        st.markdown("---")
-        st.caption("**Disclaimer**: Illustrative Only, future valuation is not guaranteed and redemption plans subject to management decision.")
+            st.warning(f"Could not run the simulation: {str(e)}")
+    else:
+        release_background("Simulation")
+
+rerun_timer.mark("Monte Carlo")
+
+# Company-wide totals across every holder in a cap table, for treasury planning
+with st.expander("Portfolio Totals (Cap Table)"):
+    st.caption(
+        "Upload a cap-table CSV with holder_id, strike_price, grant_shares, common_shares, purchase_price and "
+        "vest_<year> columns. Every holder is valued under the scenario set in the sidebar."
+    )
+    cap_table_file = st.file_uploader("Cap Table CSV", type="csv")
+    if cap_table_file is not None:
+        try:
+            cap_table_bytes = cap_table_file.getvalue()
+            _, cap_table = cached_cap_table(cap_table_bytes)
+            portfolio_col1, portfolio_col2 = st.columns(2)
+            portfolio_group = portfolio_col1.selectbox("Group By", ["(none)"] + list(cap_table.labels))
+            portfolio_top = portfolio_col2.slider("Top Contributors", min_value=5, max_value=50, value=10, step=5)
+            group_by = None if portfolio_group == "(none)" else portfolio_group
+
+            # Runs in the background; the totals appear once the job finishes
+            portfolio = background_portfolio(cap_table_bytes, group_by, portfolio_top)
+            if portfolio is not None:
+                st.subheader(f"Yearly Totals Across {portfolio['holders']:,} Holders")
+                treasury_labels = {
+                    'Redemption Cash Outflow': "Redemption Cash Outflow (£)",
+                    'Shares Bought Back': "Shares Bought Back",
+                    'Unsold Value': "Unsold Value (£)",
+                    'Combined Total Value': "Combined Total Value (£)",
+                }
+                treasury_kinds = {
+                    "Redemption Cash Outflow (£)": 'currency', "Shares Bought Back": 'shares',
+                    "Unsold Value (£)": 'currency', "Combined Total Value (£)": 'currency',
+                }
+                if tax_settings is not None:
+                    treasury_labels['Net Combined Total Value'] = "Net Combined Total Value (£)"
+                    treasury_kinds["Net Combined Total Value (£)"] = 'currency'
+                portfolio_table = pd.DataFrame({"Year": portfolio['years']})
+                for metric, label in treasury_labels.items():
+                    portfolio_table[label] = portfolio['totals'][metric]
+                st.dataframe(portfolio_table, use_container_width=True, hide_index=True, column_config=column_config(treasury_kinds))
+
+                if group_by is not None:
+                    st.subheader(f"Redemption Cash Outflow by {group_by} (£ thousands)")
+                    group_chart = pd.DataFrame(
+                        np.round(portfolio['group_totals']['Redemption Cash Outflow'].T / 1000).astype(int),
+                        index=[str(year) for year in portfolio['years']],
+                        columns=[str(group) for group in portfolio['groups']],
+                    )
+                    st.bar_chart(group_chart)
+                    group_table = pd.DataFrame({
+                        group_by: np.repeat(portfolio['groups'], len(portfolio['years'])),
+                        "Year": np.tile(portfolio['years'], len(portfolio['groups'])),
+                    })
+                    for metric, label in treasury_labels.items():
+                        group_table[label] = portfolio['group_totals'][metric].ravel()
+                    st.dataframe(group_table, use_container_width=True, hide_index=True, column_config=column_config(treasury_kinds))
+
+                top = portfolio['top']
+                st.subheader(f"Top {len(top['holder_id'])} Holders by {top['year']} Combined Total Value")
+                top_table = pd.DataFrame({"Holder": top['holder_id']})
+                if group_by is not None:
+                    top_table[group_by] = top[group_by]
+                top_table["Combined Total Value (£)"] = top['value']
+                top_table["Share of Total"] = top['share']
+                st.dataframe(
+                    top_table, use_container_width=True, hide_index=True,
+                    column_config=column_config(
+                        {"Combined Total Value (£)": 'currency'},
+                        **{"Share of Total": st.column_config.NumberColumn(format="percent")},
+                    ),
+                )
+        except Exception as e:
+            st.warning(f"Could not value the cap table: {str(e)}")
+    else:
+        release_background("Portfolio")
+
+rerun_timer.mark("Portfolio")
+
+# Export the yearly results and the scenario grid for downstream tools. Files are
+# only built when their download button is clicked
+def detail_table():
+    return results_table(results, first_year=first_year)
+
+def scenario_grid_table():
+    grid = cached_grid(SCENARIO_GROWTH_RATES, SCENARIO_REDEMPTION_RATES, SCENARIO_REDEMPTION_RATES)
+    axes = [
+        ('PBT Growth Rate', SCENARIO_GROWTH_RATES),
+        ('A-Share/Options Redemption Rate', SCENARIO_REDEMPTION_RATES),
+        ('Common Share Redemption Rate', SCENARIO_REDEMPTION_RATES),
+    ]
+    return results_table(grid, axes, first_year=first_year)
+
+def export_workbook():
+    # One sheet per analysis, from the same engine results as the tabs
+    years = list(years_range)
+    sheets = {
+        "Common Share Analysis": pd.DataFrame({
+            "Year": years,
+            "Share Price (£)": results.column('Share Price', first_year, final_year),
+            "Proceeds from Redemption (£)": results.column('Cumulative Common Redemption Value', first_year, final_year),
+            "Value of Unsold Shares (£)": results.column('Value of Unsold Common Shares', first_year, final_year),
+            "Total Common Share Value (£)": results.column('Total Common Share Value', first_year, final_year),
+        }),
+        "A-Share/Options Analysis": pd.DataFrame({
+            "Year": years,
+            "Share Price (£)": results.column('Share Price', first_year, final_year),
+            "Proceeds from Redemption (£)": results.column('Cumulative Redemption Value', first_year, final_year),
+            "Value of Unsold Shares (£)": results.column('Value of Unsold Shares', first_year, final_year),
+            "Total Grant Value (£)": results.column('Total Grant Value', first_year, final_year),
+        }),
+        "Combined Analysis": pd.DataFrame({
+            "Year": years,
+            "Share Price (£)": results.column('Share Price', first_year, final_year),
+            "Common Share Value (£)": results.column('Total Common Share Value', first_year, final_year),
+            "A-Share/Options Value (£)": results.column('Total Grant Value', first_year, final_year),
+            "Combined Total Value (£)": results.column('Combined Total Value', first_year, final_year),
+        }),
+        "Detailed Results": detail_table().to_pandas(),
+    }
+    tornado_data = tornado(cached_sensitivity(), final_year)
+    sheets["Sensitivity"] = pd.DataFrame({
+        'Input': tornado_data['inputs'],
+        'Low': tornado_data['low'],
+        'High': tornado_data['high'],
+        f'{final_year} Value at Low (£)': tornado_data['value_low'],
+        f'{final_year} Value at High (£)': tornado_data['value_high'],
+        'Swing (£)': tornado_data['swing'],
+    })
+    sheets["Scenario Grid"] = scenario_grid_table().to_pandas()
+    return excel_bytes(sheets)
+
+with st.expander("Export Results"):
+    export_formats = available_formats()
+    if "parquet" in export_formats:
+        export_col1, export_col2 = st.columns(2)
+        with export_col1:
+            st.write("**Yearly results**")
+            st.download_button("Parquet", lambda: parquet_bytes(detail_table()), file_name="oaknorth_results.parquet", mime=PARQUET_MIME, key="results_parquet")
+            st.download_button("Arrow IPC", lambda: arrow_bytes(detail_table()), file_name="oaknorth_results.arrow", mime=ARROW_MIME, key="results_arrow")
+        with export_col2:
+            st.write("**Scenario grid** (every slider combination)")
+            st.download_button("Parquet", lambda: parquet_bytes(scenario_grid_table()), file_name="oaknorth_scenarios.parquet", mime=PARQUET_MIME, key="grid_parquet")
+            st.download_button("Arrow IPC", lambda: arrow_bytes(scenario_grid_table()), file_name="oaknorth_scenarios.arrow", mime=ARROW_MIME, key="grid_arrow")
+        if "excel" in export_formats:
+            st.download_button("Excel workbook (one sheet per analysis)", export_workbook, file_name="oaknorth_grants.xlsx", mime=EXCEL_MIME)
+        else:
+            st.caption("Install openpyxl for the Excel workbook.")
+    else:
+        st.caption("Install pyarrow for Parquet, Arrow IPC and Excel exports.")
+
+rerun_timer.mark("Export")
+
+# Cache statistics, to help size the cache for concurrent users
+with st.sidebar.expander("Cache Statistics"):
+    cache_stats = results_cache.stats()
+    st.write(f"- **Hits**: {cache_stats['hits']:,}")
+    st.write(f"- **Misses**: {cache_stats['misses']:,}")
+    st.write(f"- **Hit Rate**: {cache_stats['hit_rate']*100:.1f}%")
+    st.write(f"- **Entries**: {cache_stats['entries']:,} of {cache_stats['max_entries']:,}")
+    st.write(f"- **Evictions**: {cache_stats['evictions']:,}, **Expired**: {cache_stats['expirations']:,}")
+
+rerun_timer.mark("Cache statistics")
+finish_rerun(rerun_timer)
@@ -0,0 +1,577 @@
+"""Headless valuation engine for the equity option and OakNorth grant models.
+
+Depends only on NumPy: no Streamlit, no pandas and no module-level state.
+Every function takes its inputs explicitly, so the engine can be imported by
+batch jobs and called from several threads at once. Both Streamlit apps are
+thin front ends over it.
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from option_pricing import OPTION_PRICING_MODES, call_value
+
+# First (base) year of the projection. Nothing is redeemed or valued in the
+# base year, and the following year has no redemption either
+BASE_YEAR = 2024
+
+# Metrics tracked for every year of the projection
+RESULT_METRICS = [
+    'Share Price',
+    # Common Share metrics
+    'Common Shares Redeemed', 'Cumulative Common Redeemed', 'Unsold Common Shares',
+    'Common Redemption Value', 'Cumulative Common Redemption Value',
+    'Value of Unsold Common Shares', 'Total Common Share Value',
+    # A-Share/Options metrics
+    'Vested Shares', 'Vested Unsold Shares', 'Redeemed Shares', 'Cumulative Redeemed',
+    'Unsold Shares', 'Redemption Value', 'Cumulative Redemption Value',
+    'Value of Unsold Shares', 'Total Grant Value',
+    # Combined value
+    'Combined Total Value',
+]
+
+# Metrics that are amounts per period rather than balances; annual roll-ups sum
+# these over the year and take every other metric at the year end
+FLOW_METRICS = ['Common Shares Redeemed', 'Common Redemption Value', 'Redeemed Shares', 'Redemption Value']
+
+# How the unsold A-Share/Options are valued each year
+UNSOLD_OPTION_BASES = ("vested", "granted")
+
+
+class ProjectionResults:
+    """Columnar store for projection results.
+
+    One preallocated float64 block per metric, indexed by year offset from the
+    first projected year. Batched runs add scenario axes between the metric and
+    the year axis, so ``results['Total Grant Value']`` has shape
+    ``batch_shape + (years,)``. Sub-annual projections store one entry per
+    period instead, with ``years`` holding fractional period-end times; the
+    year-based lookups only apply to annual results.
+    """
+
+    def __init__(self, years, batch_shape=()):
+        self.years = np.asarray(years)
+        self.first_year = int(self.years[0])
+        self.batch_shape = tuple(batch_shape)
+        self._rows = {metric: row for row, metric in enumerate(RESULT_METRICS)}
+        self.data = np.zeros((len(RESULT_METRICS),) + self.batch_shape + (len(self.years),), dtype=np.float64)
+
+    def column(self, metric, first_year=None, last_year=None):
+        """Whole column for a metric, optionally limited to an inclusive range of years."""
+        start = 0 if first_year is None else first_year - self.first_year
+        stop = len(self.years) if last_year is None else last_year - self.first_year + 1
+        return self.data[self._rows[metric], ..., start:stop]
+
+    def __getitem__(self, metric):
+        return self.data[self._rows[metric]]
+
+    def __setitem__(self, metric, values):
+        self.data[self._rows[metric]] = values
+
+    def value(self, year, metric):
+        """Single year lookup, e.g. ``results.value(2035, 'Total Grant Value')``."""
+        return self.data[self._rows[metric], ..., year - self.first_year]
+
+    def copy(self):
+        results = ProjectionResults(self.years, self.batch_shape)
+        results.data[...] = self.data
+        return results
+
+
+@dataclass(frozen=True)
+class ValuationParams:
+    """Every input of a single-holder valuation.
+
+    ``vesting`` holds the cumulative vested A-Share/Options for each year after
+    the base year. ``base_price`` is the base-year share price and defaults to
+    the strike price. ``unsold_option_basis`` selects whether unsold options are
+    valued on vested unsold shares ("vested") or on all unredeemed granted
+    shares ("granted").
+
+    ``periods_per_year`` steps the model monthly (12) or quarterly (4) instead
+    of annually, with ``redemption_windows_per_year`` redemption windows spread
+    evenly through each year. Annual rates are converted to equivalent rates
+    per period or window. ``vesting`` is annual and interpolated linearly
+    between year ends unless ``vesting_per_period`` is set, in which case it
+    already holds one cumulative figure per period.
+
+    ``option_pricing`` values the unsold A-Share/Options at intrinsic value
+    ("intrinsic") or at fair value with Black-Scholes ("black_scholes") or a
+    binomial lattice ("binomial"), using ``volatility`` and
+    ``risk_free_rate`` with the options expiring at the end of the projection.
+
+    The params are frozen and hashable so they can be used directly as cache keys.
+    """
+
+    strike_price: float
+    grant_shares: float
+    common_shares: float
+    common_price: float
+    vesting: tuple
+    growth_rate: float
+    option_redemption: float
+    common_redemption: float
+    base_price: float = None
+    unsold_option_basis: str = "vested"
+    start_year: int = BASE_YEAR
+    periods_per_year: int = 1
+    redemption_windows_per_year: int = 1
+    vesting_per_period: bool = False
+    option_pricing: str = "intrinsic"
+    volatility: float = 0.0
+    risk_free_rate: float = 0.0
+
+    def __post_init__(self):
+        object.__setattr__(self, "vesting", tuple(self.vesting))
+        if self.unsold_option_basis not in UNSOLD_OPTION_BASES:
+            raise ValueError(f"unsold_option_basis must be one of {UNSOLD_OPTION_BASES}, got {self.unsold_option_basis!r}")
+        _check_periods(self.periods_per_year, self.redemption_windows_per_year)
+        if self.vesting_per_period and len(self.vesting) % self.periods_per_year:
+            raise ValueError("per-period vesting must cover whole years")
+        if self.option_pricing not in OPTION_PRICING_MODES:
+            raise ValueError(f"option_pricing must be one of {OPTION_PRICING_MODES}, got {self.option_pricing!r}")
+
+    @property
+    def n_years(self):
+        if self.vesting_per_period:
+            return len(self.vesting) // self.periods_per_year
+        return len(self.vesting)
+
+    @property
+    def years(self):
+        return list(range(self.start_year, self.start_year + self.n_years + 1))
+
+
+def _check_periods(periods_per_year, redemption_windows_per_year):
+    if periods_per_year < 1 or redemption_windows_per_year < 1 or periods_per_year % redemption_windows_per_year:
+        raise ValueError(
+            f"redemption_windows_per_year ({redemption_windows_per_year}) must divide "
+            f"periods_per_year ({periods_per_year})"
+        )
+
+
+def per_period_rate(annual_rate, periods):
+    """Convert an annual compounding rate into the equivalent rate per period."""
+    annual_rate = np.asarray(annual_rate, dtype=np.float64)
+    if periods == 1:
+        return annual_rate
+    return np.expm1(np.log1p(annual_rate) / periods)
+
+
+def per_window_redemption(annual_rate, windows):
+    """Redemption rate per window that leaves the same fraction unredeemed after a year."""
+    annual_rate = np.asarray(annual_rate, dtype=np.float64)
+    if windows == 1:
+        return annual_rate
+    # Redeeming everything (rate 1) stays 1 per window
+    with np.errstate(divide='ignore'):
+        return -np.expm1(np.log1p(-annual_rate) / windows)
+
+
+def interpolate_vesting(vesting, periods_per_year):
+    """Spread annual cumulative vesting linearly over each year's periods.
+
+    The base year counts as zero vested, and each year's last period equals
+    that year's annual figure.
+    """
+    vesting = np.asarray(vesting, dtype=np.float64)
+    if periods_per_year == 1:
+        return vesting
+    previous = np.concatenate([np.zeros(vesting.shape[:-1] + (1,)), vesting[..., :-1]], axis=-1)
+    fractions = np.arange(1, periods_per_year + 1) / periods_per_year
+    periods = previous[..., None] + (vesting - previous)[..., None] * fractions
+    return periods.reshape(vesting.shape[:-1] + (-1,))
+
+
+def rollup_annual(results, periods_per_year):
+    """Roll sub-annual results up to years: balances at year end, flows summed."""
+    if periods_per_year == 1:
+        return results
+    n_years = (len(results.years) - 1) // periods_per_year
+    annual = ProjectionResults(results.first_year + np.arange(n_years + 1), results.batch_shape)
+    annual.data[...] = results.data[..., ::periods_per_year]
+    for metric in FLOW_METRICS:
+        flows = results[metric][..., 1:].reshape(results.batch_shape + (n_years, periods_per_year))
+        annual[metric][..., 1:] = flows.sum(axis=-1)
+    return annual
+
+
+def sanitize_vesting(vesting, grant_shares, first_year_default=60000, step=5000):
+    """Apply the working sheet's vesting safety fallbacks to a batch of schedules.
+
+    ``vesting`` has years on its last axis and NaN for missing entries. A
+    missing year falls back to the previous year's input (0 if that is missing
+    too). A value below zero or above ``grant_shares`` is replaced by
+    ``first_year_default`` in the first year and by the previous year's
+    vested shares plus ``step`` afterwards, capped at ``grant_shares``.
+    """
+    raw = np.asarray(vesting, dtype=np.float64)
+    grant = np.asarray(grant_shares, dtype=np.float64)
+    previous_raw = np.concatenate([np.full(raw.shape[:-1] + (1,), np.nan), raw[..., :-1]], axis=-1)
+    filled = np.where(np.isnan(raw), np.nan_to_num(previous_raw, nan=0.0), raw)
+    invalid = (filled < 0) | (filled > grant[..., None])
+
+    sanitized = np.empty(np.broadcast_shapes(filled.shape, grant.shape + (1,)))
+    sanitized[..., 0] = np.where(invalid[..., 0], np.minimum(first_year_default, grant), filled[..., 0])
+    for i in range(1, sanitized.shape[-1]):
+        fallback = np.minimum(sanitized[..., i-1] + step, grant)
+        sanitized[..., i] = np.where(invalid[..., i], fallback, filled[..., i])
+    return sanitized
+
+
+def redemption_schedule(holdings, rate, first=2, every=1, start=0, previous=None):
+    """Redeem ``rate`` of the PREVIOUS period's remaining shares in each window.
+
+    Windows fall on period ``first`` and every ``every`` periods after it; by
+    default that is every year from the second year after the base year.
+    Remaining shares are clamped at zero, which makes this a true recurrence,
+    so it is the only step that walks the periods. Periods run along the last
+    axis; any leading axes (e.g. a grid of redemption rates) are computed
+    together in the same pass. Returns ``(redeemed, remaining)``.
+
+    ``previous`` resumes an earlier schedule whose holdings matched these up
+    to period ``start``: it holds that run's ``(redeemed, remaining,
+    cumulative redeemed)`` arrays, the periods before ``start`` are copied from
+    it and the recurrence only walks from ``start`` onward.
+    """
+    holdings = np.asarray(holdings, dtype=np.float64)
+    rate = np.asarray(rate, dtype=np.float64)
+    shape = np.broadcast_shapes(holdings.shape, rate.shape + (1,))
+    if previous is not None and start > 0:
+        shape = np.broadcast_shapes(shape, previous[0].shape)
+    redeemed = np.zeros(shape)
+    remaining = np.zeros(shape)
+    remaining[..., :first] = holdings[..., :first]
+    cumulative = np.zeros(shape[:-1])
+    if previous is not None and start > 0:
+        previous_redeemed, previous_remaining, previous_cumulative = previous
+        redeemed[..., :start] = previous_redeemed[..., :start]
+        remaining[..., :start] = previous_remaining[..., :start]
+        cumulative = cumulative + previous_cumulative[..., start-1]
+        first_walked = max(first, start)
+    else:
+        first_walked = first
+    for i in range(first_walked, shape[-1]):
+        if (i - first) % every == 0:
+            redeemed[..., i] = remaining[..., i-1] * rate
+            cumulative = cumulative + redeemed[..., i]
+        remaining[..., i] = np.maximum(0, holdings[..., i] - cumulative)
+    return redeemed, remaining
+
+
+def project_arrays(growth_rate, option_redemption, common_redemption, vesting, strike_price,
+                   grant_shares, common_shares, common_price, base_price=None,
+                   unsold_option_basis="vested", start_year=BASE_YEAR, growth_path=None,
+                   periods_per_year=1, redemption_windows_per_year=1,
+                   option_pricing="intrinsic", volatility=0.0, risk_free_rate=0.0):
+    """Project every metric for a batch of scenarios in one broadcasted pass.
+
+    All scalar inputs may be arrays that broadcast against each other; their
+    broadcast shape becomes the batch shape of the returned
+    :class:`ProjectionResults`. ``vesting`` carries the periods on its last
+    axis: one cumulative figure per period after the base year.
+
+    ``growth_path`` optionally replaces the constant ``growth_rate`` with a
+    growth rate per period (periods on the last axis), e.g. simulated Monte
+    Carlo paths. With ``periods_per_year`` above 1 the annual ``growth_rate``
+    and redemption rates are converted to per-period and per-window rates,
+    and the results stay at period resolution (see :func:`rollup_annual`).
+
+    ``option_pricing``, ``volatility`` and ``risk_free_rate`` select how the
+    unsold A-Share/Options are valued, as on :class:`ValuationParams`.
+    """
+    if unsold_option_basis not in UNSOLD_OPTION_BASES:
+        raise ValueError(f"unsold_option_basis must be one of {UNSOLD_OPTION_BASES}, got {unsold_option_basis!r}")
+    if option_pricing not in OPTION_PRICING_MODES:
+        raise ValueError(f"option_pricing must be one of {OPTION_PRICING_MODES}, got {option_pricing!r}")
+    _check_periods(periods_per_year, redemption_windows_per_year)
+    window_every = periods_per_year // redemption_windows_per_year
+
+    vesting = np.asarray(vesting, dtype=np.float64)
+    if growth_path is None:
+        growth_factors = (1 + per_period_rate(growth_rate, periods_per_year))[..., None]
+    else:
+        growth_factors = 1 + np.asarray(growth_path, dtype=np.float64)
+    option_redemption = per_window_redemption(option_redemption, redemption_windows_per_year)
+    common_redemption = per_window_redemption(common_redemption, redemption_windows_per_year)
+    strike = np.asarray(strike_price, dtype=np.float64)
+    base = strike if base_price is None else np.asarray(base_price, dtype=np.float64)
+    grant = np.asarray(grant_shares, dtype=np.float64)
+    common = np.asarray(common_shares, dtype=np.float64)
+    common_purchase = np.asarray(common_price, dtype=np.float64)
+
+    n_years = vesting.shape[-1] + 1
+    if periods_per_year == 1:
+        years = list(range(start_year, start_year + n_years))
+    else:
+        years = start_year + np.arange(n_years) / periods_per_year
+    batch_shape = np.broadcast_shapes(
+        growth_factors.shape[:-1], np.shape(option_redemption), np.shape(common_redemption), vesting.shape[:-1],
+        strike.shape, base.shape, grant.shape, common.shape, common_purchase.shape,
+        np.shape(volatility), np.shape(risk_free_rate)
+    )
+    results = ProjectionResults(years, batch_shape)
+
+    # Share price: base price compounded by (1 + growth rate) each year. cumprod
+    # multiplies in the same order as a year-by-year loop, so there is no rounding drift
+    price_factors = np.empty(np.broadcast_shapes(growth_factors.shape[:-1], base.shape) + (n_years,))
+    price_factors[..., 0] = base
+    price_factors[..., 1:] = growth_factors
+    share_price = np.cumprod(price_factors, axis=-1)
+    results['Share Price'] = share_price
+
+    # Common Share calculations (no redemption until the second projected year)
+    common_holdings = np.broadcast_to(common[..., None], common.shape + (n_years,))
+    common_redeemed, unsold_common = redemption_schedule(
+        common_holdings, common_redemption, first=periods_per_year + window_every, every=window_every
+    )
+    results['Common Shares Redeemed'] = common_redeemed
+    results['Cumulative Common Redeemed'] = np.cumsum(common_redeemed, axis=-1)
+    results['Unsold Common Shares'] = unsold_common
+
+    # Common redemption value = (share price - common purchase price) * common shares redeemed
+    common_price_diff = np.maximum(0, share_price - common_purchase[..., None])
+    results['Common Redemption Value'] = common_price_diff * common_redeemed
+    results['Cumulative Common Redemption Value'] = np.cumsum(results['Common Redemption Value'], axis=-1)
+
+    # Value of unsold common shares (nothing is valued in the base year)
+    results['Value of Unsold Common Shares'] = common_price_diff * unsold_common
+    results['Value of Unsold Common Shares'][..., 0] = 0.0
+    results['Total Common Share Value'] = results['Cumulative Common Redemption Value'] + results['Value of Unsold Common Shares']
+
+    # A-Share/Options calculations: nothing is vested in the base year
+    vested = np.concatenate([np.zeros(vesting.shape[:-1] + (1,)), vesting], axis=-1)
+    unit_value = _unsold_option_value(share_price, strike, periods_per_year, option_pricing, volatility, risk_free_rate)
+    _option_metrics(
+        results, vested, option_redemption, strike, grant, unsold_option_basis,
+        first=periods_per_year + window_every, every=window_every, unit_value=unit_value
+    )
+    return results
+
+
+def _unsold_option_value(share_price, strike, periods_per_year, option_pricing, volatility, risk_free_rate):
+    # Fair value per unsold option for each period, or None for intrinsic value.
+    # The options expire at the end of the projection
+    if option_pricing == "intrinsic":
+        return None
+    n_periods = share_price.shape[-1]
+    years_to_expiry = (n_periods - 1 - np.arange(n_periods)) / periods_per_year
+    volatility = np.asarray(volatility, dtype=np.float64)[..., None]
+    risk_free_rate = np.asarray(risk_free_rate, dtype=np.float64)[..., None]
+    return call_value(option_pricing, share_price, strike[..., None], years_to_expiry, volatility, risk_free_rate)
+
+
+def _cumulative(results, metric, values, start):
+    # Running total of values into metric from period start, carrying on from
+    # the stored total before it; cumsum adds in order, so this matches a full cumsum exactly
+    if start == 0:
+        results[metric] = np.cumsum(values, axis=-1)
+    else:
+        carried = np.concatenate([results[metric][..., start-1:start], values[..., start:]], axis=-1)
+        results[metric][..., start:] = np.cumsum(carried, axis=-1)[..., 1:]
+
+
+def _option_metrics(results, vested, option_redemption, strike, grant, unsold_option_basis, first, every, start=0,
+                    unit_value=None):
+    """Fill the A-Share/Options and combined metrics from period ``start`` onward.
+
+    ``results`` must already hold the share price and common share metrics, and
+    when ``start`` is above 0 also every metric for the periods before it.
+    ``unit_value`` is the value per unsold option for each period; redemptions
+    are always paid at intrinsic value, as are unsold options when it is None.
+    """
+    tail = (Ellipsis, slice(start, None))
+    share_price = results['Share Price']
+    results['Vested Shares'][tail] = vested[tail]
+
+    # Redeemed shares each year (% of previous year's vested unsold shares)
+    previous = None
+    if start > 0:
+        previous = (results['Redeemed Shares'], results['Vested Unsold Shares'], results['Cumulative Redeemed'])
+    redeemed, vested_unsold = redemption_schedule(vested, option_redemption, first=first, every=every, start=start, previous=previous)
+    results['Redeemed Shares'][tail] = redeemed[tail]
+    _cumulative(results, 'Cumulative Redeemed', redeemed, start)
+    results['Vested Unsold Shares'][tail] = vested_unsold[tail]
+    results['Unsold Shares'][tail] = grant[..., None] - results['Cumulative Redeemed'][tail]
+
+    # Redemption value = (share price - strike price) * redeemed shares
+    share_price_diff = np.maximum(0, share_price[tail] - strike[..., None])
+    results['Redemption Value'][tail] = share_price_diff * redeemed[tail]
+    _cumulative(results, 'Cumulative Redemption Value', results['Redemption Value'], start)
+
+    # Value of unsold shares, on vested unsold or all unredeemed granted shares
+    unsold_basis = vested_unsold if unsold_option_basis == "vested" else results['Unsold Shares']
+    if unit_value is not None:
+        share_price_diff = np.broadcast_to(unit_value, results.batch_shape + share_price.shape[-1:])[tail]
+    results['Value of Unsold Shares'][tail] = share_price_diff * unsold_basis[tail]
+    if start == 0:
+        results['Value of Unsold Shares'][..., 0] = 0.0
+    results['Total Grant Value'][tail] = results['Cumulative Redemption Value'][tail] + results['Value of Unsold Shares'][tail]
+
+    # Combined value
+    results['Combined Total Value'][tail] = results['Total Common Share Value'][tail] + results['Total Grant Value'][tail]
+
+
+def param_arrays(params):
+    """Keyword arguments for :func:`project_arrays` from :class:`ValuationParams`."""
+    vesting = params.vesting
+    if not params.vesting_per_period:
+        vesting = interpolate_vesting(vesting, params.periods_per_year)
+    return dict(
+        growth_rate=params.growth_rate,
+        option_redemption=params.option_redemption,
+        common_redemption=params.common_redemption,
+        vesting=vesting,
+        strike_price=params.strike_price,
+        grant_shares=params.grant_shares,
+        common_shares=params.common_shares,
+        common_price=params.common_price,
+        base_price=params.base_price,
+        unsold_option_basis=params.unsold_option_basis,
+        start_year=params.start_year,
+        periods_per_year=params.periods_per_year,
+        redemption_windows_per_year=params.redemption_windows_per_year,
+        option_pricing=params.option_pricing,
+        volatility=params.volatility,
+        risk_free_rate=params.risk_free_rate,
+    )
+
+
+def project_periods(params, growth_path=None):
+    """Project a single scenario at the params' period resolution.
+
+    ``growth_path`` optionally gives a growth rate per projected YEAR (years on
+    the last axis, any leading path axes); it is spread evenly over each
+    year's periods.
+    """
+    arrays = param_arrays(params)
+    if growth_path is not None:
+        per_period = per_period_rate(growth_path, params.periods_per_year)
+        arrays['growth_path'] = np.repeat(per_period, params.periods_per_year, axis=-1)
+    return project_arrays(**arrays)
+
+
+def first_changed_period(previous_params, params):
+    """First period whose projection can differ between two sets of params.
+
+    Redemptions only look back, so a vesting change can't affect earlier
+    periods. Returns 0 when anything other than vesting differs, and one past
+    the last period when nothing does.
+    """
+    if replace(previous_params, vesting=()) != replace(params, vesting=()):
+        return 0
+    previous_vesting = param_arrays(previous_params)['vesting']
+    vesting = param_arrays(params)['vesting']
+    if previous_vesting.shape != vesting.shape:
+        return 0
+    changed = np.flatnonzero(previous_vesting != vesting)
+    # Vesting entry i is period i + 1; period 0 is the base year
+    return int(changed[0]) + 1 if changed.size else len(vesting) + 1
+
+
+def reproject_periods(previous, previous_params, params):
+    """Like :func:`project_periods`, reusing ``previous`` where it still holds.
+
+    ``previous`` is the :func:`project_periods` result for ``previous_params``.
+    Everything before the first changed period (see
+    :func:`first_changed_period`) is copied from it; the share price and common
+    shares don't depend on vesting at all, so only the A-Share/Options
+    metrics are recomputed, from that period onward.
+    """
+    start = first_changed_period(previous_params, params)
+    if start == 0:
+        return project_periods(params)
+    return _resume_options(previous, params, params.option_redemption, start)
+
+
+def _resume_options(previous, params, option_redemption, start):
+    # Copy of previous with the A-Share/Options metrics recomputed from period start
+    if start >= len(previous.years):
+        return previous
+    window_every = params.periods_per_year // params.redemption_windows_per_year
+    results = previous.copy()
+    vested = np.concatenate([[0.0], param_arrays(params)['vesting']])
+    strike = np.asarray(params.strike_price, dtype=np.float64)
+    unit_value = _unsold_option_value(
+        results['Share Price'], strike, params.periods_per_year, params.option_pricing,
+        params.volatility, params.risk_free_rate
+    )
+    _option_metrics(
+        results, vested, per_window_redemption(option_redemption, params.redemption_windows_per_year),
+        strike, np.asarray(params.grant_shares, dtype=np.float64), params.unsold_option_basis,
+        first=params.periods_per_year + window_every, every=window_every, start=start, unit_value=unit_value
+    )
+    return results
+
+
+def project(params, growth_path=None):
+    """Project a single scenario described by :class:`ValuationParams`, by year.
+
+    Sub-annual runs are rolled up to years; see :func:`project_periods`.
+    """
+    return rollup_annual(project_periods(params, growth_path), params.periods_per_year)
+
+
+def project_grid_periods(params, growth_rates, option_redemption_rates, common_redemption_rates):
+    """Evaluate the Cartesian grid of growth x option redemption x common redemption rates.
+
+    The rates in ``params`` are replaced by the grid axes, giving results at
+    the params' period resolution with batch shape ``(growth rates, option
+    rates, common rates)``.
+    """
+    arrays = param_arrays(params)
+    arrays['growth_rate'] = np.asarray(growth_rates, dtype=np.float64).reshape(-1, 1, 1)
+    arrays['option_redemption'] = np.asarray(option_redemption_rates, dtype=np.float64).reshape(1, -1, 1)
+    arrays['common_redemption'] = np.asarray(common_redemption_rates, dtype=np.float64).reshape(1, 1, -1)
+    return project_arrays(**arrays)
+
+
+def reproject_grid_periods(previous, previous_params, params, growth_rates, option_redemption_rates, common_redemption_rates):
+    """Like :func:`project_grid_periods`, reusing ``previous`` as :func:`reproject_periods` does.
+
+    ``previous`` must be the grid for ``previous_params`` over the same rates.
+    """
+    start = first_changed_period(previous_params, params)
+    if start == 0:
+        return project_grid_periods(params, growth_rates, option_redemption_rates, common_redemption_rates)
+    option_rates = np.asarray(option_redemption_rates, dtype=np.float64).reshape(1, -1, 1)
+    return _resume_options(previous, params, option_rates, start)
+
+
+def project_grid(params, growth_rates, option_redemption_rates, common_redemption_rates):
+    """Annual results for the rate grid of :func:`project_grid_periods`."""
+    grid = project_grid_periods(params, growth_rates, option_redemption_rates, common_redemption_rates)
+    return rollup_annual(grid, params.periods_per_year)
+
+
+# Settings shared by every scenario of a :func:`project_many` batch
+BATCH_SETTINGS = ('unsold_option_basis', 'start_year', 'periods_per_year', 'redemption_windows_per_year', 'option_pricing')
+
+
+def batch_key(params):
+    """Scenarios with equal keys can be projected together by :func:`project_many`."""
+    return tuple(getattr(params, setting) for setting in BATCH_SETTINGS) + (params.n_years,)
+
+
+def project_many(params_list):
+    """Annual results for several :class:`ValuationParams` in one batched pass.
+
+    The scenarios may differ in any numeric input, including vesting, but must
+    share a :func:`batch_key`. The results have batch shape
+    ``(len(params_list),)`` in the order given.
+    """
+    keys = {batch_key(params) for params in params_list}
+    if len(keys) != 1:
+        raise ValueError("batched scenarios must share their settings and number of years")
+    arrays = [param_arrays(params) for params in params_list]
+    batched = {setting: arrays[0][setting] for setting in BATCH_SETTINGS}
+    for name in arrays[0]:
+        if name in BATCH_SETTINGS:
+            continue
+        if name == 'base_price':
+            # A missing base price defaults to each scenario's own strike price
+            values = [a['strike_price'] if a['base_price'] is None else a['base_price'] for a in arrays]
+        else:
+            values = [a[name] for a in arrays]
+        batched[name] = np.array(values, dtype=np.float64)
+    return rollup_annual(project_arrays(**batched), params_list[0].periods_per_year)
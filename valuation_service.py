@@ -0,0 +1,265 @@
+"""Local HTTP service for the working sheet's valuations.
+
+Usage::
+
+    python valuation_service.py --port 8765
+
+Endpoints:
+
+``GET /health``
+    ``{"status": "ok"}`` plus the response cache statistics.
+
+``POST /value``
+    One scenario as a JSON object of :class:`ValuationParams` fields, e.g.
+    ``{"strike_price": 6.0, "vesting": [60000, 70000, ...], "growth_rate": 0.15}``,
+    with an optional ``"metrics"`` list. Fields left out take the working
+    sheet's defaults, and vesting gets the sheet's safety fallbacks. Returns
+    ``{"years": [...], "results": {metric: [...]}}`` for every projected year.
+
+``POST /batch``
+    ``{"scenarios": [{...}, ...], "defaults": {...}, "metrics": [...]}`` for
+    many parameter sets or holders at once; ``defaults`` fills fields missing
+    from every scenario. The response is newline-delimited JSON, one line per
+    scenario in request order (``{"index": i, "id": ..., "years": ...,
+    "results": ...}`` or ``{"index": i, "error": ...}``), streamed as each
+    chunk of scenarios is valued.
+
+Results are kept in a process-wide response cache, so repeated scenarios are
+answered without running the engine. Cache misses within a chunk are valued
+together in one batched engine call per group of shared settings.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+from dataclasses import fields
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from scenario_cache import get_cache
+from valuation_engine import RESULT_METRICS, ValuationParams, batch_key, project_many, sanitize_vesting
+
+# The working sheet's default holder; request fields override these
+SCENARIO_DEFAULTS = {
+    'strike_price': 6.00,
+    'grant_shares': 100000,
+    'common_shares': 10000,
+    'common_price': 2.00,
+    'vesting': [60000, 70000, 80000, 90000, 100000, 100000, 100000, 100000, 100000, 100000, 100000],
+    'growth_rate': 0.20,
+    'option_redemption': 0.05,
+    'common_redemption': 0.05,
+    'base_price': 6.00,
+    'unsold_option_basis': "vested",
+}
+PARAM_FIELDS = {field.name for field in fields(ValuationParams)}
+# JSON numbers are checked and converted up front, so one bad scenario can't fail a whole batch
+FLOAT_FIELDS = ('strike_price', 'grant_shares', 'common_shares', 'common_price', 'growth_rate',
+                'option_redemption', 'common_redemption', 'base_price', 'volatility', 'risk_free_rate')
+INT_FIELDS = ('start_year', 'periods_per_year', 'redemption_windows_per_year')
+BOOL_FIELDS = ('vesting_per_period',)
+STRING_FIELDS = ('unsold_option_basis', 'option_pricing')
+
+MAX_BODY_BYTES = int(os.environ.get("VALUATION_SERVICE_MAX_BODY", str(64 * 1024 * 1024)))
+# Scenarios valued (and streamed) per engine batch
+CHUNK_SIZE = int(os.environ.get("VALUATION_SERVICE_CHUNK_SIZE", "1000"))
+
+response_cache = get_cache("valuation-service")
+
+
+class RequestError(ValueError):
+    """A request the service can't value; reported to the client as 400 Bad Request."""
+
+
+def _number(name, value):
+    # A finite number. JSON booleans are ints to Python and NaN/Infinity parse, but neither is a value
+    if isinstance(value, bool):
+        raise RequestError(f"{name} must be a number, got {json.dumps(value)}")
+    number = float(value)
+    if not math.isfinite(number):
+        raise RequestError(f"{name} must be a finite number, got {value}")
+    return number
+
+
+def _whole_number(name, value):
+    number = _number(name, value)
+    if not number.is_integer():
+        raise RequestError(f"{name} must be a whole number, got {value}")
+    return int(number)
+
+
+def scenario_params(scenario, defaults=None):
+    """:class:`ValuationParams` for one request scenario over ``defaults`` and the sheet defaults."""
+    if not isinstance(scenario, dict):
+        raise RequestError("each scenario must be a JSON object")
+    merged = dict(SCENARIO_DEFAULTS, **(defaults or {}))
+    merged.update({name: value for name, value in scenario.items() if name != 'id'})
+    unknown = sorted(set(merged) - PARAM_FIELDS)
+    if unknown:
+        raise RequestError(f"unknown fields: {', '.join(unknown)}")
+    try:
+        for name in FLOAT_FIELDS:
+            if merged.get(name) is not None:
+                merged[name] = _number(name, merged[name])
+        for name in INT_FIELDS:
+            if name in merged:
+                merged[name] = _whole_number(name, merged[name])
+        # The params are cache keys, so every field must end up hashable
+        for name in BOOL_FIELDS:
+            if name in merged and not isinstance(merged[name], bool):
+                raise RequestError(f"{name} must be true or false")
+        for name in STRING_FIELDS:
+            if name in merged and not isinstance(merged[name], str):
+                raise RequestError(f"{name} must be a string")
+        if not isinstance(merged['vesting'], list):
+            raise RequestError("vesting must be a list of numbers")
+        if merged.get('vesting_per_period'):
+            merged['vesting'] = tuple(_number('vesting', value) for value in merged['vesting'])
+        else:
+            # Same fallbacks as the working sheet's vesting inputs
+            vesting = np.array([np.nan if value is None else _number('vesting', value) for value in merged['vesting']], dtype=np.float64)
+            merged['vesting'] = tuple(sanitize_vesting(vesting, merged['grant_shares']).tolist())
+        return ValuationParams(**merged)
+    except RequestError:
+        raise
+    except (TypeError, ValueError) as e:
+        raise RequestError(str(e)) from e
+
+
+def requested_metrics(payload):
+    metrics = payload.get('metrics', RESULT_METRICS)
+    if not isinstance(metrics, list) or not all(isinstance(metric, str) for metric in metrics):
+        raise RequestError("metrics must be a list of metric names")
+    unknown = [metric for metric in metrics if metric not in RESULT_METRICS]
+    if unknown:
+        raise RequestError(f"unknown metrics: {', '.join(unknown)}")
+    return tuple(metrics)
+
+
+def value_scenarios(params_list, metrics):
+    """Response bodies for ``params_list``, from the cache or batched engine calls."""
+    bodies = [response_cache.peek(('response', params, metrics)) for params in params_list]
+
+    # Value the misses together, one engine call per group of shared settings
+    groups = {}
+    for index, params in enumerate(params_list):
+        if bodies[index] is None:
+            groups.setdefault(batch_key(params), []).append(index)
+    for indexes in groups.values():
+        results = project_many([params_list[index] for index in indexes])
+        years = results.years[1:].tolist()
+        for batch_index, index in enumerate(indexes):
+            body = {
+                'years': years,
+                'results': {metric: results[metric][batch_index, 1:].tolist() for metric in metrics},
+            }
+            response_cache.put(('response', params_list[index], metrics), body)
+            bodies[index] = body
+    return bodies
+
+
+class ValuationHandler(BaseHTTPRequestHandler):
+    server_version = "ValuationService/1.0"
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send_json({'status': "ok", 'cache': response_cache.stats()})
+        else:
+            self._send_json({'error': f"no such endpoint: {self.path}"}, HTTPStatus.NOT_FOUND)
+
+    def do_POST(self):
+        endpoints = {"/value": self._value, "/batch": self._batch}
+        handler = endpoints.get(self.path.rstrip("/"))
+        if handler is None:
+            self._send_json({'error': f"no such endpoint: {self.path}"}, HTTPStatus.NOT_FOUND)
+            return
+        try:
+            handler(self._read_json())
+        except (RequestError, TypeError) as e:
+            # TypeError: a request shape the checks above missed; still the client's error
+            self._send_json({'error': str(e)}, HTTPStatus.BAD_REQUEST)
+
+    def _value(self, payload):
+        metrics = requested_metrics(payload)
+        scenario = {name: value for name, value in payload.items() if name != 'metrics'}
+        self._send_json(value_scenarios([scenario_params(scenario)], metrics)[0])
+
+    def _batch(self, payload):
+        metrics = requested_metrics(payload)
+        scenarios = payload.get('scenarios')
+        if not isinstance(scenarios, list):
+            raise RequestError("'scenarios' must be a list")
+        defaults = payload.get('defaults') or {}
+        if not isinstance(defaults, dict):
+            raise RequestError("'defaults' must be a JSON object")
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for start in range(0, len(scenarios), CHUNK_SIZE):
+            chunk = scenarios[start:start + CHUNK_SIZE]
+            lines = [None] * len(chunk)
+            valid = []
+            for offset, scenario in enumerate(chunk):
+                try:
+                    valid.append((offset, scenario_params(scenario, defaults)))
+                except RequestError as e:
+                    lines[offset] = {'index': start + offset, 'error': str(e)}
+            bodies = value_scenarios([params for _, params in valid], metrics)
+            for (offset, _), body in zip(valid, bodies):
+                line = {'index': start + offset}
+                if 'id' in chunk[offset]:
+                    line['id'] = chunk[offset]['id']
+                line.update(body)
+                lines[offset] = line
+            self.wfile.write("".join(json.dumps(line) + "\n" for line in lines).encode("utf-8"))
+            self.wfile.flush()
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError(f"request body over {MAX_BODY_BYTES:,} bytes")
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise RequestError(f"invalid JSON: {e}") from e
+        if not isinstance(payload, dict):
+            raise RequestError("request body must be a JSON object")
+        return payload
+
+    def _send_json(self, body, status=HTTPStatus.OK):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(host="127.0.0.1", port=8765):
+    """A threaded server for :class:`ValuationHandler`; call ``serve_forever()`` to run it."""
+    return ThreadingHTTPServer((host, port), ValuationHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve valuations over HTTP on the local machine.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port)
+    print(f"Serving valuations on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Compile declarative vesting rules into cumulative vested-share arrays.
+
+Usage::
+
+    python vesting_rules.py grant_rules.csv -o cap_table.csv --first-year 2025 --years 11
+
+A schedule is described by rules instead of typed-in yearly figures:
+
+- time-based vesting over ``vesting_months`` from ``start_month`` (months
+  after the end of the base year), in steps of ``frequency_months`` (1 for
+  monthly, 3 for quarterly, 12 for annual graded vesting), with nothing
+  vesting before a ``cliff_months`` cliff and the accrued shares vesting at it
+- performance tranches, each a fraction of the grant that vests at the end of
+  the year its target is met (NaN while it hasn't been)
+- acceleration: at the end of ``acceleration_year`` an
+  ``acceleration_fraction`` of the shares still unvested vests at once; the
+  rest keeps vesting on the original schedule, scaled down
+
+Every rule is an array broadcast over holders, so tens of thousands of
+schedules compile in one vectorized pass. The CLI turns a CSV of rules into
+the ``vest_<year>`` columns read by ``batch_valuation.py`` and ``portfolio.py``.
+"""
+import argparse
+import csv
+import re
+import sys
+
+import numpy as np
+
+from csv_rows import data_rows, read_header
+
+# Rule columns read from a CSV, with their defaults when the column is missing
+RULE_DEFAULTS = {
+    'vesting_months': 48.0,
+    'cliff_months': 12.0,
+    'frequency_months': 1.0,
+    'start_month': 0.0,
+    'acceleration_year': np.nan,
+    'acceleration_fraction': 1.0,
+}
+TRANCHE_COLUMN = re.compile(r"^tranche_(\d+)_(fraction|year)$")
+VESTING_FREQUENCIES = {"Monthly": 1, "Quarterly": 3, "Annually": 12}
+
+
+def _time_vested_fraction(months, vesting_months, cliff_months, frequency_months, start_month):
+    # Fraction of the time-based shares vested ``months`` after the base year end
+    elapsed = months - start_month
+    # Whole vesting steps completed; the small tolerance keeps exact step boundaries exact
+    steps = np.floor(elapsed / frequency_months + 1e-9) * frequency_months
+    fraction = np.clip(steps / vesting_months, 0.0, 1.0)
+    return np.where(elapsed + 1e-9 >= cliff_months, fraction, 0.0)
+
+
+def compile_vesting(grant_shares, start_year, n_years, vesting_months=48.0, cliff_months=12.0, frequency_months=1.0,
+                    start_month=0.0, tranche_fractions=None, tranche_years=None, acceleration_year=np.nan,
+                    acceleration_fraction=1.0, periods_per_year=1):
+    """Cumulative vested shares at the end of every period after ``start_year``.
+
+    Every rule argument may be an array; they broadcast together with
+    ``grant_shares`` into the holder shape. ``tranche_fractions`` and
+    ``tranche_years`` carry the tranches on their last axis. The result has
+    the holder shape plus ``n_years * periods_per_year`` periods on the last
+    axis: with the default one period a year it is the annual ``vesting``
+    of :class:`ValuationParams`, otherwise it is per-period vesting for
+    ``vesting_per_period=True``. Vested shares are rounded down to whole
+    shares and never decrease.
+    """
+    grant = np.asarray(grant_shares, dtype=np.float64)
+    vesting_months = np.asarray(vesting_months, dtype=np.float64)
+    frequency_months = np.asarray(frequency_months, dtype=np.float64)
+    if tranche_fractions is None:
+        tranche_fractions, tranche_years = np.zeros(1), np.full(1, np.nan)
+    tranche_fractions = np.asarray(tranche_fractions, dtype=np.float64)
+    tranche_years = np.asarray(tranche_years, dtype=np.float64)
+    check_rules(vesting_months, cliff_months, frequency_months, tranche_fractions, acceleration_fraction)
+
+    # Month at the end of each period, measured from the end of the base year
+    months = np.arange(1, n_years * periods_per_year + 1) * (12 / periods_per_year)
+    performance_share = tranche_fractions.sum(axis=-1)
+
+    def vested_fraction(at_months):
+        time_based = _time_vested_fraction(
+            at_months, *(np.asarray(rule, dtype=np.float64)[..., None] for rule in
+                         (vesting_months, cliff_months, frequency_months, start_month))
+        )
+        # Tranches vest at the end of the year their target is met
+        met_month = (tranche_years - start_year) * 12
+        with np.errstate(invalid='ignore'):
+            met = met_month[..., None] <= at_months[..., None, :]
+        performance = (tranche_fractions[..., None] * met).sum(axis=-2)
+        return (1 - performance_share)[..., None] * time_based + performance
+
+    fraction = vested_fraction(months)
+
+    # Acceleration: part of what is unvested at the event vests at once, the rest on schedule
+    acceleration_month = (np.asarray(acceleration_year, dtype=np.float64) - start_year) * 12
+    accelerated = np.asarray(acceleration_fraction, dtype=np.float64)[..., None]
+    at_event = vested_fraction(np.nan_to_num(acceleration_month, nan=0.0)[..., None] + np.zeros_like(months))
+    with np.errstate(invalid='ignore'):
+        after_event = acceleration_month[..., None] <= months
+    fraction = np.where(
+        after_event,
+        at_event + accelerated * (1 - at_event) + (1 - accelerated) * (fraction - at_event),
+        fraction,
+    )
+
+    vested = np.floor(np.round(grant[..., None] * np.clip(fraction, 0.0, 1.0), 6))
+    return np.maximum.accumulate(vested, axis=-1)
+
+
+def check_rules(vesting_months, cliff_months, frequency_months, tranche_fractions, acceleration_fraction):
+    """Raise ValueError naming how many holders break each rule constraint."""
+    problems = {
+        "vesting_months must be positive": np.asarray(vesting_months) <= 0,
+        "cliff_months can't be negative": np.asarray(cliff_months) < 0,
+        "frequency_months must be positive": np.asarray(frequency_months) <= 0,
+        "tranche fractions must be between 0 and 1": np.any((tranche_fractions < 0) | (tranche_fractions > 1), axis=-1),
+        "tranche fractions can't add up to more than the grant": tranche_fractions.sum(axis=-1) > 1 + 1e-9,
+        "acceleration_fraction must be between 0 and 1":
+            (np.asarray(acceleration_fraction) < 0) | (np.asarray(acceleration_fraction) > 1),
+    }
+    errors = [f"{message} ({int(np.count_nonzero(invalid)):,} schedules)" for message, invalid in problems.items() if np.any(invalid)]
+    if errors:
+        raise ValueError("; ".join(errors))
+
+
+def validate_vesting(vesting, grant_shares):
+    """Problems in cumulative vesting schedules, as boolean masks shaped like ``vesting``.
+
+    ``vesting`` has years on its last axis. Returns a dict with ``missing``
+    (NaN), ``negative``, ``above_grant`` and ``decreasing`` (less than the
+    previous year's figure) entries, all checked in one pass over every
+    schedule.
+    """
+    vesting = np.asarray(vesting, dtype=np.float64)
+    grant = np.asarray(grant_shares, dtype=np.float64)[..., None]
+    with np.errstate(invalid='ignore'):
+        decreasing = np.zeros(vesting.shape, dtype=bool)
+        decreasing[..., 1:] = vesting[..., 1:] < vesting[..., :-1]
+        return {
+            'missing': np.isnan(vesting),
+            'negative': vesting < 0,
+            'above_grant': vesting > grant,
+            'decreasing': decreasing,
+        }
+
+
+def rule_columns(columns, n_holders):
+    """Keyword arguments for :func:`compile_vesting` from ``{column name: values}``.
+
+    Missing rule columns take :data:`RULE_DEFAULTS`; empty cells of a present
+    column take its default too. Tranches come from ``tranche_<n>_fraction``
+    and ``tranche_<n>_year`` column pairs.
+    """
+    def floats(values, default):
+        return np.array([float(value) if value.strip() else default for value in values], dtype=np.float64)
+
+    rules = {
+        name: floats(columns[name], default) if name in columns else np.full(n_holders, default)
+        for name, default in RULE_DEFAULTS.items()
+    }
+    tranches = sorted({int(match.group(1)) for name in columns if (match := TRANCHE_COLUMN.match(name))})
+    if tranches:
+        for number in tranches:
+            for part in ("fraction", "year"):
+                if f"tranche_{number}_{part}" not in columns:
+                    raise ValueError(f"tranche_{number}_fraction and tranche_{number}_year must be given together")
+        rules['tranche_fractions'] = np.stack([floats(columns[f"tranche_{n}_fraction"], 0.0) for n in tranches], axis=-1)
+        rules['tranche_years'] = np.stack([floats(columns[f"tranche_{n}_year"], np.nan) for n in tranches], axis=-1)
+    return rules
+
+
+def rule_inputs(container, years):
+    """Widgets for one holder's rules in ``container`` (the sidebar or a form).
+
+    Returns :func:`compile_vesting` keyword arguments. Every widget is always
+    shown, so the inputs also work inside a form.
+    """
+    col1, col2 = container.columns(2)
+    rules = {
+        'vesting_months': col1.number_input("Vesting Months", min_value=1, value=48, step=1),
+        'cliff_months': col2.number_input("Cliff Months", min_value=0, value=12, step=1),
+    }
+    rules['frequency_months'] = VESTING_FREQUENCIES[container.selectbox(
+        "Vests", list(VESTING_FREQUENCIES), help="Graded vesting steps after the cliff"
+    )]
+    rules['start_month'] = container.number_input(
+        "Vesting Start (months)", min_value=-120, value=0, step=1,
+        help="Months after the end of the base year; negative for grants made earlier"
+    )
+    tranche = container.slider("Performance Tranche (% of grant)", min_value=0, max_value=100, value=0, step=5)
+    met = container.selectbox("Tranche Target Met", ["Not met"] + list(years))
+    if tranche:
+        rules['tranche_fractions'] = [tranche / 100]
+        rules['tranche_years'] = [np.nan if met == "Not met" else met]
+    event = container.selectbox("Acceleration Event", ["None"] + list(years), help="E.g. a change of control")
+    accelerated = container.slider("Unvested Shares Accelerated (%)", min_value=0, max_value=100, value=100, step=5)
+    if event != "None":
+        rules['acceleration_year'] = event
+        rules['acceleration_fraction'] = accelerated / 100
+    return rules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile vesting rules in a CSV into vest_<year> columns.")
+    parser.add_argument("input", help="CSV with grant_shares and rule columns, one row per holder")
+    parser.add_argument("-o", "--output", required=True, help="output CSV, with the rule columns replaced by vest_<year>")
+    parser.add_argument("--first-year", type=int, default=2025, help="first projected year (default: 2025)")
+    parser.add_argument("--years", type=int, default=11, help="number of projected years (default: 11)")
+    args = parser.parse_args(argv)
+
+    with open(args.input, newline="", encoding="utf-8") as source:
+        reader = csv.reader(source)
+        try:
+            header = read_header(reader, args.input)
+            if "grant_shares" not in header:
+                parser.error("input is missing the grant_shares column")
+            rows = list(data_rows(reader, len(header), {"grant_shares": header.index("grant_shares")}))
+        except ValueError as e:
+            parser.error(str(e))
+    columns = dict(zip(header, zip(*rows))) if rows else {name: () for name in header}
+
+    try:
+        grant_shares = np.array([float(value) for value in columns["grant_shares"]], dtype=np.float64)
+        vesting = compile_vesting(grant_shares, args.first_year - 1, args.years, **rule_columns(columns, len(rows)))
+    except ValueError as e:
+        parser.error(str(e))
+
+    kept = [index for index, name in enumerate(header) if name not in RULE_DEFAULTS and not TRANCHE_COLUMN.match(name)]
+    years = range(args.first_year, args.first_year + args.years)
+    with open(args.output, "w", newline="", encoding="utf-8") as output:
+        writer = csv.writer(output)
+        writer.writerow([header[index] for index in kept] + [f"vest_{year}" for year in years])
+        for row, vested in zip(rows, vesting.astype(np.int64).tolist()):
+            writer.writerow([row[index] for index in kept] + vested)
+    print(f"Compiled {len(rows):,} vesting schedules -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()